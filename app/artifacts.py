@@ -0,0 +1,188 @@
+"""Archivos auxiliares que conservan la transcripción y el resumen sin pérdida.
+
+La tabla Markdown de ``-transcripcion.md`` redondea los tiempos a segundos y es
+costosa de interpretar de nuevo. Junto a ella se guarda un archivo JSON Lines:
+la primera línea es un encabezado con los metadatos de la clase y del modelo, y
+cada línea siguiente es un segmento ``[inicio, fin, texto]``. Si la
+transcripción tiene marcas por palabra, el segmento lleva un cuarto elemento:
+una lista plana de enteros con cuatro valores por palabra (inicio y fin en
+milisegundos relativos al inicio del segmento, confianza en porcentaje y
+posición donde termina la palabra en el texto). Si se separaron los
+hablantes, el encabezado lista sus nombres y cada segmento lleva un quinto
+elemento con el índice de su hablante (``-1`` si no se sabe). El resumen
+generado por LM Studio se guarda aparte en ``-resumen.json``. Volver a generar
+notas, resúmenes o índices a partir de estos archivos toma milisegundos.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+from .note_writer import write_atomic
+from .summarizer import Summary
+from .transcriber import SegmentStore, TranscriptionResult, Word
+
+ARTIFACT_FORMAT = "cuaderno-transcripcion"
+ARTIFACT_VERSION = 1
+
+
+class ArtifactError(ValueError):
+    """Se lanza cuando un archivo auxiliar no tiene el formato esperado."""
+
+
+@dataclass
+class TranscriptArtifact:
+    """Transcripción cargada desde disco junto con los datos de la clase."""
+
+    title: str
+    class_date: date
+    audio_name: str
+    transcription: TranscriptionResult
+
+
+def save_transcript_artifact(
+    path: Path,
+    transcription: TranscriptionResult,
+    title: str,
+    class_date: date,
+    audio_name: str,
+) -> None:
+    """Guarda la transcripción completa en formato JSON Lines."""
+
+    header = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "title": title,
+        "date": class_date.isoformat(),
+        "audio_name": audio_name,
+        "language": transcription.language,
+        "duration": transcription.duration,
+        "params": transcription.params,
+        "segments": len(transcription.segments),
+        "words": transcription.segments.has_words,
+        "speakers": transcription.segments.speaker_names,
+    }
+
+    write_atomic(path, _iter_transcript_lines(header, transcription))
+
+
+def _iter_transcript_lines(header: dict, transcription: TranscriptionResult) -> Iterator[str]:
+    yield json.dumps(header, ensure_ascii=False) + "\n"
+    segments = transcription.segments
+    speaker_index = {name: index for index, name in enumerate(segments.speaker_names)}
+    for index, segment in enumerate(segments):
+        row: list = [round(segment.start, 3), round(segment.end, 3), segment.text]
+        if segments.has_words or segments.has_speakers:
+            row.append(_encode_words(segment.start, segment.text, segments.words(index)))
+        if segments.has_speakers:
+            row.append(speaker_index.get(segment.speaker, -1))
+        yield json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _encode_words(segment_start: float, text: str, words: Sequence[Word]) -> List[int]:
+    encoded: List[int] = []
+    cursor = 0
+    for word in words:
+        position = text.find(word.text, cursor)
+        cursor = position + len(word.text) if position >= 0 else cursor
+        encoded.extend(
+            (
+                round((word.start - segment_start) * 1000),
+                round((word.end - segment_start) * 1000),
+                round(word.probability * 100),
+                cursor,
+            )
+        )
+    return encoded
+
+
+def _decode_words(segment_start: float, text: str, encoded: Sequence[int]) -> List[Word]:
+    words = []
+    previous = 0
+    for offset in range(0, len(encoded) - 3, 4):
+        start_ms, end_ms, probability, end_char = encoded[offset : offset + 4]
+        words.append(
+            Word(
+                start=segment_start + start_ms / 1000,
+                end=segment_start + end_ms / 1000,
+                text=text[previous:end_char],
+                probability=probability / 100,
+            )
+        )
+        previous = end_char
+    return words
+
+
+def load_transcript_artifact(path: Path) -> TranscriptArtifact:
+    """Lee un archivo generado por ``save_transcript_artifact``."""
+
+    with path.open("r", encoding="utf-8") as handle:
+        header = _read_header(handle.readline(), path)
+        names = header.get("speakers") or []
+        segments = SegmentStore()
+        speakers: List[Optional[str]] = []
+        for line in handle:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            start, end, text = row[:3]
+            words = _decode_words(start, text, row[3]) if len(row) > 3 else ()
+            segments.append(start, end, text, words)
+            position = row[4] if len(row) > 4 else -1
+            speakers.append(names[position] if 0 <= position < len(names) else None)
+        if names:
+            segments.set_speakers(speakers)
+
+    transcription = TranscriptionResult(
+        segments=segments,
+        language=header.get("language", ""),
+        duration=float(header.get("duration", 0.0)),
+        params=header.get("params", {}),
+    )
+    return TranscriptArtifact(
+        title=header.get("title", ""),
+        class_date=date.fromisoformat(header["date"]),
+        audio_name=header.get("audio_name", ""),
+        transcription=transcription,
+    )
+
+
+def save_summary_artifact(path: Path, summary: Summary) -> None:
+    """Guarda el resumen estructurado tal como se escribió en la nota."""
+
+    write_atomic(path, [json.dumps(asdict(summary), ensure_ascii=False, indent=2) + "\n"])
+
+
+def load_summary_artifact(path: Path) -> Summary:
+    """Lee un resumen guardado con ``save_summary_artifact``."""
+
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as exc:
+        raise ArtifactError(f"{path} no es un resumen válido") from exc
+
+    return Summary(
+        avance_clase=data.get("avance_clase", []),
+        tareas=data.get("tareas", []),
+        pendientes=data.get("pendientes", []),
+        preguntas_examen=data.get("preguntas_examen", []),
+    )
+
+
+def _read_header(line: str, path: Path) -> dict:
+    try:
+        header = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ArtifactError(f"{path} no es un archivo de transcripción válido") from exc
+
+    if not isinstance(header, dict) or header.get("format") != ARTIFACT_FORMAT:
+        raise ArtifactError(f"{path} no es un archivo de transcripción válido")
+    if header.get("version", 0) > ARTIFACT_VERSION:
+        raise ArtifactError(
+            f"{path} usa la versión {header['version']} del formato, que esta aplicación no reconoce"
+        )
+    return header
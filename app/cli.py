@@ -4,20 +4,31 @@ from __future__ import annotations
 
 import argparse
 import logging
+import sys
 from datetime import date, datetime
 from pathlib import Path
+from typing import Callable, Dict, List
 
 from .config import get_settings
+from .course_review import CourseReviewError, build_course_review
+from .digest import build_digest, month_range, week_range
 from .logger import get_logger, setup_logging
+from .memory import MemoryBudgetError
+from .models import ModelError, configured_models, preflight, provision_model
+from .profiler import run_profiled
+from .rerender import reindex_vault, rerender_vault
+from .search_index import SearchHit, SearchIndexError, index_path_for, search
+from .semantic_index import (
+    SemanticHit,
+    SemanticIndexError,
+    lm_studio_embedder,
+    semantic_search,
+)
+from .service import serve
 from .services import ServiceManager
-from .workflow import run_workflow
-from .logger import get_logger, setup_logging
-from .workflow import run_workflow
-from .config import get_settings
-from .logger import get_logger, setup_logging
-from .note_writer import prepare_paths, write_note
-from .summarizer import SummarizationError, Summary, call_lm_studio
-from .transcriber import TranscriptionResult, transcribe
+from .transcriber import DECODING_PROFILES, format_timestamp
+from .worker_pool import WorkflowJob, WorkflowPool
+from .workflow import WorkflowResult, class_date_for, run_workflow, title_for
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -45,17 +56,40 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Carpeta donde se guardarán las notas (sobrescribe NOTES_ROOT).",
     )
+    _add_log_level(parser)
     parser.add_argument(
-        "--log-level",
+        "--skip-summary",
+        action="store_true",
+        help="No llamar a LM Studio y generar una nota con la transcripción únicamente.",
+    )
+    parser.add_argument(
+        "--profile",
         type=str,
-        default="INFO",
-        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
-        help="Nivel de detalle del logging.",
+        default=None,
+        choices=list(DECODING_PROFILES),
+        help="Perfil de decodificación de Whisper (sobrescribe WHISPER_PROFILE).",
     )
     parser.add_argument(
-        "--skip-summary",
+        "--two-pass",
         action="store_true",
-        help="No llamar a LM Studio y generar una nota con la transcripción únicamente.",
+        default=None,
+        help=(
+            "Escribe primero un borrador con WHISPER_DRAFT_MODEL_SIZE y luego lo reemplaza "
+            "con la transcripción del modelo configurado."
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Transcribe aunque el audio (u otra versión del mismo) ya se haya procesado.",
+    )
+    parser.add_argument(
+        "--profiler",
+        action="store_true",
+        help=(
+            "Mide en qué funciones se va el tiempo y guarda junto a la nota un informe (.profile.txt) "
+            "y las pilas para un flamegraph (.profile.folded)."
+        ),
     )
     return parser
 
@@ -66,7 +100,233 @@ def parse_date(raw_date: str | None) -> date:
     return datetime.strptime(raw_date, "%Y-%m-%d").date()
 
 
+def build_batch_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="batch",
+        description="Procesa varios audios en paralelo, con un modelo cargado por proceso.",
+    )
+    parser.add_argument("audios", type=Path, nargs="+", help="Archivos de audio a procesar.")
+    parser.add_argument(
+        "--title",
+        type=str,
+        default=None,
+        help="Título común a todas las clases. Por defecto, el nombre de cada archivo.",
+    )
+    parser.add_argument(
+        "--notes-root",
+        type=Path,
+        default=None,
+        help="Carpeta del vault (sobrescribe NOTES_ROOT).",
+    )
+    parser.add_argument(
+        "--skip-summary",
+        action="store_true",
+        help="No llamar a LM Studio y generar notas con la transcripción únicamente.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        choices=list(DECODING_PROFILES),
+        help="Perfil de decodificación de Whisper (sobrescribe WHISPER_PROFILE).",
+    )
+    parser.add_argument(
+        "--two-pass",
+        action="store_true",
+        default=None,
+        help="Escribe un borrador de cada clase antes de la transcripción definitiva.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Transcribe aunque un audio ya se haya procesado.",
+    )
+    _add_log_level(parser)
+    return parser
+
+
+def build_models_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="models",
+        description="Descarga o comprueba los modelos de Whisper en WHISPER_MODELS_DIR.",
+    )
+    parser.add_argument(
+        "action",
+        choices=["download", "check"],
+        help="'download' descarga y verifica; 'check' verifica y mide el tiempo de carga sin conexión.",
+    )
+    parser.add_argument(
+        "sizes",
+        nargs="*",
+        help="Modelos (tiny, base, small, ...). Por defecto, los que usa la configuración actual.",
+    )
+    _add_log_level(parser)
+    return parser
+
+
+def build_serve_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="serve",
+        description="Vigila una carpeta y procesa cada audio nuevo con el modelo siempre cargado.",
+    )
+    parser.add_argument(
+        "--audio-dir",
+        type=Path,
+        default=None,
+        help="Carpeta a vigilar (sobrescribe SERVICE_AUDIO_DIR).",
+    )
+    parser.add_argument(
+        "--notes-root",
+        type=Path,
+        default=None,
+        help="Carpeta del vault (sobrescribe NOTES_ROOT).",
+    )
+    parser.add_argument("--host", type=str, default=None, help="Interfaz de /health y /metrics (SERVICE_HOST).")
+    parser.add_argument("--port", type=int, default=None, help="Puerto de /health y /metrics (SERVICE_PORT).")
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=None,
+        help="Segundos entre revisiones de la carpeta (SERVICE_POLL_SECONDS).",
+    )
+    _add_log_level(parser)
+    return parser
+
+
+def build_rerender_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="rerender",
+        description="Regenera todas las notas del vault con las plantillas actuales.",
+    )
+    parser.add_argument(
+        "--notes-root",
+        type=Path,
+        default=None,
+        help="Carpeta del vault (sobrescribe NOTES_ROOT).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Cantidad de hilos para escribir notas en paralelo.",
+    )
+    _add_log_level(parser)
+    return parser
+
+
+def build_search_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="search",
+        description="Busca texto en las transcripciones y resúmenes del vault.",
+    )
+    parser.add_argument("query", nargs="?", default="", help="Palabras a buscar.")
+    parser.add_argument(
+        "--notes-root",
+        type=Path,
+        default=None,
+        help="Carpeta del vault (sobrescribe NOTES_ROOT).",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Cantidad máxima de resultados.",
+    )
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="Actualiza el índice con las notas existentes antes de buscar.",
+    )
+    parser.add_argument(
+        "--semantic",
+        action="store_true",
+        help="Busca por significado usando el índice de embeddings (LM_STUDIO_EMBEDDING_MODEL).",
+    )
+    _add_log_level(parser, default="WARNING")
+    return parser
+
+
+def build_exam_prep_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="exam-prep",
+        description="Genera un repaso de examen consolidado con varias clases de un curso.",
+    )
+    parser.add_argument("--title", type=str, required=True, help="Título o asignatura del curso.")
+    parser.add_argument(
+        "--from",
+        dest="date_from",
+        type=str,
+        required=True,
+        help="Fecha inicial (YYYY-MM-DD).",
+    )
+    parser.add_argument(
+        "--to",
+        dest="date_to",
+        type=str,
+        default=None,
+        help="Fecha final (YYYY-MM-DD). Por defecto, hoy.",
+    )
+    parser.add_argument(
+        "--focus",
+        type=str,
+        default=None,
+        help="Tema en el que centrar el repaso (por ejemplo 'valores propios').",
+    )
+    parser.add_argument(
+        "--notes-root",
+        type=Path,
+        default=None,
+        help="Carpeta del vault (sobrescribe NOTES_ROOT).",
+    )
+    _add_log_level(parser)
+    return parser
+
+
+def build_digest_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="digest",
+        description="Junta las tareas y pendientes de las notas de una semana o un mes.",
+    )
+    period = parser.add_mutually_exclusive_group()
+    period.add_argument(
+        "--month",
+        type=str,
+        default=None,
+        help="Mes a resumir (YYYY-MM). Por defecto, el mes actual.",
+    )
+    period.add_argument(
+        "--week",
+        type=str,
+        default=None,
+        help="Cualquier fecha (YYYY-MM-DD) de la semana a resumir.",
+    )
+    parser.add_argument(
+        "--notes-root",
+        type=Path,
+        default=None,
+        help="Carpeta del vault (sobrescribe NOTES_ROOT).",
+    )
+    _add_log_level(parser)
+    return parser
+
+
+def _add_log_level(parser: argparse.ArgumentParser, default: str = "INFO") -> None:
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=default,
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        help="Nivel de detalle del logging.",
+    )
+
+
 def main(args: list[str] | None = None) -> None:
+    if args is None:
+        args = sys.argv[1:]
+    if args and args[0] in COMMANDS:
+        COMMANDS[args[0]](args[1:])
+        return
+
     parser = build_parser()
     parsed = parser.parse_args(args)
 
@@ -86,70 +346,237 @@ def main(args: list[str] | None = None) -> None:
     service_manager.bootstrap_services(callback=publish)
 
     class_date = parse_date(parsed.date)
-    result = run_workflow(
-        audio_path=parsed.audio,
-        title=parsed.title,
-        class_date=class_date,
-        notes_root=parsed.notes_root,
-        skip_summary=parsed.skip_summary,
-    )
+
+    def run() -> WorkflowResult:
+        return run_workflow(
+            audio_path=parsed.audio,
+            title=parsed.title,
+            class_date=class_date,
+            notes_root=parsed.notes_root,
+            skip_summary=parsed.skip_summary,
+            profile=parsed.profile,
+            two_pass=parsed.two_pass,
+            force=parsed.force,
+        )
+
+    try:
+        result = run_profiled(run) if parsed.profiler else run()
+    except (ModelError, MemoryBudgetError) as exc:
+        parser.exit(1, f"{exc}\n")
+
+    if result.refinement is not None:
+        logger.info("Borrador disponible en %s; esperando la transcripción refinada...", result.note_path)
+        result.refinement.result()
 
     logger.info(
         "\n¡Listo! Abre Obsidian en %s para revisar tus apuntes.", result.note_path.parent
     )
+
+
+def batch_command(args: list[str]) -> None:
+    parser = build_batch_parser()
+    parsed = parser.parse_args(args)
+    setup_logging(getattr(logging, parsed.log_level))
+    logger = get_logger(__name__)
+
+    missing = [str(path) for path in parsed.audios if not path.exists()]
+    if missing:
+        parser.error(f"No existen: {', '.join(missing)}")
+
+    settings = get_settings()
+    ServiceManager(settings).bootstrap_services(
+        callback=lambda status: logger.log(
+            logging.INFO if status.ready else logging.WARNING, "%s: %s", status.title, status.detail
+        )
+    )
+
+    jobs = [
+        WorkflowJob(
+            audio_path=path,
+            title=parsed.title or title_for(path),
+            class_date=class_date_for(path),
+            notes_root=parsed.notes_root,
+            skip_summary=parsed.skip_summary,
+            profile=parsed.profile,
+            two_pass=parsed.two_pass,
+            force=parsed.force,
+        )
+        for path in parsed.audios
+    ]
+    failed = 0
+    try:
+        pool = WorkflowPool(len(jobs), profile=parsed.profile, two_pass=parsed.two_pass)
+    except ModelError as exc:
+        parser.exit(1, f"{exc}\n")
+    with pool:
+        futures = []
+        for job in jobs:
+            try:
+                futures.append((job, pool.submit(job)))
+            except MemoryBudgetError as exc:
+                failed += 1
+                logger.error("No se pudo procesar %s: %s", job.audio_path, exc)
+        for job, future in futures:
+            try:
+                result = future.result()
+            except Exception as exc:  # noqa: BLE001 - se informa y se sigue con el resto
+                failed += 1
+                logger.error("No se pudo procesar %s: %s", job.audio_path, exc)
+                continue
+            suffix = " (ya existía)" if result.duplicate else ""
+            logger.info("%s -> %s%s", job.audio_path.name, result.note_path, suffix)
+
+    if failed:
+        raise SystemExit(1)
+
+
+def models_command(args: list[str]) -> None:
+    parser = build_models_parser()
+    parsed = parser.parse_args(args)
+    setup_logging(getattr(logging, parsed.log_level))
+
+    settings = get_settings()
+    sizes = parsed.sizes or configured_models(settings)
+    try:
+        if parsed.action == "download":
+            for size in sizes:
+                provision_model(size, settings.whisper_models_dir)
+        else:
+            settings.whisper_offline = True
+            for check in preflight(settings, sizes):
+                print(f"{check.model_size:<16} {check.load_seconds:6.2f} s  {check.path}")
+    except ModelError as exc:
+        parser.exit(1, f"{exc}\n")
+
+
+def serve_command(args: list[str]) -> None:
+    parser = build_serve_parser()
+    parsed = parser.parse_args(args)
+    setup_logging(getattr(logging, parsed.log_level))
+
+    settings = get_settings()
+    try:
+        serve(
+            parsed.audio_dir or settings.service_audio_dir,
+            notes_root=parsed.notes_root,
+            host=parsed.host or settings.service_host,
+            port=parsed.port or settings.service_port,
+            interval=parsed.interval or settings.service_poll_seconds,
+        )
+    except (ModelError, OSError) as exc:
+        parser.exit(1, f"{exc}\n")
+
+
+def rerender_command(args: list[str]) -> None:
+    parsed = build_rerender_parser().parse_args(args)
+    setup_logging(getattr(logging, parsed.log_level))
+
+    notes_root = parsed.notes_root or get_settings().notes_root
+    report = rerender_vault(notes_root, workers=parsed.workers)
+    if report.failed:
+        raise SystemExit(1)
+
+
+def search_command(args: list[str]) -> None:
+    parser = build_search_parser()
+    parsed = parser.parse_args(args)
+    setup_logging(getattr(logging, parsed.log_level))
+
     settings = get_settings()
     notes_root = parsed.notes_root or settings.notes_root
-    notes_root.mkdir(parents=True, exist_ok=True)
+    embed = None
+    if parsed.semantic:
+        if not settings.lm_studio_embedding_model:
+            parser.error("Configura LM_STUDIO_EMBEDDING_MODEL para usar --semantic")
+        embed = lm_studio_embedder(settings.lm_studio_base_url, settings.lm_studio_embedding_model)
 
-    class_date = parse_date(parsed.date)
-    slug = _slugify(parsed.title) if parsed.title else "clase"
-    audio_path = parsed.audio.resolve()
+    try:
+        if parsed.reindex:
+            reindex_vault(notes_root, embed=embed)
+        if not parsed.query.strip():
+            if not parsed.reindex:
+                parser.error("Indica qué buscar")
+            return
 
-    logger.info("Usando carpeta de notas: %s", notes_root)
+        if embed is not None:
+            _print_semantic_hits(semantic_search(notes_root, parsed.query, embed, k=parsed.limit))
+        else:
+            _print_hits(search(index_path_for(notes_root), parsed.query, limit=parsed.limit))
+    except (SearchIndexError, SemanticIndexError) as exc:
+        parser.exit(1, f"{exc}\n")
 
-    transcription: TranscriptionResult = transcribe(
-        audio_path=audio_path,
-        model_size=settings.whisper_model_size,
-        compute_type=settings.whisper_compute_type,
-        language=settings.whisper_language,
-    )
 
-    summary = None
-    if parsed.skip_summary:
-        logger.warning("Se omitió la generación de resumen por petición del usuario")
+def _print_hits(hits: List[SearchHit]) -> None:
+    if not hits:
+        print("Sin resultados.")
+        return
+
+    for hit in hits:
+        if hit.start_ms is None:
+            location = hit.kind
+        else:
+            location = f"{format_timestamp(hit.start_ms / 1000)} ({hit.start_ms} ms)"
+        print(f"{hit.class_date.isoformat()} {hit.link} {location}")
+        print(f"    {hit.snippet}")
+
+
+def _print_semantic_hits(hits: List[SemanticHit]) -> None:
+    if not hits:
+        print("Sin resultados.")
+        return
+
+    for hit in hits:
+        start_ms = round(hit.start * 1000)
+        print(
+            f"{hit.class_date.isoformat()} {hit.link} "
+            f"{format_timestamp(hit.start)} ({start_ms} ms) · similitud {hit.score:.2f}"
+        )
+        print(f"    {hit.text}")
+
+
+def exam_prep_command(args: list[str]) -> None:
+    parser = build_exam_prep_parser()
+    parsed = parser.parse_args(args)
+    setup_logging(getattr(logging, parsed.log_level))
+
+    settings = get_settings()
+    try:
+        path = build_course_review(
+            settings,
+            parsed.notes_root or settings.notes_root,
+            parsed.title,
+            parse_date(parsed.date_from),
+            parse_date(parsed.date_to),
+            focus=parsed.focus,
+        )
+    except CourseReviewError as exc:
+        parser.exit(1, f"{exc}\n")
+
+    get_logger(__name__).info("Repaso listo: %s", path)
+
+
+def digest_command(args: list[str]) -> None:
+    parser = build_digest_parser()
+    parsed = parser.parse_args(args)
+    setup_logging(getattr(logging, parsed.log_level))
+
+    if parsed.week is not None:
+        date_from, date_to = week_range(parse_date(parsed.week))
     else:
-        try:
-            summary = call_lm_studio(
-                base_url=settings.lm_studio_base_url,
-                model=settings.lm_studio_model,
-                transcript=transcription.text,
-                class_date=class_date.isoformat(),
-                class_title=parsed.title,
-            )
-        except SummarizationError as exc:
-            logger.error("No se pudo generar el resumen: %s", exc)
-            logger.warning("La nota se creará solo con la transcripción.")
-
-    if summary is None:
-        summary = Summary(avance_clase=["Revisar transcripción adjunta."], tareas=[], pendientes=[], preguntas_examen=[])
-
-    paths = prepare_paths(notes_root, class_date, slug)
-    write_note(
-        paths=paths,
-        summary=summary,
-        segments=transcription.segments,
-        class_date=class_date,
-        title=parsed.title,
-        audio_name=audio_path.name,
-        language=transcription.language,
-        duration_minutes=transcription.duration / 60,
-    )
-
-    logger.info("Nota creada en %s", paths.note_path)
-    logger.info("Transcripción detallada guardada en %s", paths.transcript_path)
-
-
-def _slugify(value: str) -> str:
-    normalized = value.strip().lower().replace(" ", "-")
-    allowed = [c for c in normalized if c.isalnum() or c in {"-", "_"}]
-    return "".join(allowed) or "clase"
+        month = datetime.strptime(parsed.month, "%Y-%m") if parsed.month else date.today()
+        date_from, date_to = month_range(month.year, month.month)
+
+    notes_root = parsed.notes_root or get_settings().notes_root
+    report = build_digest(notes_root, date_from, date_to, weekly=parsed.week is not None)
+    get_logger(__name__).info("Tareas y pendientes: %s", report.path)
+
+
+COMMANDS: Dict[str, Callable[[list[str]], None]] = {
+    "batch": batch_command,
+    "digest": digest_command,
+    "exam-prep": exam_prep_command,
+    "models": models_command,
+    "rerender": rerender_command,
+    "search": search_command,
+    "serve": serve_command,
+}
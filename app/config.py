@@ -37,7 +37,7 @@ class Settings:
     lm_studio_base_url: str
     lm_studio_model: str
     whisper_model_size: str
-    whisper_compute_type: str
+    whisper_compute_type: Optional[str]
     whisper_language: Optional[str]
     notes_root: Path
     auto_bootstrap_services: bool
@@ -50,6 +50,32 @@ class Settings:
     obsidian_vault: Path
     obsidian_executable: Optional[Path]
     gui_theme: str
+    lm_studio_warmup: bool
+    lm_studio_embedding_model: Optional[str]
+    lm_studio_context_tokens: int
+    lm_studio_prompt_tokens: int
+    lm_studio_cache_prompt: bool
+    llm_backend: str
+    llm_stub_latency_ms: int
+    llm_stub_slots: int
+    whisper_profile: str
+    whisper_two_pass: bool
+    whisper_draft_model_size: str
+    whisper_language_probe: bool
+    whisper_word_timestamps: bool
+    diarization: bool
+    whisper_cpu_threads: int
+    worker_processes: int
+    memory_budget_mb: int
+    whisper_idle_unload_seconds: int
+    whisper_models_dir: Path
+    whisper_offline: bool
+    service_audio_dir: Path
+    service_host: str
+    service_port: int
+    service_poll_seconds: int
+    audio_dedup: bool
+    audio_link: str
 
 
 def get_settings() -> Settings:
@@ -60,7 +86,10 @@ def get_settings() -> Settings:
     base_url = _get_env("LM_STUDIO_BASE_URL", "http://host.docker.internal:1234/v1")
     model = _get_env("LM_STUDIO_MODEL", "Meta-Llama-3-8B-Instruct")
     whisper_model = _get_env("WHISPER_MODEL_SIZE", "small")
-    compute_type = _get_env("WHISPER_COMPUTE_TYPE", "auto")
+    # "auto" o vacío: se usa el tipo de cómputo del perfil de decodificación.
+    compute_type = _get_env("WHISPER_COMPUTE_TYPE", "").strip()
+    if compute_type.lower() == "auto":
+        compute_type = ""
     language = _get_env("WHISPER_LANGUAGE", "").strip() or None
     if getattr(sys, "frozen", False):
         default_notes_root = "notes"
@@ -96,7 +125,7 @@ def get_settings() -> Settings:
         lm_studio_base_url=base_url.rstrip("/"),
         lm_studio_model=model,
         whisper_model_size=whisper_model,
-        whisper_compute_type=compute_type,
+        whisper_compute_type=compute_type or None,
         whisper_language=language,
         notes_root=notes_root,
         auto_bootstrap_services=_get_bool("AUTO_BOOTSTRAP_SERVICES", True),
@@ -109,6 +138,32 @@ def get_settings() -> Settings:
         obsidian_vault=obsidian_vault,
         obsidian_executable=obsidian_executable,
         gui_theme=_get_env("GUI_THEME", "superhero"),
+        lm_studio_warmup=_get_bool("LM_STUDIO_WARMUP", True),
+        lm_studio_embedding_model=_get_env("LM_STUDIO_EMBEDDING_MODEL", "").strip() or None,
+        lm_studio_context_tokens=_get_int("LM_STUDIO_CONTEXT_TOKENS", 8192),
+        lm_studio_prompt_tokens=_get_int("LM_STUDIO_PROMPT_TOKENS", 0),
+        lm_studio_cache_prompt=_get_bool("LM_STUDIO_CACHE_PROMPT", True),
+        llm_backend=_get_env("LLM_BACKEND", "lmstudio").strip().lower() or "lmstudio",
+        llm_stub_latency_ms=max(0, _get_int("LLM_STUB_LATENCY_MS", 0)),
+        llm_stub_slots=max(1, _get_int("LLM_STUB_SLOTS", 1)),
+        whisper_profile=_get_env("WHISPER_PROFILE", "balanced").strip().lower() or "balanced",
+        whisper_two_pass=_get_bool("WHISPER_TWO_PASS", False),
+        whisper_draft_model_size=_get_env("WHISPER_DRAFT_MODEL_SIZE", "base").strip() or "base",
+        whisper_language_probe=_get_bool("WHISPER_LANGUAGE_PROBE", False),
+        whisper_word_timestamps=_get_bool("WHISPER_WORD_TIMESTAMPS", False),
+        diarization=_get_bool("DIARIZATION", False),
+        whisper_cpu_threads=_get_int("WHISPER_CPU_THREADS", 0),
+        worker_processes=_get_int("WORKER_PROCESSES", 0),
+        memory_budget_mb=max(0, _get_int("MEMORY_BUDGET_MB", 0)),
+        whisper_idle_unload_seconds=max(0, _get_int("WHISPER_IDLE_UNLOAD_SECONDS", 600)),
+        whisper_models_dir=resolve_app_path(_get_env("WHISPER_MODELS_DIR", "models").strip() or "models"),
+        whisper_offline=_get_bool("WHISPER_OFFLINE", False),
+        service_audio_dir=resolve_app_path(_get_env("SERVICE_AUDIO_DIR", "data/audio").strip() or "data/audio"),
+        service_host=_get_env("SERVICE_HOST", "127.0.0.1").strip() or "127.0.0.1",
+        service_port=_get_int("SERVICE_PORT", 8765),
+        service_poll_seconds=max(1, _get_int("SERVICE_POLL_SECONDS", 5)),
+        audio_dedup=_get_bool("AUDIO_DEDUP", True),
+        audio_link=_get_env("AUDIO_LINK", "none").strip().lower() or "none",
     )
 
 
@@ -0,0 +1,385 @@
+"""Repaso de examen a nivel de curso a partir de varias clases del vault.
+
+En lugar de concatenar todas las transcripciones, para cada clase se recuperan
+los fragmentos más relevantes mediante el índice semántico (si está
+configurado) o el índice de texto completo, hasta llenar el presupuesto de
+contexto. Cada clase se resume por separado (etapa *map*) y los resultados se
+combinan en grupos que caben en el contexto hasta obtener una sola lista
+(etapa *reduce*). Todas las respuestas intermedias se guardan en
+``notes_root/.cache/repaso`` indexadas por el hash de su prompt, así que volver
+a generar el repaso tras agregar una clase solo consulta a LM Studio por lo
+nuevo.
+
+Como en ``summarizer``, cada mensaje empieza con instrucciones fijas y deja los
+datos de la clase al final, así las peticiones sucesivas comparten el mismo
+prefijo y el servidor puede reutilizar su caché.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .artifacts import ArtifactError, load_summary_artifact, load_transcript_artifact
+from .config import Settings
+from .llm_backends import get_backend
+from .note_writer import NotePaths, paths_from_artifact, slugify, write_atomic
+from .rerender import iter_artifacts
+from .search_index import SearchIndexError, index_path_for, search
+from .semantic_index import (
+    SemanticIndex,
+    SemanticIndexError,
+    chunk_segments,
+    lm_studio_embedder,
+)
+from .summarizer import SummarizationError, Summary, request_json
+from .transcriber import SegmentStore, format_timestamp
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = ".cache/repaso"
+REVIEW_FOLDER = "repasos"
+RESPONSE_TOKENS = 1200
+PROMPT_OVERHEAD_TOKENS = 400
+CHARS_PER_TOKEN = 4
+
+DEFAULT_FOCUS = "definiciones conceptos teoremas ejemplos importantes evaluación examen"
+
+MAP_SYSTEM_PROMPT = (
+    "Eres un asistente pedagógico que prepara repasos para exámenes. "
+    "Recibirás fragmentos seleccionados de la transcripción de una clase. "
+    "Responde exclusivamente en JSON válido con las claves 'temas' y 'preguntas'. "
+    "'temas' es una lista de conceptos clave explicados en una frase; 'preguntas' "
+    "es una lista de preguntas de examen concretas que se puedan responder con lo visto."
+)
+
+REDUCE_SYSTEM_PROMPT = (
+    "Eres un asistente pedagógico que consolida repasos de varias clases de un mismo curso. "
+    "Recibirás temas y preguntas ya extraídos de cada clase. Elimina duplicados, agrupa lo "
+    "relacionado y prioriza lo que aparece en varias clases. Responde exclusivamente en JSON "
+    "válido con las claves 'temas' y 'preguntas', cada una una lista de strings."
+)
+
+MAP_USER_PREFIX = "Devuelve un JSON con los temas clave y preguntas de examen de esta clase.\n\n"
+
+REDUCE_USER_PREFIX = "Consolida en un solo JSON los temas y preguntas de estas clases.\n\n"
+
+REVIEW_TEMPLATE = """---
+course: {title}
+from: {date_from}
+to: {date_to}
+lectures: {count}
+---
+
+# Repaso para el examen - {title}
+
+Clases incluidas ({date_from} a {date_to}):
+{lectures}
+
+## Temas clave
+{temas}
+
+## Preguntas de práctica
+{preguntas}
+"""
+
+
+Passage = Tuple[float, str]
+
+
+class CourseReviewError(RuntimeError):
+    """Se lanza cuando no se puede construir el repaso del curso."""
+
+
+@dataclass
+class Lecture:
+    """Clase del vault con su transcripción y resumen guardados."""
+
+    paths: NotePaths
+    title: str
+    class_date: date
+    segments: SegmentStore
+    summary: Optional[Summary]
+
+
+@dataclass
+class LectureDigest:
+    """Temas y preguntas extraídos de una clase o de un grupo de clases."""
+
+    label: str
+    temas: List[str]
+    preguntas: List[str]
+
+    def to_prompt(self) -> str:
+        temas = "\n".join(f"- {item}" for item in self.temas)
+        preguntas = "\n".join(f"- {item}" for item in self.preguntas)
+        return f"## {self.label}\nTemas:\n{temas}\nPreguntas:\n{preguntas}\n"
+
+
+def find_lectures(notes_root: Path, title: str, date_from: date, date_to: date) -> List[Lecture]:
+    """Busca en el vault las clases de un curso dentro de un rango de fechas."""
+
+    slug = slugify(title)
+    lectures = []
+    for artifact_path in iter_artifacts(notes_root):
+        paths = paths_from_artifact(artifact_path)
+        stem = paths.note_path.stem
+        try:
+            class_date = date.fromisoformat(stem[:10])
+        except ValueError:
+            continue
+        if stem[11:] != slug or not date_from <= class_date <= date_to:
+            continue
+        try:
+            artifact = load_transcript_artifact(artifact_path)
+            summary = (
+                load_summary_artifact(paths.summary_path) if paths.summary_path.exists() else None
+            )
+        except (ArtifactError, OSError, ValueError) as exc:
+            logger.error("No se pudo leer %s: %s", artifact_path, exc)
+            continue
+        lectures.append(
+            Lecture(
+                paths=paths,
+                title=artifact.title,
+                class_date=class_date,
+                segments=artifact.transcription.segments,
+                summary=summary,
+            )
+        )
+    return lectures
+
+
+def build_course_review(
+    settings: Settings,
+    notes_root: Path,
+    title: str,
+    date_from: date,
+    date_to: date,
+    focus: Optional[str] = None,
+) -> Path:
+    """Genera la nota de repaso del curso y devuelve su ruta."""
+
+    lectures = find_lectures(notes_root, title, date_from, date_to)
+    if not lectures:
+        raise CourseReviewError(
+            f"No hay clases de '{title}' entre {date_from.isoformat()} y {date_to.isoformat()}"
+        )
+    logger.info("Preparando repaso de %s con %d clases", title, len(lectures))
+
+    cache = _ResponseCache(notes_root / CACHE_DIRNAME)
+    retriever = _Retriever(settings, notes_root)
+    budget_chars = _prompt_budget_chars(settings)
+
+    digests = []
+    for lecture in lectures:
+        query = focus or _default_query(lecture)
+        passages = retriever.passages(lecture, query, budget_chars)
+        prompt = _map_prompt(lecture, passages)
+        data = cache.request(settings, MAP_SYSTEM_PROMPT, prompt)
+        digests.append(
+            LectureDigest(
+                label=f"{lecture.class_date.isoformat()} - {lecture.title}",
+                temas=_as_list(data.get("temas")),
+                preguntas=_as_list(data.get("preguntas")),
+            )
+        )
+
+    consolidated = _reduce(settings, cache, digests, budget_chars)
+    return _write_review(notes_root, title, date_from, date_to, lectures, consolidated)
+
+
+def _reduce(
+    settings: Settings,
+    cache: "_ResponseCache",
+    digests: List[LectureDigest],
+    budget_chars: int,
+) -> LectureDigest:
+    """Combina resúmenes en grupos que caben en el contexto hasta dejar uno solo."""
+
+    level = 0
+    while len(digests) > 1 or level == 0:
+        groups = _group_by_budget(digests, budget_chars)
+        if len(groups) == len(digests) and len(digests) > 1:
+            # Cada resumen ya ocupa el presupuesto completo; se combinan de a
+            # dos para garantizar que el proceso avance.
+            groups = [digests[i : i + 2] for i in range(0, len(digests), 2)]
+        merged = []
+        for index, group in enumerate(groups):
+            prompt = REDUCE_USER_PREFIX + "\n".join(digest.to_prompt() for digest in group)
+            data = cache.request(settings, REDUCE_SYSTEM_PROMPT, prompt)
+            merged.append(
+                LectureDigest(
+                    label=f"Grupo {level}.{index}",
+                    temas=_as_list(data.get("temas")),
+                    preguntas=_as_list(data.get("preguntas")),
+                )
+            )
+        digests = merged
+        level += 1
+    return digests[0]
+
+
+def _group_by_budget(digests: Sequence[LectureDigest], budget_chars: int) -> List[List[LectureDigest]]:
+    groups: List[List[LectureDigest]] = []
+    current: List[LectureDigest] = []
+    size = 0
+    for digest in digests:
+        length = len(digest.to_prompt())
+        if current and size + length > budget_chars:
+            groups.append(current)
+            current, size = [], 0
+        current.append(digest)
+        size += length
+    if current:
+        groups.append(current)
+    return groups
+
+
+class _Retriever:
+    """Selecciona los fragmentos más relevantes de una clase."""
+
+    def __init__(self, settings: Settings, notes_root: Path) -> None:
+        self.notes_root = notes_root
+        self.embed = None
+        self.semantic: Optional[SemanticIndex] = None
+        if settings.lm_studio_embedding_model:
+            self.semantic = SemanticIndex(notes_root)
+            self.embed = lm_studio_embedder(
+                settings.lm_studio_base_url, settings.lm_studio_embedding_model
+            )
+
+    def passages(self, lecture: Lecture, query: str, budget_chars: int) -> List[Passage]:
+        """Devuelve ``(inicio, texto)`` en orden cronológico dentro del presupuesto."""
+
+        candidates = self._semantic(lecture, query) or self._keyword(lecture, query)
+        if not candidates:
+            candidates = self._evenly_spaced(lecture, budget_chars)
+
+        selected = []
+        used = 0
+        for start, text in candidates:
+            if used + len(text) > budget_chars:
+                continue
+            selected.append((start, text))
+            used += len(text) + 12
+        return sorted(selected)
+
+    def _semantic(self, lecture: Lecture, query: str) -> List[Passage]:
+        if self.semantic is None or self.embed is None:
+            return []
+        try:
+            hits = self.semantic.search(self.embed([query])[0], k=50, notes=[lecture.paths.note_path])
+        except SemanticIndexError as exc:
+            logger.warning("No se pudo usar el índice semántico: %s", exc)
+            return []
+        return [(hit.start, hit.text) for hit in hits]
+
+    def _keyword(self, lecture: Lecture, query: str) -> List[Passage]:
+        terms = " ".join(term for term in query.split() if len(term) > 3)
+        try:
+            hits = search(
+                index_path_for(self.notes_root),
+                terms,
+                limit=200,
+                notes=[lecture.paths.note_path],
+                match_any=True,
+            )
+        except SearchIndexError as exc:
+            logger.warning("No se pudo usar el índice de búsqueda: %s", exc)
+            return []
+        return [(hit.start_ms / 1000, hit.text) for hit in hits if hit.start_ms is not None]
+
+    @staticmethod
+    def _evenly_spaced(lecture: Lecture, budget_chars: int) -> List[Passage]:
+        chunks = chunk_segments(lecture.segments)
+        total = sum(len(chunk.text) for chunk in chunks) or 1
+        step = max(1, round(total / budget_chars))
+        return [(chunk.start, chunk.text) for chunk in chunks[::step]]
+
+
+class _ResponseCache:
+    """Guarda en disco las respuestas de LM Studio según el hash del prompt."""
+
+    def __init__(self, folder: Path) -> None:
+        self.folder = folder
+
+    def request(self, settings: Settings, system_prompt: str, user_prompt: str) -> Dict[str, list]:
+        request = [settings.llm_backend, settings.lm_studio_model, system_prompt, user_prompt]
+        key = hashlib.sha256(json.dumps(request).encode("utf-8")).hexdigest()
+        path = self.folder / f"{key}.json"
+        if path.exists():
+            logger.debug("Respuesta en caché: %s", path.name)
+            return json.loads(path.read_text(encoding="utf-8"))
+
+        try:
+            data = request_json(get_backend(settings), system_prompt, user_prompt, max_tokens=RESPONSE_TOKENS)
+        except SummarizationError as exc:
+            raise CourseReviewError(f"No se pudo generar el repaso: {exc}") from exc
+
+        write_atomic(path, [json.dumps(data, ensure_ascii=False)])
+        return data
+
+
+def _prompt_budget_chars(settings: Settings) -> int:
+    tokens = settings.lm_studio_context_tokens - RESPONSE_TOKENS - PROMPT_OVERHEAD_TOKENS
+    return max(tokens, 512) * CHARS_PER_TOKEN
+
+
+def _default_query(lecture: Lecture) -> str:
+    if lecture.summary is None:
+        return DEFAULT_FOCUS
+    items = [*lecture.summary.avance_clase, *lecture.summary.preguntas_examen]
+    return " ".join([DEFAULT_FOCUS, *items])
+
+
+def _map_prompt(lecture: Lecture, passages: List[Passage]) -> str:
+    fragments = "\n".join(f"[{format_timestamp(start)}] {text}" for start, text in passages)
+    return (
+        f"{MAP_USER_PREFIX}"
+        f"Clase: {lecture.title}\n"
+        f"Fecha: {lecture.class_date.isoformat()}\n\n"
+        f"Fragmentos de la transcripción:\n{fragments}\n"
+    )
+
+
+def _as_list(value: object) -> List[str]:
+    if not isinstance(value, list):
+        return []
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def _write_review(
+    notes_root: Path,
+    title: str,
+    date_from: date,
+    date_to: date,
+    lectures: List[Lecture],
+    consolidated: LectureDigest,
+) -> Path:
+    path = notes_root / REVIEW_FOLDER / (
+        f"{slugify(title)}-{date_from.isoformat()}-{date_to.isoformat()}.md"
+    )
+    content = REVIEW_TEMPLATE.format(
+        title=title,
+        date_from=date_from.isoformat(),
+        date_to=date_to.isoformat(),
+        count=len(lectures),
+        lectures="\n".join(f"- [[{lecture.paths.note_path.stem}]]" for lecture in lectures),
+        temas=_list_to_markdown(consolidated.temas),
+        preguntas=_list_to_markdown(consolidated.preguntas),
+    )
+    write_atomic(path, [content])
+    logger.info("Repaso guardado en %s", path)
+    return path
+
+
+def _list_to_markdown(items: List[str]) -> str:
+    if not items:
+        return "- (Sin información registrada)"
+    return "\n".join(f"- {item}" for item in items)
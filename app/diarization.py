@@ -0,0 +1,301 @@
+"""Separación de hablantes (diarización) en CPU, sin dependencias adicionales.
+
+En una clase suele hablar casi siempre la misma persona y de vez en cuando
+alguien del público. El audio se decodifica por bloques y se describe con
+coeficientes cepstrales (MFCC) calculados con numpy; cada ventana de
+``WINDOW_SECONDS`` se resume con la media y la desviación de esos coeficientes
+y las ventanas se agrupan por similitud de coseno. Quien acumula más tiempo se
+etiqueta como ``Docente`` y el resto como ``Participante N``.
+
+No pretende competir con un modelo neuronal: distingue bien voces grabadas a
+distinta distancia del micrófono, que es el caso típico de una pregunta desde
+el aula. El resultado se guarda en ``notes_root/.cache/hablantes`` indexado por
+el hash del audio, así que volver a procesar el mismo archivo no repite el
+cálculo.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .fingerprint import file_hash
+from .note_writer import write_atomic
+from .transcriber import SAMPLE_RATE, iter_audio_chunks
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = ".cache/hablantes"
+CACHE_VERSION = 1
+
+FRAME_SIZE = 400  # 25 ms
+FRAME_HOP = 160  # 10 ms
+FFT_SIZE = 512
+MEL_BANDS = 40
+MFCC_COUNT = 20
+WINDOW_SECONDS = 1.5
+WINDOW_HOP_SECONDS = 0.75
+# Similitud mínima entre una ventana y el centroide de un hablante para
+# considerarlos la misma voz.
+SIMILARITY_THRESHOLD = 0.55
+MAX_SPEAKERS = 6
+# Los grupos con menos tiempo que esto se funden con el hablante más parecido.
+MIN_SPEAKER_SECONDS = 8.0
+
+MAIN_SPEAKER = "Docente"
+OTHER_SPEAKER = "Participante {number}"
+
+
+class DiarizationError(RuntimeError):
+    """Se lanza cuando no se puede separar a los hablantes de un audio."""
+
+
+@dataclass
+class SpeakerTurn:
+    """Intervalo continuo en el que habla una misma persona."""
+
+    start: float
+    end: float
+    speaker: str
+
+
+def diarize_cached(audio_path: Path, cache_dir: Path) -> List[SpeakerTurn]:
+    """Devuelve los turnos de ``audio_path``, calculándolos solo si no están en caché.
+
+    Pensada para ejecutarse en un proceso aparte mientras Whisper transcribe.
+    """
+
+    audio_hash = file_hash(audio_path)
+    cache_path = cache_dir / f"{audio_hash}.json"
+    cached = _load_cache(cache_path)
+    if cached is not None:
+        logger.info("Hablantes de %s leídos desde la caché", audio_path.name)
+        return cached
+
+    turns = diarize(audio_path)
+    payload = {"version": CACHE_VERSION, "turns": [asdict(turn) for turn in turns]}
+    write_atomic(cache_path, [json.dumps(payload, ensure_ascii=False)])
+    return turns
+
+
+def diarize(audio_path: Path) -> List[SpeakerTurn]:
+    """Separa el audio en turnos de hablante."""
+
+    try:
+        features, energies = _frame_features(iter_audio_chunks(audio_path))
+    except Exception as exc:  # noqa: BLE001 - PyAV lanza errores muy variados
+        raise DiarizationError(f"No se pudo decodificar {audio_path}: {exc}") from exc
+
+    embeddings, times = _window_embeddings(features, energies)
+    if len(embeddings) == 0:
+        return []
+
+    labels = _cluster(embeddings)
+    labels = _smooth(labels)
+    turns = _to_turns(labels, times)
+    logger.info(
+        "Diarización de %s: %d turnos, %d hablantes",
+        audio_path.name,
+        len(turns),
+        len({turn.speaker for turn in turns}),
+    )
+    return turns
+
+
+def _frame_features(chunks: Iterable[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """MFCC y energía por trama de 25 ms, procesando el audio por bloques."""
+
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    mel = _mel_filterbank()
+    dct = _dct_matrix()
+    features: List[np.ndarray] = []
+    energies: List[np.ndarray] = []
+    carry = np.zeros(0, dtype=np.float32)
+
+    for chunk in chunks:
+        samples = np.concatenate([carry, chunk])
+        count = (samples.size - FRAME_SIZE) // FRAME_HOP + 1
+        if count <= 0:
+            carry = samples
+            continue
+        strides = (samples.strides[0] * FRAME_HOP, samples.strides[0])
+        frames = np.lib.stride_tricks.as_strided(samples, (count, FRAME_SIZE), strides)
+        spectrum = np.abs(np.fft.rfft(frames * window, n=FFT_SIZE)) ** 2
+        log_mel = np.log(spectrum @ mel.T + 1e-10)
+        features.append((log_mel @ dct.T)[:, 1:].astype(np.float32))
+        energies.append(np.log(np.sum(frames**2, axis=1) + 1e-10).astype(np.float32))
+        carry = samples[count * FRAME_HOP :].copy()
+
+    if not features:
+        return np.zeros((0, MFCC_COUNT - 1), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    return np.concatenate(features), np.concatenate(energies)
+
+
+def _window_embeddings(features: np.ndarray, energies: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Resume cada ventana con media y desviación de sus MFCC; descarta silencios."""
+
+    frames_per_second = SAMPLE_RATE / FRAME_HOP
+    size = int(WINDOW_SECONDS * frames_per_second)
+    hop = int(WINDOW_HOP_SECONDS * frames_per_second)
+    if features.shape[0] < size:
+        return np.zeros((0, 2 * features.shape[1])), np.zeros(0)
+
+    # Normalización cepstral: quita el color del micrófono y la sala.
+    features = (features - features.mean(axis=0)) / (features.std(axis=0) + 1e-6)
+    speech_level = np.percentile(energies, 30)
+
+    embeddings = []
+    times = []
+    for first in range(0, features.shape[0] - size + 1, hop):
+        block_energy = energies[first : first + size]
+        voiced = block_energy > speech_level
+        if voiced.mean() < 0.5:
+            continue
+        block = features[first : first + size][voiced]
+        embeddings.append(np.concatenate([block.mean(axis=0), block.std(axis=0)]))
+        times.append(first / frames_per_second)
+
+    if not embeddings:
+        return np.zeros((0, 2 * features.shape[1])), np.zeros(0)
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    matrix /= matrix.std(axis=0) + 1e-6
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-6
+    return matrix, np.asarray(times)
+
+
+def _cluster(embeddings: np.ndarray) -> np.ndarray:
+    """Agrupa ventanas: asignación incremental, dos pasadas de k-means y poda."""
+
+    centroids = [embeddings[0]]
+    for vector in embeddings[1:]:
+        similarities = np.asarray(centroids) @ vector
+        if similarities.max() < SIMILARITY_THRESHOLD and len(centroids) < MAX_SPEAKERS:
+            centroids.append(vector)
+
+    centers = np.asarray(centroids)
+    labels = np.zeros(len(embeddings), dtype=np.int64)
+    for _ in range(2):
+        labels = np.argmax(embeddings @ centers.T, axis=1)
+        centers = _centers(embeddings, labels, centers)
+
+    min_windows = MIN_SPEAKER_SECONDS / WINDOW_HOP_SECONDS
+    while len(centers) > 1:
+        counts = np.bincount(labels, minlength=len(centers))
+        smallest = int(np.argmin(counts))
+        if counts[smallest] >= min_windows:
+            break
+        centers = np.delete(centers, smallest, axis=0)
+        labels = np.argmax(embeddings @ centers.T, axis=1)
+        centers = _centers(embeddings, labels, centers)
+    return labels
+
+
+def _centers(embeddings: np.ndarray, labels: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    centers = previous.copy()
+    for index in range(len(previous)):
+        members = embeddings[labels == index]
+        if len(members):
+            center = members.mean(axis=0)
+            centers[index] = center / (np.linalg.norm(center) + 1e-6)
+    return centers
+
+
+def _smooth(labels: np.ndarray, width: int = 5) -> np.ndarray:
+    """Filtro de moda sobre ventanas vecinas para evitar cambios espurios."""
+
+    if len(labels) <= width:
+        return labels
+    half = width // 2
+    padded = np.pad(labels, half, mode="edge")
+    smoothed = np.empty_like(labels)
+    for index in range(len(labels)):
+        smoothed[index] = np.bincount(padded[index : index + width]).argmax()
+    return smoothed
+
+
+def _to_turns(labels: np.ndarray, times: np.ndarray) -> List[SpeakerTurn]:
+    durations = np.bincount(labels) * WINDOW_HOP_SECONDS
+    order = [int(label) for label in np.argsort(-durations) if durations[label] > 0]
+    names: Dict[int, str] = {order[0]: MAIN_SPEAKER}
+    for number, label in enumerate(order[1:], start=1):
+        names[label] = OTHER_SPEAKER.format(number=number)
+
+    turns: List[SpeakerTurn] = []
+    for label, start in zip(labels, times):
+        speaker = names[int(label)]
+        end = float(start) + WINDOW_SECONDS
+        if turns and turns[-1].speaker == speaker and start <= turns[-1].end:
+            turns[-1].end = end
+        else:
+            if turns and start < turns[-1].end:
+                # Ventanas solapadas: el cambio ocurre a mitad del solape.
+                middle = (float(start) + turns[-1].end) / 2
+                turns[-1].end = middle
+                start = middle
+            turns.append(SpeakerTurn(start=float(start), end=end, speaker=speaker))
+    return turns
+
+
+def _mel_filterbank() -> np.ndarray:
+    def to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    points = to_hz(np.linspace(to_mel(60), to_mel(SAMPLE_RATE / 2), MEL_BANDS + 2))
+    bins = np.floor((FFT_SIZE + 1) * points / SAMPLE_RATE).astype(int)
+    bank = np.zeros((MEL_BANDS, FFT_SIZE // 2 + 1), dtype=np.float32)
+    for band in range(1, MEL_BANDS + 1):
+        left, center, right = bins[band - 1], bins[band], bins[band + 1]
+        for position in range(left, center):
+            bank[band - 1, position] = (position - left) / max(center - left, 1)
+        for position in range(center, right):
+            bank[band - 1, position] = (right - position) / max(right - center, 1)
+    return bank
+
+
+def _dct_matrix() -> np.ndarray:
+    n = np.arange(MEL_BANDS)
+    k = np.arange(MFCC_COUNT)[:, None]
+    return np.cos(np.pi * k * (2 * n + 1) / (2 * MEL_BANDS)).astype(np.float32)
+
+
+def _load_cache(path: Path) -> Optional[List[SpeakerTurn]]:
+    if not path.exists():
+        return None
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+    if payload.get("version") != CACHE_VERSION:
+        return None
+    return [SpeakerTurn(**turn) for turn in payload.get("turns", [])]
+
+
+def speakers_for(
+    starts: Sequence[float], ends: Sequence[float], turns: Sequence[SpeakerTurn]
+) -> List[Optional[str]]:
+    """Asigna a cada segmento el hablante con el que más se solapa."""
+
+    speakers: List[Optional[str]] = []
+    first = 0
+    for start, end in zip(starts, ends):
+        while first < len(turns) and turns[first].end <= start:
+            first += 1
+        best: Optional[str] = None
+        best_overlap = 0.0
+        position = first
+        while position < len(turns) and turns[position].start < end:
+            turn = turns[position]
+            overlap = min(end, turn.end) - max(start, turn.start)
+            if overlap > best_overlap:
+                best, best_overlap = turn.speaker, overlap
+            position += 1
+        speakers.append(best)
+    return speakers
@@ -0,0 +1,233 @@
+"""Lista de tareas y pendientes consolidada por semana o por mes.
+
+Recorre las notas de ``notes_root/<año>/<mes>`` y junta las secciones "Tareas
+asignadas" y "Pendientes y recordatorios" en una sola nota con casillas de
+verificación. Se leen las notas Markdown (y no el resumen guardado) para
+respetar lo que se haya editado a mano en Obsidian.
+
+Para no volver a leer todo el mes en cada ejecución, se guarda en
+``notes_root/.cache/digest.json`` el hash de cada nota junto con lo extraído:
+solo se interpretan de nuevo las notas nuevas o modificadas. Las casillas que
+se marcaron en el resumen anterior se conservan marcadas.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+
+from .note_writer import write_atomic
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = ".cache/digest.json"
+EMPTY_ITEM = "(Sin información registrada)"
+SECTIONS = {
+    "### Tareas asignadas": "tareas",
+    "### Pendientes y recordatorios": "pendientes",
+}
+
+_NOTE_NAME = re.compile(r"^(\d{4}-\d{2}-\d{2})-.+\.md$")
+_CHECKED_ITEM = re.compile(r"^- \[[xX]\] (.+?)(?: \(\[\[[^\]]+\]\]\))?$")
+
+DIGEST_TEMPLATE = """---
+period: {period}
+from: {date_from}
+to: {date_to}
+lectures: {count}
+---
+
+# Tareas y pendientes - {label}
+
+## Tareas asignadas
+{tareas}
+
+## Pendientes y recordatorios
+{pendientes}
+"""
+
+
+@dataclass
+class NoteItems:
+    """Tareas y pendientes extraídos de una nota."""
+
+    note: str
+    class_date: date
+    tareas: List[str] = field(default_factory=list)
+    pendientes: List[str] = field(default_factory=list)
+
+
+@dataclass
+class DigestReport:
+    """Resultado de generar el resumen del periodo."""
+
+    path: Path
+    notes: int
+    parsed: int
+    changed: bool
+
+
+def month_range(year: int, month: int) -> Tuple[date, date]:
+    start = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return start, following - timedelta(days=1)
+
+
+def week_range(day: date) -> Tuple[date, date]:
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=6)
+
+
+def build_digest(notes_root: Path, date_from: date, date_to: date, weekly: bool) -> DigestReport:
+    """Genera o actualiza el resumen de tareas de un periodo."""
+
+    state_path = notes_root / STATE_PATH
+    state = _load_state(state_path)
+
+    items: List[NoteItems] = []
+    parsed = 0
+    for note_path, class_date in _iter_notes(notes_root, date_from, date_to):
+        key = note_path.relative_to(notes_root).as_posix()
+        stat = note_path.stat()
+        entry = state.get(key)
+        if entry is not None and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            items.append(_items_from_state(key, entry))
+            continue
+
+        data = note_path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry["hash"] == digest:
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            items.append(_items_from_state(key, entry))
+            continue
+
+        note_items = parse_note(key, class_date, data.decode("utf-8"))
+        parsed += 1
+        state[key] = {
+            "hash": digest,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "date": class_date.isoformat(),
+            "tareas": note_items.tareas,
+            "pendientes": note_items.pendientes,
+        }
+        items.append(note_items)
+
+    path = _digest_path(notes_root, date_from, weekly)
+    checked = _checked_items(path)
+    label = f"semana del {date_from.isoformat()}" if weekly else date_from.strftime("%Y-%m")
+    content = DIGEST_TEMPLATE.format(
+        period="semana" if weekly else "mes",
+        date_from=date_from.isoformat(),
+        date_to=date_to.isoformat(),
+        count=len(items),
+        label=label,
+        tareas=_checklist(items, "tareas", checked),
+        pendientes=_checklist(items, "pendientes", checked),
+    )
+    changed = write_atomic(path, [content])
+    write_atomic(state_path, [json.dumps(state, ensure_ascii=False)])
+
+    logger.info(
+        "Resumen de tareas en %s: %d notas, %d interpretadas de nuevo", path, len(items), parsed
+    )
+    return DigestReport(path=path, notes=len(items), parsed=parsed, changed=changed)
+
+
+def parse_note(key: str, class_date: date, content: str) -> NoteItems:
+    """Extrae las listas de tareas y pendientes del Markdown de una nota."""
+
+    items = NoteItems(note=key, class_date=class_date)
+    current = None
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        if line.startswith("#"):
+            current = SECTIONS.get(line)
+            continue
+        if current is None or not line.startswith(("- ", "* ")):
+            continue
+        text = line[2:].strip()
+        if text.startswith("[ ] ") or text.lower().startswith("[x] "):
+            text = text[4:].strip()
+        if text and text != EMPTY_ITEM:
+            getattr(items, current).append(text)
+    return items
+
+
+def _iter_notes(notes_root: Path, date_from: date, date_to: date) -> Iterator[Tuple[Path, date]]:
+    months = sorted({(date_from.year, date_from.month), (date_to.year, date_to.month)})
+    for year, month in months:
+        folder = notes_root / str(year) / f"{month:02d}"
+        if not folder.is_dir():
+            continue
+        for path in sorted(folder.glob("*.md")):
+            match = _NOTE_NAME.match(path.name)
+            if match is None:
+                continue
+            try:
+                class_date = date.fromisoformat(match.group(1))
+            except ValueError:
+                continue
+            if date_from <= class_date <= date_to:
+                yield path, class_date
+
+
+def _digest_path(notes_root: Path, date_from: date, weekly: bool) -> Path:
+    folder = notes_root / str(date_from.year) / f"{date_from.month:02d}"
+    if weekly:
+        year, week, _ = date_from.isocalendar()
+        return folder / f"tareas-{year}-W{week:02d}.md"
+    return folder / f"tareas-{date_from.year}-{date_from.month:02d}.md"
+
+
+def _items_from_state(key: str, entry: Dict[str, object]) -> NoteItems:
+    return NoteItems(
+        note=key,
+        class_date=date.fromisoformat(str(entry["date"])),
+        tareas=list(entry["tareas"]),
+        pendientes=list(entry["pendientes"]),
+    )
+
+
+def _checklist(items: List[NoteItems], kind: str, checked: Set[str]) -> str:
+    lines = []
+    seen: Set[str] = set()
+    for note_items in sorted(items, key=lambda item: (item.class_date, item.note)):
+        link = Path(note_items.note).stem
+        for text in getattr(note_items, kind):
+            normalized = text.casefold()
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            mark = "x" if normalized in checked else " "
+            lines.append(f"- [{mark}] {text} ([[{link}]])")
+    if not lines:
+        return "- (Sin información registrada)"
+    return "\n".join(lines)
+
+
+def _checked_items(path: Path) -> Set[str]:
+    if not path.exists():
+        return set()
+    checked = set()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        match = _CHECKED_ITEM.match(line.strip())
+        if match:
+            checked.add(match.group(1).casefold())
+    return checked
+
+
+def _load_state(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        logger.warning("Se ignora el estado dañado en %s", path)
+        return {}
@@ -0,0 +1,306 @@
+"""Huella acústica para no transcribir dos veces la misma clase.
+
+El mismo audio suele llegar dos veces: como ``.m4a`` y como ``.mp3``, o
+recortado unos segundos al principio o al final. El hash del archivo solo
+detecta copias idénticas, así que además se calcula una huella del sonido:
+el audio se decodifica a 8 kHz, se divide en tramas de ``FRAME_SECONDS`` cada
+``HOP_SECONDS`` y cada trama se resume en 32 bits según cómo cambia la energía
+entre bandas de frecuencia vecinas respecto de la trama anterior (el método de
+Haitsma y Kalker). Recodificar el audio cambia pocos bits; dos clases
+distintas difieren en la mitad.
+
+Las huellas se guardan en ``notes_root/.cache/huellas/`` como archivos
+``uint32`` sin encabezado (unos 290 kB por cada dos horas), junto con un
+``indice.json`` que las asocia a la transcripción de la clase. Para comparar,
+se prueban los desplazamientos de hasta ``MAX_OFFSET_SECONDS`` con una muestra
+de tramas y en el mejor se mide la proporción de bits distintos sobre todo el
+tramo común.
+
+Además se guarda el hash de cada bloque completo de ``BLOCK_SECONDS`` del audio
+decodificado. Algunas grabadoras agregan la continuación de la clase al mismo
+archivo: si los bloques de un audio nuevo empiezan con todos los de uno ya
+transcrito, solo hace falta transcribir lo que se agregó.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .note_writer import write_atomic
+from .transcriber import SAMPLE_RATE, iter_audio_chunks
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = ".cache/huellas"
+INDEX_NAME = "indice.json"
+
+DOWNSAMPLE = 2  # 16 kHz -> 8 kHz; la voz está por debajo de 4 kHz
+FRAME_SECONDS = 0.5
+HOP_SECONDS = 0.1
+BAND_EDGES_HZ = (300.0, 3400.0)
+BITS = 32
+# Hasta cuántos segundos puede estar recortado un audio respecto del otro.
+MAX_OFFSET_SECONDS = 120.0
+# Proporción máxima de bits distintos para considerar dos audios iguales. Una
+# recodificación queda por debajo de 0.2 y dos clases distintas cerca de 0.5.
+MAX_BIT_ERROR_RATE = 0.3
+# El tramo común debe cubrir al menos esta parte del audio más corto.
+MIN_OVERLAP = 0.8
+ALIGNMENT_SAMPLE = 1024
+# Bloques de PCM cuyo hash se compara para detectar audios con contenido agregado.
+BLOCK_SECONDS = 30
+
+
+class FingerprintError(RuntimeError):
+    """Se lanza cuando no se puede calcular la huella de un audio."""
+
+
+@dataclass
+class FingerprintMatch:
+    """Clase ya procesada que coincide con el audio consultado."""
+
+    artifact_path: Path
+    audio_name: str
+    bit_error_rate: float
+    offset_seconds: float
+
+
+@dataclass
+class ResumeMatch:
+    """Clase ya transcrita cuyo audio es el comienzo del audio consultado."""
+
+    artifact_path: Path
+    audio_name: str
+    # Hasta dónde coincide el audio decodificado con el ya transcrito.
+    resume_seconds: float
+
+
+@dataclass
+class AudioPrint:
+    """Huella por tramas y hashes de los bloques completos de un audio."""
+
+    prints: np.ndarray
+    blocks: List[str]
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 del archivo, leído por bloques."""
+
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(audio_path: Path) -> AudioPrint:
+    """Huella ``uint32`` (una por trama) y hashes de bloque, en una sola decodificación."""
+
+    blocks: List[str] = []
+    try:
+        chunks = iter_audio_chunks(audio_path, chunk_seconds=BLOCK_SECONDS)
+        prints = compute_fingerprint(_hash_blocks(chunks, blocks))
+    except Exception as exc:  # noqa: BLE001 - PyAV lanza errores muy variados
+        raise FingerprintError(f"No se pudo decodificar {audio_path}: {exc}") from exc
+    return AudioPrint(prints, blocks)
+
+
+def _hash_blocks(chunks: Iterable[np.ndarray], blocks: List[str]) -> Iterator[np.ndarray]:
+    """Entrega los bloques sin cambios y agrega a ``blocks`` el hash de cada uno completo."""
+
+    size = BLOCK_SECONDS * SAMPLE_RATE
+    for chunk in chunks:
+        if chunk.size == size:
+            blocks.append(hashlib.blake2b(chunk.tobytes(), digest_size=8).hexdigest())
+        yield chunk
+
+
+def compute_fingerprint(chunks: Iterable[np.ndarray]) -> np.ndarray:
+    """Huella de un audio a ``SAMPLE_RATE`` entregado en bloques ``float32``."""
+
+    rate = SAMPLE_RATE // DOWNSAMPLE
+    size = int(FRAME_SECONDS * rate)
+    hop = int(HOP_SECONDS * rate)
+    window = np.hanning(size).astype(np.float32)
+    band_starts = _band_starts(size, rate)
+
+    energies: List[np.ndarray] = []
+    carry = np.zeros(0, dtype=np.float32)
+    odd = np.zeros(0, dtype=np.float32)
+    for chunk in chunks:
+        chunk = np.concatenate([odd, chunk])
+        even = chunk.size - chunk.size % DOWNSAMPLE
+        odd = chunk[even:]
+        samples = np.concatenate([carry, chunk[:even].reshape(-1, DOWNSAMPLE).mean(axis=1)])
+        count = (samples.size - size) // hop + 1
+        if count <= 0:
+            carry = samples
+            continue
+        strides = (samples.strides[0] * hop, samples.strides[0])
+        frames = np.lib.stride_tricks.as_strided(samples, (count, size), strides)
+        spectrum = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        bands = np.add.reduceat(spectrum, band_starts, axis=1)[:, : BITS + 1]
+        energies.append(np.log(bands + 1e-10).astype(np.float32))
+        carry = samples[count * hop :].copy()
+
+    if not energies:
+        return np.zeros(0, dtype=np.uint32)
+    energy = np.concatenate(energies)
+    across = energy[:, :-1] - energy[:, 1:]
+    bits = (across[1:] - across[:-1]) > 0
+    weights = np.left_shift(np.uint64(1), np.arange(BITS, dtype=np.uint64))
+    return (bits.astype(np.uint64) @ weights).astype(np.uint32)
+
+
+def compare(query: np.ndarray, reference: np.ndarray) -> Optional[Tuple[float, float]]:
+    """Proporción de bits distintos y desplazamiento en segundos, o ``None``.
+
+    El desplazamiento indica cuánto más tarde empieza el contenido de
+    ``query`` dentro de ``reference``. Devuelve ``None`` si los audios no se
+    parecen.
+    """
+
+    max_offset = int(MAX_OFFSET_SECONDS / HOP_SECONDS)
+    shorter = min(query.size, reference.size)
+    if shorter == 0:
+        return None
+
+    best_rate, best_offset = 1.0, 0
+    for offset in range(-max_offset, max_offset + 1):
+        rate, overlap = _bit_error_rate(query, reference, offset, ALIGNMENT_SAMPLE)
+        if overlap >= MIN_OVERLAP * shorter and rate < best_rate:
+            best_rate, best_offset = rate, offset
+    rate, overlap = _bit_error_rate(query, reference, best_offset)
+    if overlap < MIN_OVERLAP * shorter or rate > MAX_BIT_ERROR_RATE:
+        return None
+    return rate, best_offset * HOP_SECONDS
+
+
+def _band_starts(size: int, rate: int) -> np.ndarray:
+    """Primer índice de FFT de cada una de las ``BITS + 1`` bandas logarítmicas."""
+
+    frequencies = np.fft.rfftfreq(size, 1 / rate)
+    edges = np.geomspace(*BAND_EDGES_HZ, BITS + 2)
+    return np.searchsorted(frequencies, edges[:-1])
+
+
+def _bit_error_rate(
+    query: np.ndarray, reference: np.ndarray, offset: int, sample: Optional[int] = None
+) -> Tuple[float, int]:
+    if offset >= 0:
+        first, second = query, reference[offset:]
+    else:
+        first, second = query[-offset:], reference
+    overlap = min(first.size, second.size)
+    if overlap == 0:
+        return 1.0, 0
+    first, second = first[:overlap], second[:overlap]
+    if sample and overlap > sample:
+        picked = np.linspace(0, overlap - 1, sample).astype(np.int64)
+        first, second = first[picked], second[picked]
+    differing = np.unpackbits((first ^ second).view(np.uint8)).sum()
+    return float(differing) / (BITS * first.size), overlap
+
+
+class FingerprintIndex:
+    """Huellas de las clases ya transcritas en ``notes_root``."""
+
+    def __init__(self, notes_root: Path) -> None:
+        self.notes_root = notes_root
+        self.folder = notes_root / CACHE_DIRNAME
+        self.index_path = self.folder / INDEX_NAME
+        self._entries: dict = self._load()
+
+    def find(self, audio_hash: str, query: Optional[np.ndarray]) -> Optional[FingerprintMatch]:
+        """Busca el audio por hash exacto y, si se da ``query``, por huella."""
+
+        entry = self._entries.get(audio_hash)
+        if entry is not None and self._artifact(entry).exists():
+            return FingerprintMatch(self._artifact(entry), entry["audio_name"], 0.0, 0.0)
+        if query is None:
+            return None
+
+        best: Optional[FingerprintMatch] = None
+        duration = query.size * HOP_SECONDS
+        for key, entry in self._entries.items():
+            if abs(entry["duration"] - duration) > MAX_OFFSET_SECONDS:
+                continue
+            artifact = self._artifact(entry)
+            reference = self._read(key)
+            if reference is None or not artifact.exists():
+                continue
+            result = compare(query, reference)
+            if result is not None and (best is None or result[0] < best.bit_error_rate):
+                best = FingerprintMatch(artifact, entry["audio_name"], *result)
+        return best
+
+    def find_prefix(self, blocks: List[str]) -> Optional[ResumeMatch]:
+        """Clase ya transcrita cuyos bloques son el comienzo de ``blocks``.
+
+        Solo cuenta si el audio consultado tiene al menos un bloque más; si hay
+        varias, se elige la que cubre más tiempo.
+        """
+
+        best: Optional[ResumeMatch] = None
+        for entry in self._entries.values():
+            previous = entry.get("blocks") or []
+            if not previous or len(previous) >= len(blocks) or blocks[: len(previous)] != previous:
+                continue
+            artifact = self._artifact(entry)
+            resume_seconds = float(len(previous) * BLOCK_SECONDS)
+            if artifact.exists() and (best is None or resume_seconds > best.resume_seconds):
+                best = ResumeMatch(artifact, entry["audio_name"], resume_seconds)
+        return best
+
+    def add(self, audio_hash: str, audio: AudioPrint, artifact_path: Path, audio_name: str) -> None:
+        """Registra la huella de un audio ya transcrito.
+
+        Reemplaza las entradas de otros audios que apuntaban a la misma
+        transcripción (por ejemplo el comienzo de un audio que luego creció).
+        """
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=".huella.", suffix=".tmp", dir=self.folder)
+        with os.fdopen(fd, "wb") as handle:
+            audio.prints.astype("<u4").tofile(handle)
+        os.replace(tmp_name, self.folder / f"{audio_hash}.u32")
+
+        artifact = artifact_path.relative_to(self.notes_root).as_posix()
+        replaced = [
+            key for key, entry in self._entries.items() if entry["artifact"] == artifact and key != audio_hash
+        ]
+        for key in replaced:
+            del self._entries[key]
+            (self.folder / f"{key}.u32").unlink(missing_ok=True)
+        self._entries[audio_hash] = {
+            "artifact": artifact,
+            "audio_name": audio_name,
+            "duration": round(audio.prints.size * HOP_SECONDS, 1),
+            "blocks": audio.blocks,
+        }
+        write_atomic(self.index_path, [json.dumps(self._entries, ensure_ascii=False, indent=2, sort_keys=True)])
+
+    def _artifact(self, entry: dict) -> Path:
+        return self.notes_root / entry["artifact"]
+
+    def _read(self, audio_hash: str) -> Optional[np.ndarray]:
+        path = self.folder / f"{audio_hash}.u32"
+        try:
+            return np.fromfile(path, dtype="<u4")
+        except OSError:
+            return None
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
@@ -6,6 +6,7 @@ import logging
 import os
 import sys
 import threading
+from concurrent.futures import Future
 from datetime import date, datetime
 from pathlib import Path
 from typing import Dict, Optional
@@ -15,15 +16,17 @@ from tkinter import filedialog, messagebox, ttk
 from ttkbootstrap import Style
 
 from .config import get_settings
+from .profiler import run_profiled
 from .services import ServiceManager, ServiceStatus
-from typing import Optional
-
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-
-from .config import get_settings
+from .transcriber import DECODING_PROFILES
 from .workflow import WorkflowResult, run_workflow
 
+PROFILE_LABELS = {
+    "fast": "Rápido (menos preciso)",
+    "balanced": "Equilibrado",
+    "accurate": "Preciso (más lento)",
+}
+
 
 class TextWidgetHandler(logging.Handler):
     """Envía los mensajes de logging a un widget de texto."""
@@ -55,16 +58,19 @@ class NotesApp:
         self.root.geometry("960x640")
         self.root.minsize(920, 620)
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
-        self.root = tk.Tk()
-        self.root.title("Cuaderno automático de clases")
-        self.root.geometry("720x520")
-        self.root.resizable(False, False)
 
         self.audio_path_var = tk.StringVar()
         self.title_var = tk.StringVar()
         self.date_var = tk.StringVar(value=date.today().isoformat())
         self.notes_root_var = tk.StringVar(value=str(self.settings.notes_root))
         self.skip_summary_var = tk.BooleanVar(value=False)
+        self.two_pass_var = tk.BooleanVar(value=self.settings.whisper_two_pass)
+        self.force_var = tk.BooleanVar(value=False)
+        self.profiler_var = tk.BooleanVar(value=False)
+        profile = self.settings.whisper_profile
+        self.profile_var = tk.StringVar(
+            value=PROFILE_LABELS.get(profile, PROFILE_LABELS["balanced"])
+        )
 
         self.progress: Optional[ttk.Progressbar] = None
         self.log_text: Optional[tk.Text] = None
@@ -76,9 +82,6 @@ class NotesApp:
         self._configure_logging()
         self._start_service_checks()
 
-        self._build_ui()
-        self._configure_logging()
-
     def run(self) -> None:
         self.root.mainloop()
 
@@ -121,25 +124,38 @@ class NotesApp:
         self._add_entry(form_card, "Fecha (YYYY-MM-DD)", self.date_var, 2)
         self._add_folder_selector(form_card, "Cuaderno de notas", self.notes_root_var, 3)
 
-        checkbox = ttk.Checkbutton(
+        ttk.Label(form_card, text="Transcripción").grid(row=4, column=0, sticky=tk.W, pady=6)
+        ttk.Combobox(
             form_card,
-        main_frame = ttk.Frame(self.root, padding=20)
-        main_frame.pack(fill=tk.BOTH, expand=True)
-
-        form = ttk.Frame(main_frame)
-        form.pack(fill=tk.X, pady=(0, 20))
-
-        self._add_file_selector(form, "Archivo de audio", self.audio_path_var, 0)
-        self._add_entry(form, "Título de la clase", self.title_var, 1)
-        self._add_entry(form, "Fecha (YYYY-MM-DD)", self.date_var, 2)
-        self._add_folder_selector(form, "Carpeta de notas", self.notes_root_var, 3)
+            textvariable=self.profile_var,
+            values=[PROFILE_LABELS[name] for name in DECODING_PROFILES],
+            state="readonly",
+        ).grid(row=4, column=1, sticky=tk.EW, pady=6)
 
         checkbox = ttk.Checkbutton(
-            form,
+            form_card,
             text="Omitir resumen (solo guardar transcripción)",
             variable=self.skip_summary_var,
         )
-        checkbox.grid(row=4, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
+        checkbox.grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
+
+        ttk.Checkbutton(
+            form_card,
+            text="Mostrar primero un borrador rápido y refinarlo en segundo plano",
+            variable=self.two_pass_var,
+        ).grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=(6, 0))
+
+        ttk.Checkbutton(
+            form_card,
+            text="Transcribir aunque el audio ya se haya procesado",
+            variable=self.force_var,
+        ).grid(row=7, column=0, columnspan=3, sticky=tk.W, pady=(6, 0))
+
+        ttk.Checkbutton(
+            form_card,
+            text="Medir en qué se va el tiempo (guarda un informe junto a la nota)",
+            variable=self.profiler_var,
+        ).grid(row=8, column=0, columnspan=3, sticky=tk.W, pady=(6, 0))
 
         status_card = ttk.Labelframe(
             content,
@@ -157,9 +173,6 @@ class NotesApp:
             action_frame,
             text="Generar apuntes automáticos",
             bootstyle="success",
-        self.run_button = ttk.Button(
-            main_frame,
-            text="Generar apuntes",
             command=self._on_run_clicked,
         )
         self.run_button.pack(fill=tk.X)
@@ -177,19 +190,12 @@ class NotesApp:
             background=self.style.colors.input,
             foreground=self.style.colors.fg,
         )
-        self.progress = ttk.Progressbar(main_frame, mode="indeterminate")
-        self.progress.pack(fill=tk.X, pady=12)
-
-        ttk.Label(main_frame, text="Registro de actividad:").pack(anchor=tk.W)
-        self.log_text = tk.Text(main_frame, height=16, state=tk.DISABLED)
         self.log_text.pack(fill=tk.BOTH, expand=True)
 
     def _add_entry(self, parent: ttk.Frame, label: str, variable: tk.StringVar, row: int) -> None:
         ttk.Label(parent, text=label).grid(row=row, column=0, sticky=tk.W, pady=6)
         entry = ttk.Entry(parent, textvariable=variable)
         entry.grid(row=row, column=1, sticky=tk.EW, pady=6)
-        entry = ttk.Entry(parent, textvariable=variable, width=58)
-        entry.grid(row=row, column=1, sticky=tk.W, pady=6)
 
     def _add_file_selector(
         self, parent: ttk.Frame, label: str, variable: tk.StringVar, row: int
@@ -197,8 +203,6 @@ class NotesApp:
         ttk.Label(parent, text=label).grid(row=row, column=0, sticky=tk.W, pady=6)
         entry = ttk.Entry(parent, textvariable=variable)
         entry.grid(row=row, column=1, sticky=tk.EW, pady=6)
-        entry = ttk.Entry(parent, textvariable=variable, width=58)
-        entry.grid(row=row, column=1, sticky=tk.W, pady=6)
         ttk.Button(parent, text="Buscar", command=self._select_audio).grid(
             row=row, column=2, padx=(10, 0)
         )
@@ -209,8 +213,6 @@ class NotesApp:
         ttk.Label(parent, text=label).grid(row=row, column=0, sticky=tk.W, pady=6)
         entry = ttk.Entry(parent, textvariable=variable)
         entry.grid(row=row, column=1, sticky=tk.EW, pady=6)
-        entry = ttk.Entry(parent, textvariable=variable, width=58)
-        entry.grid(row=row, column=1, sticky=tk.W, pady=6)
         ttk.Button(parent, text="Elegir carpeta", command=self._select_folder).grid(
             row=row, column=2, padx=(10, 0)
         )
@@ -259,6 +261,10 @@ class NotesApp:
         notes_root = Path(self.notes_root_var.get().strip()) if self.notes_root_var.get().strip() else None
         title = self.title_var.get().strip() or audio_path.stem
         skip_summary = self.skip_summary_var.get()
+        profile = self._selected_profile()
+        two_pass = self.two_pass_var.get()
+        force = self.force_var.get()
+        profiler = self.profiler_var.get()
 
         self._clear_log()
         logging.info("Iniciando proceso para %s", audio_path.name)
@@ -266,7 +272,7 @@ class NotesApp:
         self._set_processing_state(True)
         thread = threading.Thread(
             target=self._execute_workflow,
-            args=(audio_path, title, class_date, notes_root, skip_summary),
+            args=(audio_path, title, class_date, notes_root, skip_summary, profile, two_pass, force, profiler),
             daemon=True,
         )
         thread.start()
@@ -278,19 +284,31 @@ class NotesApp:
         class_date: date,
         notes_root: Optional[Path],
         skip_summary: bool,
+        profile: str,
+        two_pass: bool,
+        force: bool,
+        profiler: bool,
     ) -> None:
-        try:
-            result = run_workflow(
+        def run() -> WorkflowResult:
+            return run_workflow(
                 audio_path=audio_path,
                 title=title,
                 class_date=class_date,
                 notes_root=notes_root,
                 skip_summary=skip_summary,
+                profile=profile,
+                two_pass=two_pass,
+                force=force,
             )
+
+        try:
+            result = run_profiled(run) if profiler else run()
         except Exception as exc:  # pragma: no cover - mostrado en la UI
             logging.exception("No se pudo completar el proceso")
             self.root.after(0, lambda: self._show_error(str(exc)))
         else:
+            if result.refinement is not None:
+                result.refinement.add_done_callback(self._on_refinement_done)
             self.root.after(0, lambda: self._show_success(result))
         finally:
             self.root.after(0, lambda: self._set_processing_state(False))
@@ -300,8 +318,11 @@ class NotesApp:
         if self.settings.auto_launch_obsidian:
             obsidian_opened = self.service_manager.open_obsidian()
 
+        heading = "¡Proceso finalizado!"
+        if result.duplicate:
+            heading = "Este audio ya estaba transcrito; se usa la nota existente."
         message = (
-            "¡Proceso finalizado!\n\n"
+            f"{heading}\n\n"
             f"Notas: {result.note_path}\n"
             f"Transcripción completa: {result.transcript_path}\n\n"
         )
@@ -309,11 +330,21 @@ class NotesApp:
             message += "Obsidian se abrió con tu cuaderno."
         else:
             message += "Abre tu cuaderno en Obsidian para complementar los apuntes."
-            "Puedes abrir la carpeta de notas en Obsidian para revisar y complementar tus apuntes."
-        )
+        if result.refinement is not None and not result.refinement.done():
+            message += (
+                "\n\nEs un borrador: la transcripción definitiva se está generando en segundo plano "
+                "y reemplazará la nota al terminar."
+            )
         messagebox.showinfo("Automatización completada", message)
         self._open_folder(result.note_path.parent)
 
+    def _on_refinement_done(self, refinement: Future[WorkflowResult]) -> None:
+        exc = refinement.exception()
+        if exc is not None:
+            logging.error("No se pudo refinar la transcripción; se conserva el borrador: %s", exc)
+        else:
+            logging.info("Transcripción refinada lista en %s", refinement.result().transcript_path)
+
     def _show_error(self, message: str) -> None:
         messagebox.showerror("Ocurrió un problema", message)
 
@@ -325,7 +356,7 @@ class NotesApp:
             self.run_button.configure(state=tk.DISABLED, text="Trabajando...")
             self.progress.start(10)
         else:
-            self.run_button.configure(state=tk.NORMAL, text="Generar apuntes")
+            self.run_button.configure(state=tk.NORMAL, text="Generar apuntes automáticos")
             self.progress.stop()
 
     def _configure_logging(self) -> None:
@@ -342,7 +373,7 @@ class NotesApp:
         root_logger.addHandler(handler)
         root_logger.setLevel(logging.INFO)
         logging.info(
-            "Todo listo. Selecciona tu archivo de audio y pulsa 'Generar apuntes' para comenzar."
+            "Todo listo. Selecciona tu archivo de audio y pulsa 'Generar apuntes automáticos' para comenzar."
         )
 
     def _build_status_panel(self, parent: ttk.Frame) -> None:
@@ -416,6 +447,13 @@ class NotesApp:
         self.service_manager.shutdown()
         self.root.destroy()
 
+    def _selected_profile(self) -> str:
+        label = self.profile_var.get()
+        for name, profile_label in PROFILE_LABELS.items():
+            if profile_label == label:
+                return name
+        return self.settings.whisper_profile
+
     @staticmethod
     def _parse_date(value: str) -> date:
         return datetime.strptime(value, "%Y-%m-%d").date()
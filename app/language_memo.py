@@ -0,0 +1,52 @@
+"""Recuerda el idioma de cada asignatura para no detectarlo en cada audio.
+
+El idioma de un curso no cambia entre clases, así que se guarda en
+``notes_root/.cache/idiomas.json`` asociado al slug del título la primera vez
+que Whisper lo detecta y se reutiliza en las siguientes transcripciones.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from .note_writer import write_atomic
+
+logger = logging.getLogger(__name__)
+
+MEMO_PATH = ".cache/idiomas.json"
+
+
+def remembered_language(notes_root: Path, slug: str) -> Optional[str]:
+    """Idioma guardado para la asignatura ``slug``, si existe."""
+
+    return _load(notes_root / MEMO_PATH).get(slug)
+
+
+def remember_language(notes_root: Path, slug: str, language: str) -> None:
+    """Guarda ``language`` como idioma de la asignatura ``slug``.
+
+    Lee y reescribe el archivo entero: con varias ejecuciones a la vez hay que
+    llamarla bajo el candado compartido de ``app.workflow``.
+    """
+
+    path = notes_root / MEMO_PATH
+    memo = _load(path)
+    if memo.get(slug) == language:
+        return
+    memo[slug] = language
+    write_atomic(path, [json.dumps(memo, ensure_ascii=False, indent=2, sort_keys=True)])
+    logger.info("Idioma '%s' guardado para las clases de '%s'", language, slug)
+
+
+def _load(path: Path) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as exc:
+        logger.warning("Se ignora la memoria de idiomas en %s: %s", path, exc)
+        return {}
+    return {str(key): str(value) for key, value in data.items()} if isinstance(data, dict) else {}
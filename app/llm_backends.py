@@ -0,0 +1,174 @@
+"""Servidores de lenguaje con los que se generan los resúmenes.
+
+``LLM_BACKEND`` elige la implementación:
+
+- ``lmstudio`` (por defecto): cualquier servidor compatible con la API de chat
+  de OpenAI, como LM Studio.
+- ``llamacpp``: el servidor de llama.cpp. Usa la misma API de chat, pero además
+  pide salida en JSON con gramática, cuenta tokens con ``/tokenize`` y siempre
+  reutiliza la caché del prompt.
+- ``stub``: un servidor simulado y determinista dentro del mismo proceso (ver
+  ``app.llm_stub``), para probar y medir el flujo completo sin modelo.
+
+Las tres reciben la URL y el modelo de ``LM_STUDIO_BASE_URL`` y
+``LM_STUDIO_MODEL``.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional
+
+import requests
+
+from .config import Settings
+from .llm_stub import StubLLMServer, shared_stub
+from .prompt_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackendError(RuntimeError):
+    """Se lanza cuando el servidor de lenguaje no responde como se espera."""
+
+
+class LLMBackend:
+    """Servidor de chat con una API compatible con la de OpenAI."""
+
+    name = "lmstudio"
+    title = "LM Studio"
+
+    def __init__(self, base_url: str, model: str, cache_prompt: bool = False) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.cache_prompt = cache_prompt
+
+    def chat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 800,
+        timeout: float = 120,
+    ) -> str:
+        """Texto de la respuesta del modelo a la conversación."""
+
+        payload = self._payload(system_prompt, user_prompt, temperature, max_tokens)
+        try:
+            response = requests.post(f"{self.base_url}/chat/completions", json=payload, timeout=timeout)
+        except requests.RequestException as exc:
+            raise LLMBackendError(f"No se pudo contactar a {self.title}: {exc}") from exc
+        if response.status_code != 200:
+            raise LLMBackendError(f"Error {response.status_code}: {response.text}")
+
+        try:
+            body = response.json()
+            content = body["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as exc:
+            raise LLMBackendError(f"Respuesta inesperada de {self.title}: {response.text[:200]}") from exc
+        _log_timings(body.get("timings"))
+        return content.strip()
+
+    def count_tokens(self, text: str) -> Optional[int]:
+        """Tokens de ``text`` según el servidor, o ``None`` si no lo informa."""
+
+        return None
+
+    def is_ready(self, timeout: float = 5) -> bool:
+        try:
+            response = requests.get(f"{self.base_url}/models", timeout=timeout)
+        except requests.RequestException:
+            return False
+        return response.status_code == 200
+
+    def _payload(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": _messages(system_prompt, user_prompt),
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if self.cache_prompt:
+            payload["cache_prompt"] = True
+        return payload
+
+
+class LlamaCppBackend(LLMBackend):
+    """Servidor de llama.cpp (``llama-server``)."""
+
+    name = "llamacpp"
+    title = "llama.cpp"
+
+    def __init__(self, base_url: str, model: str) -> None:
+        super().__init__(base_url, model, cache_prompt=True)
+
+    def count_tokens(self, text: str) -> Optional[int]:
+        try:
+            response = requests.post(f"{self._root}/tokenize", json={"content": text}, timeout=10)
+            response.raise_for_status()
+            return len(response.json()["tokens"])
+        except (requests.RequestException, ValueError, KeyError, TypeError) as exc:
+            raise LLMBackendError(f"No se pudieron contar los tokens: {exc}") from exc
+
+    def _payload(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> dict:
+        payload = super()._payload(system_prompt, user_prompt, temperature, max_tokens)
+        if max_tokens > 1:
+            # llama.cpp restringe la salida con una gramática de JSON.
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    @property
+    def _root(self) -> str:
+        return self.base_url[: -len("/v1")] if self.base_url.endswith("/v1") else self.base_url
+
+
+class StubBackend(LLMBackend):
+    """Servidor simulado del proceso; no necesita red ni modelo."""
+
+    name = "stub"
+    title = "servidor simulado"
+
+    def __init__(self, server: StubLLMServer, cache_prompt: bool = True) -> None:
+        super().__init__(server.base_url, "stub", cache_prompt=cache_prompt)
+        self.server = server
+
+    def count_tokens(self, text: str) -> Optional[int]:
+        return estimate_tokens(text)
+
+
+BACKENDS = ("lmstudio", "llamacpp", "stub")
+
+
+def get_backend(settings: Settings) -> LLMBackend:
+    """Servidor de lenguaje configurado en ``LLM_BACKEND``."""
+
+    if settings.llm_backend == "llamacpp":
+        return LlamaCppBackend(settings.lm_studio_base_url, settings.lm_studio_model)
+    if settings.llm_backend == "stub":
+        server = shared_stub(latency_ms=settings.llm_stub_latency_ms, slots=settings.llm_stub_slots)
+        return StubBackend(server, cache_prompt=settings.lm_studio_cache_prompt)
+    if settings.llm_backend != "lmstudio":
+        logger.warning("LLM_BACKEND desconocido '%s'; se usa lmstudio", settings.llm_backend)
+    return LLMBackend(
+        settings.lm_studio_base_url, settings.lm_studio_model, cache_prompt=settings.lm_studio_cache_prompt
+    )
+
+
+def _messages(system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _log_timings(timings: object) -> None:
+    """Registra el *prefill* que informa llama.cpp (LM Studio no lo incluye)."""
+
+    if not isinstance(timings, dict) or "prompt_n" not in timings:
+        return
+    logger.info(
+        "Prefill: %d tokens nuevos en %.0f ms (%d reutilizados de la caché)",
+        timings["prompt_n"],
+        timings.get("prompt_ms", 0.0),
+        timings.get("cache_n", 0),
+    )
@@ -0,0 +1,196 @@
+"""Servidor de chat simulado que corre dentro del mismo proceso.
+
+Responde en ``/v1/chat/completions`` con el mismo formato que LM Studio, pero
+sin modelo: para cada clave que el prompt de sistema pide entre comillas
+simples (``'tareas'``, ``'temas'``...) devuelve unas frases tomadas del mensaje
+del usuario, siempre las mismas para el mismo prompt. Sirve para probar y
+medir todo el flujo sin LM Studio (``LLM_BACKEND=stub``).
+
+La latencia se puede simular con un costo fijo por petición y otro por cada
+token del prompt que no esté en la caché; como en llama.cpp, con
+``cache_prompt`` solo se cobra lo que difiere de la petición anterior. La
+cantidad de peticiones atendidas a la vez se limita con ``slots``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from .prompt_budget import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+ITEMS_PER_KEY = 3
+WORDS_PER_ITEM = 12
+
+_KEYS = re.compile(r"'(\w+)'")
+_WORDS = re.compile(r"\w+")
+
+
+@dataclass
+class StubStats:
+    """Contadores acumulados del servidor simulado."""
+
+    requests: int = 0
+    processed_tokens: int = 0
+    cached_tokens: int = 0
+    prefill_seconds: float = 0.0
+
+
+class StubLLMServer:
+    """Servidor HTTP simulado en un hilo del proceso actual."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        prefill_ms_per_token: float = 0.0,
+        slots: int = 1,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.stats = StubStats()
+        self._last_prompt = ""
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, slots))
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="llm-simulado", daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = StubStats()
+            self._last_prompt = ""
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def complete(self, payload: dict) -> dict:
+        """Respuesta de ``/chat/completions`` para ``payload``."""
+
+        messages: List[Dict[str, str]] = payload.get("messages", [])
+        # Plantilla de chat al estilo ChatML: el prefijo común se conserva
+        # mientras los primeros mensajes sean idénticos.
+        prompt = "".join(f"<|{m['role']}|>\n{m['content']}<|end|>\n" for m in messages)
+        with self._slots:
+            with self._lock:
+                shared = _common_prefix(prompt, self._last_prompt) if payload.get("cache_prompt") else 0
+                self._last_prompt = prompt
+                total = estimate_tokens(prompt)
+                cached = min(total, shared // CHARS_PER_TOKEN)
+                prefill = (total - cached) * self.prefill_ms_per_token / 1000
+                self.stats.requests += 1
+                self.stats.processed_tokens += total - cached
+                self.stats.cached_tokens += cached
+                self.stats.prefill_seconds += prefill
+            time.sleep(self.latency_ms / 1000 + prefill)
+
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        content = json.dumps(_answer(system, user), ensure_ascii=False)
+        if payload.get("max_tokens") == 1:
+            content = content[:1]
+        return {
+            "object": "chat.completion",
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+            "timings": {"prompt_n": total - cached, "prompt_ms": prefill * 1000, "cache_n": cached},
+        }
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - nombre impuesto por http.server
+                if self.path.rstrip("/") == "/v1/models":
+                    self._send({"object": "list", "data": [{"id": "stub", "object": "model"}]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self) -> None:  # noqa: N802
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length))
+                except json.JSONDecodeError:
+                    self.send_error(400)
+                    return
+                if self.path.rstrip("/") == "/v1/chat/completions":
+                    self._send(stub.complete(payload))
+                elif self.path.rstrip("/") == "/tokenize":
+                    self._send({"tokens": list(range(estimate_tokens(payload.get("content", ""))))})
+                else:
+                    self.send_error(404)
+
+            def _send(self, data: dict) -> None:
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:  # noqa: A002
+                logger.debug("Simulado %s", format % args)
+
+        return Handler
+
+
+_shared: Optional[StubLLMServer] = None
+_shared_lock = threading.Lock()
+
+
+def shared_stub(latency_ms: float = 0.0, slots: int = 1) -> StubLLMServer:
+    """Servidor simulado del proceso; se crea con la primera llamada."""
+
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = StubLLMServer(latency_ms=latency_ms, slots=slots)
+            logger.info("Servidor de chat simulado en %s", _shared.base_url)
+        return _shared
+
+
+def _answer(system_prompt: str, user_prompt: str) -> Dict[str, List[str]]:
+    keys = list(dict.fromkeys(_KEYS.findall(system_prompt))) or ["respuesta"]
+    words = _WORDS.findall(user_prompt)
+    seed = int(hashlib.sha256(user_prompt.encode("utf-8")).hexdigest()[:8], 16)
+    answer: Dict[str, List[str]] = {}
+    for key_index, key in enumerate(keys):
+        items = []
+        for item in range(ITEMS_PER_KEY):
+            if not words:
+                break
+            start = seed + (key_index * ITEMS_PER_KEY + item) * WORDS_PER_ITEM
+            count = min(WORDS_PER_ITEM, len(words))
+            items.append(" ".join(words[(start + offset) % len(words)] for offset in range(count)))
+        answer[key] = items
+    return answer
+
+
+def _common_prefix(first: str, second: str) -> int:
+    limit = min(len(first), len(second))
+    low, high = 0, limit
+    # Búsqueda binaria sobre la igualdad de prefijos: comparar cadenas es
+    # mucho más rápido que avanzar carácter por carácter en Python.
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
@@ -0,0 +1,340 @@
+"""Control de la memoria: cuánto ocupa cada etapa y si una clase nueva cabe.
+
+Pensado para computadoras de 16 GB donde LM Studio y la interfaz comparten la
+memoria con Whisper:
+
+- ``StageMemory`` muestrea en segundo plano la memoria residente (RSS) del
+  proceso y guarda el máximo de cada etapa en las métricas
+  (``transcription_rss_mb``, ``peak_rss_mb``...);
+- ``admit_job`` estima el pico de una clase antes de empezarla (lo que ya
+  ocupa el proceso, los modelos que falta cargar y el audio decodificado) y la
+  rechaza con ``MemoryBudgetError`` si supera ``MEMORY_BUDGET_MB``, después de
+  liberar los modelos que no necesita (``WorkflowPool`` hace lo mismo con
+  la suma de las clases que corren a la vez en sus procesos);
+- ``watch_idle_models`` libera los modelos de Whisper que llevan
+  ``WHISPER_IDLE_UNLOAD_SECONDS`` sin usarse.
+
+Sin ``psutil``: la memoria se lee de ``/proc`` en Linux, con
+``GetProcessMemoryInfo`` en Windows y, en otros sistemas, solo el máximo de
+``getrusage``.
+"""
+
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import sys
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+from .config import Settings
+from .transcriber import loaded_models, unload_models
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Memoria residente aproximada (MB) de un modelo en CPU, incluido el
+# decodificador. Los tamaños desconocidos usan ``DEFAULT_MODEL_MEMORY_MB``.
+MODEL_MEMORY_MB = {
+    "tiny": 400,
+    "base": 550,
+    "small": 1100,
+    "medium": 2400,
+    "large-v1": 4200,
+    "large-v2": 4200,
+    "large-v3": 4200,
+    "large-v3-turbo": 2600,
+    "turbo": 2600,
+    "distil-large-v3": 2600,
+}
+DEFAULT_MODEL_MEMORY_MB = 2400
+# Parte de la memoria libre que se deja usar; el resto queda para el sistema y
+# LM Studio.
+MEMORY_BUDGET = 0.75
+# faster-whisper tiene el audio completo en float32 (unos 230 MB por hora) y,
+# con el filtro de voz, una segunda copia con los tramos con voz.
+AUDIO_MEMORY_MB_PER_HOUR = 500
+SAMPLE_INTERVAL = 0.25
+
+
+class MemoryBudgetError(RuntimeError):
+    """Se lanza cuando una clase no cabe en la memoria disponible."""
+
+
+def model_memory_mb(model_size: str) -> int:
+    """Memoria estimada de un modelo, aceptando nombres como ``Systran/faster-whisper-small``."""
+
+    name = model_size.rsplit("/", 1)[-1].lower()
+    if name.startswith("faster-whisper-"):
+        name = name[len("faster-whisper-") :]
+    return MODEL_MEMORY_MB.get(name, DEFAULT_MODEL_MEMORY_MB)
+
+
+def available_memory_mb() -> Optional[int]:
+    """Memoria física disponible, o ``None`` si no se puede averiguar."""
+
+    if sys.platform == "win32":
+        return _windows_available_memory_mb()
+    try:
+        pages = os.sysconf("SC_AVPHYS_PAGES")
+        page_size = os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+    if pages <= 0 or page_size <= 0:
+        return None
+    return pages * page_size // MB
+
+
+def rss_mb() -> Optional[float]:
+    """Memoria residente actual del proceso, o ``None`` si no se puede medir."""
+
+    if sys.platform == "win32":
+        return _windows_rss_mb()
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            resident = int(handle.read().split()[1])
+        return resident * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError, IndexError):
+        return _max_rss_mb()
+
+
+def audio_memory_mb(audio_seconds: Optional[float]) -> float:
+    """Memoria estimada del audio decodificado de una clase de ``audio_seconds``."""
+
+    return (audio_seconds or 0.0) / 3600 * AUDIO_MEMORY_MB_PER_HOUR
+
+
+def memory_budget_mb(settings: Settings) -> Optional[float]:
+    """Límite para el proceso: ``MEMORY_BUDGET_MB`` o, si es 0, lo que ya ocupa más parte de la libre."""
+
+    if settings.memory_budget_mb:
+        return float(settings.memory_budget_mb)
+    available = available_memory_mb()
+    current = rss_mb()
+    if available is None or current is None:
+        return None
+    return current + available * MEMORY_BUDGET
+
+
+def admit_job(
+    settings: Settings, models: Mapping[str, Path], audio_seconds: Optional[float]
+) -> Optional[float]:
+    """Comprueba que una clase quepa en memoria y devuelve el pico estimado en MB.
+
+    ``models`` son los modelos que usará (tamaño → carpeta). Si no cabe, antes
+    de rechazarla se liberan los demás modelos cargados.
+    """
+
+    budget = memory_budget_mb(settings)
+    projected = _projected_peak(models, audio_seconds)
+    if budget is None or projected is None or projected <= budget:
+        return projected
+
+    released = unload_models(keep=models.values())
+    if released:
+        _release_memory()
+        logger.info("Se liberaron %d modelos de Whisper para hacer lugar", len(released))
+        budget = memory_budget_mb(settings) or budget
+        projected = _projected_peak(models, audio_seconds) or projected
+    if projected > budget:
+        raise MemoryBudgetError(
+            f"La clase necesitaría unos {projected:.0f} MB y el límite es {budget:.0f} MB. "
+            "Cierra otras aplicaciones, usa un modelo de Whisper más pequeño o ajusta MEMORY_BUDGET_MB."
+        )
+    return projected
+
+
+class StageMemory:
+    """Pico de memoria residente de cada etapa de ``run_workflow``.
+
+    Cada ``mark`` cierra una etapa: su pico es el máximo observado desde la
+    marca anterior. Un único hilo por proceso muestrea la memoria para todas
+    las ejecuciones en curso; si una termina con una excepción sin llamar a
+    ``finish``, simplemente deja de muestrearse cuando se libera.
+    """
+
+    def __init__(self) -> None:
+        self.peaks: Dict[str, float] = {}
+        current = rss_mb()
+        self.enabled = current is not None
+        self._peak = current or 0.0
+        self._overall = self._peak
+        self._lock = threading.Lock()
+        if self.enabled:
+            _start_sampler()
+            _monitors.add(self)
+
+    def mark(self, stage: str) -> None:
+        if not self.enabled:
+            return
+        current = rss_mb() or 0.0
+        with self._lock:
+            self.peaks[stage] = max(self._peak, current)
+            self._overall = max(self._overall, self.peaks[stage])
+            self._peak = current
+
+    def finish(self, metrics: Dict[str, float]) -> None:
+        """Deja de muestrear y agrega los picos a ``metrics``."""
+
+        if not self.enabled:
+            return
+        _monitors.discard(self)
+        with self._lock:
+            for stage, peak in self.peaks.items():
+                metrics[f"{stage}_rss_mb"] = peak
+            metrics["peak_rss_mb"] = max(self._overall, self._peak)
+
+    def observe(self, current: float) -> None:
+        with self._lock:
+            self._peak = max(self._peak, current)
+
+
+_monitors: weakref.WeakSet[StageMemory] = weakref.WeakSet()
+_sampler: Optional[threading.Thread] = None
+_sampler_lock = threading.Lock()
+# Los hilos de fondo esperan con un ``Event`` que nunca se activa en lugar de
+# ``time.sleep``, para que el perfilador (``app.profiler``) los vea ociosos.
+_never = threading.Event()
+
+
+def _start_sampler() -> None:
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample, name="memoria", daemon=True)
+            _sampler.start()
+
+
+def _sample() -> None:
+    while True:
+        _never.wait(SAMPLE_INTERVAL)
+        monitors = list(_monitors)
+        if not monitors:
+            continue
+        current = rss_mb()
+        if current is not None:
+            for monitor in monitors:
+                monitor.observe(current)
+
+
+_watcher: Optional[threading.Thread] = None
+_watcher_lock = threading.Lock()
+
+
+def watch_idle_models(idle_seconds: float) -> None:
+    """Libera en segundo plano los modelos sin usar desde hace ``idle_seconds`` (0 = nunca).
+
+    Se puede llamar varias veces: solo arranca un hilo por proceso.
+    """
+
+    global _watcher
+    if idle_seconds <= 0:
+        return
+    with _watcher_lock:
+        if _watcher is not None:
+            return
+        _watcher = threading.Thread(
+            target=_unload_idle_models, args=(idle_seconds,), name="modelos-inactivos", daemon=True
+        )
+        _watcher.start()
+
+
+def _unload_idle_models(idle_seconds: float) -> None:
+    while True:
+        _never.wait(min(60.0, max(1.0, idle_seconds / 4)))
+        unloaded = unload_models(idle_seconds=idle_seconds)
+        if unloaded:
+            _release_memory()
+            logger.info(
+                "Se liberó el modelo de Whisper %s tras %.0f s sin uso",
+                ", ".join(path.name for path in unloaded),
+                idle_seconds,
+            )
+
+
+def _projected_peak(models: Mapping[str, Path], audio_seconds: Optional[float]) -> Optional[float]:
+    current = rss_mb()
+    if current is None:
+        return None
+    loaded = set(loaded_models())
+    missing = sum(model_memory_mb(size) for size, path in models.items() if path not in loaded)
+    return current + missing + audio_memory_mb(audio_seconds)
+
+
+def _release_memory() -> None:
+    """Recolecta los objetos liberados y, con glibc, devuelve al sistema la memoria libre."""
+
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            import ctypes
+
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+def _max_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KB y macOS en bytes.
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+def _windows_rss_mb() -> Optional[float]:
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(ProcessMemoryCounters)
+    get_process = ctypes.windll.kernel32.GetCurrentProcess
+    get_process.restype = wintypes.HANDLE
+    get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+    if not get_info(get_process(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize / MB
+
+
+def _windows_available_memory_mb() -> Optional[int]:
+    import ctypes
+
+    class MemoryStatus(ctypes.Structure):
+        _fields_ = [
+            ("dwLength", ctypes.c_ulong),
+            ("dwMemoryLoad", ctypes.c_ulong),
+            ("ullTotalPhys", ctypes.c_ulonglong),
+            ("ullAvailPhys", ctypes.c_ulonglong),
+            ("ullTotalPageFile", ctypes.c_ulonglong),
+            ("ullAvailPageFile", ctypes.c_ulonglong),
+            ("ullTotalVirtual", ctypes.c_ulonglong),
+            ("ullAvailVirtual", ctypes.c_ulonglong),
+            ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+        ]
+
+    status = MemoryStatus()
+    status.dwLength = ctypes.sizeof(MemoryStatus)
+    if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+        return None
+    return status.ullAvailPhys // MB
@@ -0,0 +1,180 @@
+"""Descarga y verificación de los modelos de Whisper en una carpeta local.
+
+Los modelos se guardan en ``WHISPER_MODELS_DIR`` (una subcarpeta por tamaño)
+junto con un manifiesto que registra el tamaño y el SHA-256 de cada archivo.
+La transcripción solo carga modelos desde esa carpeta: si falta alguno se
+descarga antes de usarlo, salvo en modo sin conexión (``WHISPER_OFFLINE``),
+donde se informa con un error qué comando ejecutar. ``python main.py models``
+permite descargarlos por adelantado (por ejemplo al construir la imagen de
+Docker) y comprobar cuánto tarda cada uno en cargar.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from faster_whisper import download_model
+
+from .config import Settings
+from .fingerprint import file_hash
+from .note_writer import write_atomic
+from .transcriber import PROBE_MODEL_SIZE, get_decoding_profile, load_model, unload_models
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifiesto.json"
+REQUIRED_FILES = ("model.bin", "config.json", "tokenizer.json")
+
+
+class ModelError(RuntimeError):
+    """Se lanza cuando un modelo no está disponible localmente o está incompleto."""
+
+
+@dataclass
+class ModelCheck:
+    """Resultado de la comprobación previa de un modelo."""
+
+    model_size: str
+    path: Path
+    load_seconds: float
+
+
+def model_dir(models_root: Path, model_size: str) -> Path:
+    """Carpeta del modelo; ``Systran/faster-whisper-small`` queda como ``Systran--faster-whisper-small``."""
+
+    return models_root / model_size.replace("/", "--")
+
+
+def provision_model(model_size: str, models_root: Path) -> Path:
+    """Descarga ``model_size`` a su carpeta local, la verifica y escribe el manifiesto."""
+
+    target = model_dir(models_root, model_size)
+    target.mkdir(parents=True, exist_ok=True)
+    logger.info("Descargando el modelo de Whisper '%s' en %s...", model_size, target)
+    try:
+        download_model(model_size, output_dir=str(target))
+    except Exception as exc:  # noqa: BLE001 - huggingface_hub lanza errores muy variados
+        raise ModelError(f"No se pudo descargar el modelo '{model_size}': {exc}") from exc
+
+    _check_files(target)
+    files = {
+        path.name: {"bytes": path.stat().st_size, "sha256": file_hash(path)}
+        for path in sorted(target.iterdir())
+        if path.is_file() and path.name != MANIFEST_NAME
+    }
+    manifest = {"model": model_size, "files": files}
+    write_atomic(target / MANIFEST_NAME, [json.dumps(manifest, ensure_ascii=False, indent=2)])
+    logger.info("Modelo '%s' listo (%.0f MB)", model_size, sum(f["bytes"] for f in files.values()) / 1e6)
+    return target
+
+
+def verify_model(path: Path, deep: bool = False) -> None:
+    """Comprueba que la carpeta tenga el modelo completo.
+
+    Sin ``deep`` solo se comparan los tamaños con el manifiesto; con ``deep``
+    se recalcula además el SHA-256 de cada archivo.
+    """
+
+    _check_files(path)
+    manifest_path = path / MANIFEST_NAME
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as exc:
+        raise ModelError(f"{path} no tiene un manifiesto válido; vuelve a descargar el modelo") from exc
+
+    files: Dict[str, dict] = manifest.get("files", {})
+    for name, expected in files.items():
+        file_path = path / name
+        if not file_path.is_file() or file_path.stat().st_size != expected.get("bytes"):
+            raise ModelError(f"{file_path} falta o está incompleto; vuelve a descargar el modelo")
+        if deep and file_hash(file_path) != expected.get("sha256"):
+            raise ModelError(f"{file_path} no coincide con el manifiesto; vuelve a descargar el modelo")
+
+
+def resolve_model(settings: Settings, model_size: str) -> Path:
+    """Carpeta local con el modelo ``model_size``, descargándolo si hace falta.
+
+    ``model_size`` también puede ser una carpeta con un modelo ya convertido,
+    que se usa tal cual. En modo sin conexión nunca se descarga nada.
+    """
+
+    explicit = Path(model_size).expanduser()
+    if explicit.is_dir():
+        return explicit
+
+    target = model_dir(settings.whisper_models_dir, model_size)
+    try:
+        verify_model(target)
+        return target
+    except ModelError as exc:
+        if settings.whisper_offline:
+            raise ModelError(
+                f"El modelo '{model_size}' no está disponible en {settings.whisper_models_dir} "
+                f"y WHISPER_OFFLINE está activo. Descárgalo con conexión usando "
+                f"'python main.py models download {model_size}'. ({exc})"
+            ) from exc
+        logger.warning("El modelo '%s' no está en la carpeta local: %s", model_size, exc)
+    return provision_model(model_size, settings.whisper_models_dir)
+
+
+def configured_models(settings: Settings) -> List[str]:
+    """Modelos que puede necesitar la configuración actual, sin repetir."""
+
+    sizes = [settings.whisper_model_size]
+    if settings.whisper_two_pass:
+        sizes.append(settings.whisper_draft_model_size)
+    if settings.whisper_language_probe and not settings.whisper_language:
+        sizes.append(PROBE_MODEL_SIZE)
+    return list(dict.fromkeys(sizes))
+
+
+def preflight(
+    settings: Settings, model_sizes: Sequence[str], device: str = "cpu"
+) -> List[ModelCheck]:
+    """Verifica a fondo cada modelo y mide cuánto tarda en cargar."""
+
+    decoding = get_decoding_profile(settings.whisper_profile)
+    compute_type = settings.whisper_compute_type or decoding.compute_type
+    checks = []
+    for model_size in model_sizes:
+        path = resolve_model(settings, model_size)
+        if (path / MANIFEST_NAME).exists():
+            verify_model(path, deep=True)
+        started = time.perf_counter()
+        load_model(path, device, compute_type, settings.whisper_cpu_threads)
+        checks.append(ModelCheck(model_size, path, time.perf_counter() - started))
+        unload_models()
+    return checks
+
+
+def warm_up_model(
+    settings: Settings, profile: Optional[str] = None, device: str = "cpu", model_size: Optional[str] = None
+) -> float:
+    """Carga un modelo (por defecto el principal) en la caché de ``load_model`` y devuelve los segundos.
+
+    Usa los mismos parámetros que ``run_workflow``, así que la primera
+    transcripción encuentra el modelo ya cargado.
+    """
+
+    decoding = get_decoding_profile(profile or settings.whisper_profile)
+    started = time.perf_counter()
+    load_model(
+        resolve_model(settings, model_size or settings.whisper_model_size),
+        device,
+        settings.whisper_compute_type or decoding.compute_type,
+        settings.whisper_cpu_threads or decoding.cpu_threads,
+    )
+    return time.perf_counter() - started
+
+
+def _check_files(path: Path) -> None:
+    missing = [name for name in REQUIRED_FILES if not (path / name).is_file()]
+    if not any(path.glob("vocabulary.*")):
+        missing.append("vocabulary.*")
+    if missing:
+        raise ModelError(f"Faltan archivos del modelo en {path}: {', '.join(missing)}")
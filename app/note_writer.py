@@ -2,13 +2,29 @@
 
 from __future__ import annotations
 
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator, Optional
 
+from .search_index import INDEX_FILENAME, SearchIndexError, update_note_index
 from .summarizer import Summary
-from .transcriber import Segment, segments_to_markdown
+from .transcriber import Segment, SegmentStore, iter_markdown_rows
+
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+# Valores de ``AUDIO_LINK``: cómo llevar el audio junto a la transcripción
+# para que los tiempos de la tabla sean enlaces que se pueden reproducir.
+AUDIO_LINK_MODES = ("none", "copy", "symlink")
 
 
 @dataclass
@@ -17,6 +33,9 @@ class NotePaths:
 
     note_path: Path
     transcript_path: Path
+    artifact_path: Path
+    summary_path: Path
+    index_path: Path
 
 
 NOTE_TEMPLATE = """---
@@ -48,6 +67,8 @@ duration_minutes: {duration:.2f}
 El detalle por segmentos se encuentra en el archivo relacionado: [[{transcript_rel}]].
 """
 
+ARTIFACT_SUFFIX = "-transcripcion.jsonl"
+
 TRANSCRIPT_TEMPLATE = """# Transcripción - {title} ({date_human})
 
 Archivo de audio: {audio_name}
@@ -58,6 +79,14 @@ Duración: {duration:.2f} minutos
 """
 
 
+def slugify(value: str) -> str:
+    """Convierte un título en el fragmento usado para nombrar los archivos."""
+
+    normalized = value.strip().lower().replace(" ", "-")
+    allowed = [c for c in normalized if c.isalnum() or c in {"-", "_"}]
+    return "".join(allowed) or "clase"
+
+
 def prepare_paths(notes_root: Path, class_date: date, slug: str) -> NotePaths:
     """Crea las carpetas necesarias y devuelve las rutas de nota y transcripción."""
 
@@ -67,12 +96,26 @@ def prepare_paths(notes_root: Path, class_date: date, slug: str) -> NotePaths:
     month_folder.mkdir(parents=True, exist_ok=True)
     transcripts_folder.mkdir(parents=True, exist_ok=True)
 
-    note_filename = f"{class_date.isoformat()}-{slug}.md"
-    transcript_filename = f"{class_date.isoformat()}-{slug}-transcripcion.md"
+    return _build_paths(month_folder, f"{class_date.isoformat()}-{slug}")
+
+
+def paths_from_artifact(artifact_path: Path) -> NotePaths:
+    """Reconstruye las rutas de una nota a partir de su archivo ``.jsonl``."""
+
+    if not artifact_path.name.endswith(ARTIFACT_SUFFIX):
+        raise ValueError(f"{artifact_path} no es un archivo de transcripción")
+    stem = artifact_path.name[: -len(ARTIFACT_SUFFIX)]
+    return _build_paths(artifact_path.parent.parent, stem)
 
+
+def _build_paths(month_folder: Path, stem: str) -> NotePaths:
+    transcripts_folder = month_folder / "transcripciones"
     return NotePaths(
-        note_path=month_folder / note_filename,
-        transcript_path=transcripts_folder / transcript_filename,
+        note_path=month_folder / f"{stem}.md",
+        transcript_path=transcripts_folder / f"{stem}-transcripcion.md",
+        artifact_path=transcripts_folder / f"{stem}{ARTIFACT_SUFFIX}",
+        summary_path=transcripts_folder / f"{stem}-resumen.json",
+        index_path=month_folder.parent.parent / INDEX_FILENAME,
     )
 
 
@@ -86,9 +129,133 @@ def write_note(
     language: str,
     duration_minutes: float,
 ) -> None:
-    """Escribe la nota y el archivo de transcripción detallado."""
+    """Escribe la nota y el archivo de transcripción detallado.
+
+    También actualiza el índice de búsqueda del vault con los segmentos y el
+    resumen de la nota.
+    """
+
+    if not isinstance(segments, SegmentStore):
+        segments = SegmentStore(segments)
+
+    note_content = render_note(
+        paths, summary, class_date, title, audio_name, language, duration_minutes
+    )
+    transcript_chunks = iter_transcript(
+        segments,
+        class_date,
+        title,
+        audio_name,
+        language,
+        duration_minutes,
+        audio_link=audio_link(paths, audio_name),
+    )
+
+    for path, chunks in ((paths.note_path, [note_content]), (paths.transcript_path, transcript_chunks)):
+        if not write_atomic(path, chunks):
+            logger.debug("%s no cambió; se conserva el archivo existente", path)
+
+    index_note(paths, summary, segments, class_date, title)
+
+
+def index_note(
+    paths: NotePaths,
+    summary: Summary,
+    segments: Iterable[Segment],
+    class_date: date,
+    title: str,
+) -> None:
+    """Actualiza el índice de búsqueda; un fallo aquí no impide guardar la nota."""
+
+    try:
+        update_note_index(
+            paths.index_path,
+            paths.note_path,
+            paths.transcript_path,
+            title,
+            class_date,
+            summary,
+            segments,
+        )
+    except (SearchIndexError, sqlite3.Error) as exc:
+        logger.warning("No se pudo actualizar el índice de búsqueda: %s", exc)
+
+
+def write_atomic(path: Path, chunks: Iterable[str]) -> bool:
+    """Escribe un archivo de texto de forma atómica y devuelve si cambió.
+
+    El contenido se vuelca por partes a un archivo temporal en la misma
+    carpeta; si su hash coincide con el del archivo existente se descarta y la
+    fecha de modificación no cambia (Obsidian no vuelve a indexar la nota). En
+    caso contrario se sincroniza a disco y se renombra sobre el destino, de
+    modo que nadie observa nunca un archivo a medio escribir.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    tmp_path = Path(tmp_name)
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as handle:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                digest.update(data)
+                handle.write(data)
+            handle.flush()
+
+            if path.exists() and _file_digest(path) == digest.digest():
+                unchanged = True
+            else:
+                unchanged = False
+                os.fsync(handle.fileno())
+
+        if unchanged:
+            tmp_path.unlink()
+            return False
+
+        mode = stat.S_IMODE(path.stat().st_mode) if path.exists() else 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    _fsync_directory(path.parent)
+    return True
+
+
+def _file_digest(path: Path) -> bytes:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _fsync_directory(folder: Path) -> None:
+    """Persiste el renombrado en sistemas POSIX; en Windows no es necesario."""
 
-    note_content = NOTE_TEMPLATE.format(
+    if os.name != "posix":
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def render_note(
+    paths: NotePaths,
+    summary: Summary,
+    class_date: date,
+    title: str,
+    audio_name: str,
+    language: str,
+    duration_minutes: float,
+) -> str:
+    """Genera el contenido Markdown de la nota principal."""
+
+    return NOTE_TEMPLATE.format(
         date_iso=class_date.isoformat(),
         title=title,
         audio_name=audio_name,
@@ -102,17 +269,94 @@ def write_note(
         transcript_rel=paths.transcript_path.name,
     )
 
-    transcript_content = TRANSCRIPT_TEMPLATE.format(
-        title=title,
-        date_human=class_date.strftime("%d de %B de %Y"),
-        audio_name=audio_name,
-        language=language,
-        duration=duration_minutes,
-        table=segments_to_markdown(segments),
+
+def render_transcript(
+    segments: Iterable[Segment],
+    class_date: date,
+    title: str,
+    audio_name: str,
+    language: str,
+    duration_minutes: float,
+    audio_link: Optional[str] = None,
+) -> str:
+    """Genera el contenido Markdown del archivo de transcripción."""
+
+    return "".join(
+        iter_transcript(
+            segments, class_date, title, audio_name, language, duration_minutes, audio_link=audio_link
+        )
     )
 
-    paths.note_path.write_text(note_content, encoding="utf-8")
-    paths.transcript_path.write_text(transcript_content, encoding="utf-8")
+
+def iter_transcript(
+    segments: Iterable[Segment],
+    class_date: date,
+    title: str,
+    audio_name: str,
+    language: str,
+    duration_minutes: float,
+    audio_link: Optional[str] = None,
+) -> Iterator[str]:
+    """Genera el archivo de transcripción por partes, fila a fila.
+
+    Evita construir en memoria una cadena con la tabla completa, que en
+    grabaciones de varias horas ocupa varios megabytes. Con ``audio_link``
+    (el audio relativo a la transcripción) los tiempos enlazan al audio.
+    """
+
+    head, tail = TRANSCRIPT_TEMPLATE.split("{table}")
+    fields = {
+        "title": title,
+        "date_human": class_date.strftime("%d de %B de %Y"),
+        "audio_name": audio_name,
+        "language": language,
+        "duration": duration_minutes,
+    }
+    yield head.format(**fields)
+    for index, row in enumerate(iter_markdown_rows(segments, audio_link)):
+        yield row if index == 0 else "\n" + row
+    yield tail.format(**fields)
+
+
+def audio_link(paths: NotePaths, audio_name: str) -> Optional[str]:
+    """Destino de los enlaces de tiempo: el audio, solo si está junto a la transcripción."""
+
+    return audio_name if (paths.transcript_path.parent / audio_name).is_file() else None
+
+
+def place_audio(paths: NotePaths, audio_path: Path, mode: str) -> Optional[Path]:
+    """Copia o enlaza el audio junto a la transcripción según ``mode`` (``AUDIO_LINK``).
+
+    Con ``none`` no hace nada. Si ya hay un archivo con el mismo nombre y
+    tamaño se conserva. Un error (por ejemplo, Windows sin permiso para crear
+    enlaces simbólicos) solo se informa: la transcripción sale sin enlaces.
+    """
+
+    if mode == "none":
+        return None
+    if mode not in AUDIO_LINK_MODES:
+        logger.warning("AUDIO_LINK=%s no es válido (opciones: %s)", mode, ", ".join(AUDIO_LINK_MODES))
+        return None
+
+    target = paths.transcript_path.parent / audio_path.name
+    try:
+        if target.exists():
+            if target.samefile(audio_path) or (
+                mode == "copy" and not target.is_symlink() and target.stat().st_size == audio_path.stat().st_size
+            ):
+                return target
+        if target.is_symlink() or target.exists():
+            target.unlink()
+        if mode == "symlink":
+            target.symlink_to(audio_path.resolve())
+        else:
+            temporary = target.with_name(f".{target.name}.tmp")
+            shutil.copy2(audio_path, temporary)
+            os.replace(temporary, target)
+    except OSError as exc:
+        logger.warning("No se pudo dejar el audio junto a la transcripción (%s): %s", mode, exc)
+        return None
+    return target
 
 
 def _list_to_markdown(items: Iterable[str]) -> str:
@@ -0,0 +1,193 @@
+"""Perfilador por muestreo para saber en qué se va el tiempo de una clase.
+
+Un hilo aparte toma, cada ``interval`` segundos, la pila de Python de todos los
+hilos del proceso (``sys._current_frames``) y cuenta cuántas veces aparece
+cada una. No instrumenta las funciones, así que el costo no depende de cuántas
+llamadas haga el flujo: con el intervalo por defecto queda muy por debajo del
+5 % y el informe indica cuánto fue.
+
+El código nativo (la decodificación de PyAV, CTranslate2) no tiene pila de
+Python propia: su tiempo se atribuye a la función de Python que lo llamó. Los
+hilos ociosos (esperando trabajo en una cola o un ``Event``) se descartan;
+los que esperan una respuesta HTTP se conservan, porque esa espera es parte
+del tiempo de la clase.
+
+Al terminar se escriben junto a la nota dos archivos:
+
+- ``<nota>.profile.folded``: pilas colapsadas (``hilo;f1;f2 muestras``), el
+  formato de ``flamegraph.pl``, speedscope o inferno;
+- ``<nota>.profile.txt``: las funciones con más muestras, propias y totales.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .note_writer import write_atomic
+from .workflow import WorkflowResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.01
+TOP_FUNCTIONS = 25
+
+# Una pila cuya última función está en alguno de estos módulos es un hilo
+# esperando trabajo, no trabajando.
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "concurrent/futures/thread.py")
+
+Stack = Tuple[str, ...]
+
+
+class SamplingProfiler:
+    """Muestrea las pilas de todos los hilos mientras está activo."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL) -> None:
+        self.interval = interval
+        self.samples: Counter[Stack] = Counter()
+        self.sampling_seconds = 0.0
+        self.elapsed = 0.0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="perfilador", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed = time.perf_counter() - self._started
+
+    def __enter__(self) -> SamplingProfiler:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def overhead(self) -> float:
+        """Fracción del tiempo que el hilo de muestreo tuvo el GIL."""
+
+        return self.sampling_seconds / self.elapsed if self.elapsed else 0.0
+
+    def collapsed(self) -> Iterable[str]:
+        """Líneas en formato de pilas colapsadas, de la más frecuente a la menos."""
+
+        for stack, count in self.samples.most_common():
+            yield f"{';'.join(stack)} {count}\n"
+
+    def report(self, top: int = TOP_FUNCTIONS) -> Iterable[str]:
+        """Informe de texto con las ``top`` funciones con más muestras."""
+
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            # Una función recursiva cuenta una sola vez por muestra.
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        total = sum(self.samples.values()) or 1
+
+        yield f"Perfil por muestreo: {self.elapsed:.1f} s, {total} muestras cada {1000 * self.interval:.0f} ms\n"
+        yield f"Costo del muestreo: {self.sampling_seconds:.2f} s ({100 * self.overhead:.1f} %)\n"
+        for heading, counter in (("Tiempo propio", own), ("Tiempo total (incluye lo que llama)", inclusive)):
+            yield f"\n{heading}:\n"
+            yield f"{'muestras':>9} {'%':>6}  función\n"
+            for label, count in counter.most_common(top):
+                yield f"{count:>9} {100 * count / total:>6.1f}  {label}\n"
+
+    def write_reports(self, note_path: Path, top: int = TOP_FUNCTIONS) -> Tuple[Path, Path]:
+        """Guarda las pilas colapsadas y el informe junto a ``note_path``."""
+
+        folded = note_path.with_name(f"{note_path.stem}.profile.folded")
+        text = note_path.with_name(f"{note_path.stem}.profile.txt")
+        write_atomic(folded, self.collapsed())
+        write_atomic(text, self.report(top))
+        logger.info(
+            "Perfil guardado en %s (costo del muestreo: %.1f %%)", text, 100 * self.overhead
+        )
+        return folded, text
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = self._stack(frame)
+                if stack and not stack[-1].endswith(_IDLE_FILES):
+                    self.samples[(names.get(thread_id, "hilo"), *stack)] += 1
+            self.sampling_seconds += time.perf_counter() - started
+
+    def _stack(self, frame: Optional[FrameType]) -> Stack:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f"{code.co_name} {_short_path(code.co_filename)}"
+            labels.append(label)
+            frame = frame.f_back
+        return tuple(reversed(labels))
+
+
+def run_profiled(
+    run: Callable[[], WorkflowResult],
+    interval: float = DEFAULT_INTERVAL,
+    top: int = TOP_FUNCTIONS,
+) -> WorkflowResult:
+    """Ejecuta ``run`` (una llamada a ``run_workflow``) bajo el perfilador.
+
+    Los informes se guardan junto a la nota. Si queda una segunda pasada en
+    segundo plano, el muestreo sigue hasta que termine.
+    """
+
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        result = run()
+    except BaseException:
+        profiler.stop()
+        raise
+
+    def finish(_refinement=None) -> None:
+        profiler.stop()
+        try:
+            profiler.write_reports(result.note_path, top)
+        except OSError as exc:
+            logger.warning("No se pudo guardar el perfil: %s", exc)
+
+    if result.refinement is None:
+        finish()
+    else:
+        result.refinement.add_done_callback(finish)
+    return result
+
+
+def _short_path(filename: str) -> str:
+    """Ruta desde el paquete (``app/workflow.py``, ``faster_whisper/transcribe.py``)."""
+
+    parts = Path(filename).parts
+    for marker in ("site-packages", "dist-packages", "lib", "Lib"):
+        if marker in parts:
+            parts = parts[len(parts) - parts[::-1].index(marker) :]
+            break
+    else:
+        parts = parts[-2:]
+    return "/".join(parts) if parts else filename
@@ -0,0 +1,120 @@
+"""Medición del prompt en tokens y compresión de la transcripción.
+
+LM Studio corre en CPU y el tiempo de *prefill* crece con cada token del
+prompt, así que antes de pedir el resumen se mide cuánto ocupa. Los tokens los
+cuenta el servidor cuando puede (llama.cpp, con ``/tokenize``); si no, se
+estiman a partir de la cantidad de caracteres. Cuando el prompt supera el presupuesto, la
+transcripción se comprime por etapas, de la que menos información quita a la
+que más:
+
+1. se unen las palabras repetidas seguidas ("que que que"), se descartan los
+   segmentos formados solo por muletillas y los que repiten uno reciente (los
+   bucles en los que cae Whisper con el silencio);
+2. se descartan los segmentos de baja confianza, si la transcripción tiene
+   marcas por palabra.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional
+
+from .transcriber import SegmentStore
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+FILLERS = frozenset(
+    {"a", "ah", "aja", "bueno", "eh", "em", "emm", "este", "mm", "mmm", "o", "ok", "okay", "pues", "sea", "y"}
+)
+# Un segmento igual a alguno de los últimos ``DUPLICATE_WINDOW`` se descarta.
+DUPLICATE_WINDOW = 3
+# Confianza media por palabra por debajo de la cual se descarta un segmento.
+LOW_CONFIDENCE = 0.45
+
+_REPEATED_WORDS = re.compile(r"\b(\w+)(?:[\s,.]+\1\b)+", re.IGNORECASE)
+_WORDS = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens aproximados de ``text`` sin consultar al servidor."""
+
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class TokenCounter:
+    """Cuenta tokens con el tokenizador del servidor o, si no lo hay, estimando.
+
+    ``backend`` es un ``LLMBackend`` (o ``None`` para estimar siempre). Si el
+    servidor no sabe contar tokens se recuerda y no se vuelve a intentar.
+    """
+
+    def __init__(self, backend: Optional[Any] = None) -> None:
+        self.backend = backend
+
+    @property
+    def exact(self) -> bool:
+        return self.backend is not None
+
+    def count(self, text: str) -> int:
+        if self.backend is None:
+            return estimate_tokens(text)
+        try:
+            tokens = self.backend.count_tokens(text)
+        except RuntimeError as exc:
+            logger.info("El servidor no pudo contar tokens (%s); se estimarán", exc)
+            tokens = None
+        if tokens is None:
+            self.backend = None
+            return estimate_tokens(text)
+        return tokens
+
+
+def compress_transcript(segments: SegmentStore, fits: Callable[[str], bool]) -> str:
+    """Transcripción con las etapas de compresión necesarias para que ``fits`` la acepte.
+
+    Devuelve el resultado de la última etapa aunque siga sin caber.
+    """
+
+    lines = _drop_repetitions(segments)
+    text = " ".join(lines[index] for index in sorted(lines))
+    if fits(text) or not segments.has_words:
+        return text
+
+    confident = {
+        index: line for index, line in lines.items() if _confidence(segments, index) >= LOW_CONFIDENCE
+    }
+    logger.info("Se descartan %d segmentos de baja confianza", len(lines) - len(confident))
+    return " ".join(confident[index] for index in sorted(confident))
+
+
+def _drop_repetitions(segments: SegmentStore) -> Dict[int, str]:
+    """Texto de cada segmento que se conserva, por índice, sin palabras repetidas."""
+
+    kept: Dict[int, str] = {}
+    recent: List[str] = []
+    for index, segment in enumerate(segments):
+        text = _REPEATED_WORDS.sub(r"\1", segment.text).strip()
+        words = [_normalize(word) for word in _WORDS.findall(text)]
+        if not words or all(word in FILLERS for word in words):
+            continue
+        key = " ".join(words)
+        if key in recent:
+            continue
+        recent = [*recent[-(DUPLICATE_WINDOW - 1) :], key]
+        kept[index] = text
+    return kept
+
+
+def _confidence(segments: SegmentStore, index: int) -> float:
+    words = segments.words(index)
+    if not words:
+        return 1.0
+    return sum(word.probability for word in words) / len(words)
+
+
+def _normalize(word: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
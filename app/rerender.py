@@ -0,0 +1,168 @@
+"""Regeneración masiva de notas a partir de los archivos auxiliares guardados."""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .artifacts import ArtifactError, TranscriptArtifact, load_summary_artifact, load_transcript_artifact
+from .note_writer import (
+    ARTIFACT_SUFFIX,
+    NotePaths,
+    audio_link,
+    index_note,
+    iter_transcript,
+    paths_from_artifact,
+    render_note,
+    write_atomic,
+)
+from .semantic_index import Embedder, SemanticIndex
+from .summarizer import Summary
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RerenderReport:
+    """Conteo de archivos procesados durante la regeneración."""
+
+    written: List[Path] = field(default_factory=list)
+    unchanged: int = 0
+    failed: List[Path] = field(default_factory=list)
+
+
+def iter_artifacts(notes_root: Path) -> Iterator[Path]:
+    """Recorre ``notes_root/<año>/<mes>/transcripciones`` buscando transcripciones guardadas."""
+
+    pattern = f"[0-9][0-9][0-9][0-9]/[0-9][0-9]/transcripciones/*{ARTIFACT_SUFFIX}"
+    yield from sorted(notes_root.glob(pattern))
+
+
+def rerender_vault(notes_root: Path, workers: Optional[int] = None) -> RerenderReport:
+    """Vuelve a escribir todas las notas del vault con las plantillas actuales.
+
+    Solo se reescriben los archivos cuyo contenido cambia; el resto conserva su
+    fecha de modificación.
+    """
+
+    report = RerenderReport()
+    artifacts = list(iter_artifacts(notes_root))
+    if not artifacts:
+        logger.warning("No se encontraron transcripciones guardadas en %s", notes_root)
+        return report
+
+    logger.info("Regenerando %d notas en %s", len(artifacts), notes_root)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for artifact_path, outcome in zip(artifacts, executor.map(_rerender_one, artifacts)):
+            if outcome is None:
+                report.failed.append(artifact_path)
+                continue
+            for path, changed in outcome.items():
+                if changed:
+                    report.written.append(path)
+                else:
+                    report.unchanged += 1
+
+    logger.info(
+        "Regeneración terminada: %d archivos actualizados, %d sin cambios, %d con errores",
+        len(report.written),
+        report.unchanged,
+        len(report.failed),
+    )
+    return report
+
+
+def _rerender_one(artifact_path: Path) -> Optional[Dict[Path, bool]]:
+    paths = paths_from_artifact(artifact_path)
+    try:
+        artifact = load_transcript_artifact(artifact_path)
+        summary = load_summary_artifact(paths.summary_path) if paths.summary_path.exists() else None
+    except (ArtifactError, OSError, ValueError) as exc:
+        logger.error("No se pudo leer %s: %s", artifact_path, exc)
+        return None
+
+    try:
+        return _render_artifact(paths, artifact, summary)
+    except Exception as exc:  # noqa: BLE001 - una nota defectuosa no detiene el resto
+        # Una plantilla editada a mano (un campo que no existe, sin ``{table}``...)
+        # falla aquí; se informa y se sigue con las demás notas.
+        logger.error("No se pudo regenerar %s: %s", artifact_path, exc)
+        return None
+
+
+def _render_artifact(
+    paths: NotePaths, artifact: TranscriptArtifact, summary: Optional[Summary]
+) -> Dict[Path, bool]:
+    transcription = artifact.transcription
+    duration_minutes = transcription.duration / 60
+    outcome: Dict[Path, bool] = {}
+
+    transcript_chunks = iter_transcript(
+        transcription.segments,
+        artifact.class_date,
+        artifact.title,
+        artifact.audio_name,
+        transcription.language,
+        duration_minutes,
+        audio_link=audio_link(paths, artifact.audio_name),
+    )
+    outcome[paths.transcript_path] = write_atomic(paths.transcript_path, transcript_chunks)
+
+    if summary is None:
+        # Sin el resumen guardado no se puede reconstruir la nota sin perder
+        # información, así que se deja como está.
+        logger.warning("No hay resumen guardado para %s; se conserva la nota", paths.note_path)
+        return outcome
+
+    note_content = render_note(
+        paths,
+        summary,
+        artifact.class_date,
+        artifact.title,
+        artifact.audio_name,
+        transcription.language,
+        duration_minutes,
+    )
+    outcome[paths.note_path] = write_atomic(paths.note_path, [note_content])
+    index_note(paths, summary, transcription.segments, artifact.class_date, artifact.title)
+    return outcome
+
+
+def reindex_vault(notes_root: Path, embed: Optional[Embedder] = None) -> int:
+    """Reconstruye los índices de búsqueda desde los archivos auxiliares del vault.
+
+    Si se indica ``embed`` también se actualiza el índice semántico. Las notas
+    sin cambios se omiten gracias al hash guardado en cada índice, así que
+    ejecutarlo de nuevo es barato. Devuelve la cantidad de notas leídas.
+    """
+
+    semantic = SemanticIndex(notes_root) if embed is not None else None
+    count = 0
+    for artifact_path in iter_artifacts(notes_root):
+        paths = paths_from_artifact(artifact_path)
+        if not paths.summary_path.exists():
+            continue
+        try:
+            artifact = load_transcript_artifact(artifact_path)
+            summary = load_summary_artifact(paths.summary_path)
+        except (ArtifactError, OSError, ValueError) as exc:
+            logger.error("No se pudo leer %s: %s", artifact_path, exc)
+            continue
+        index_note(
+            paths, summary, artifact.transcription.segments, artifact.class_date, artifact.title
+        )
+        if semantic is not None:
+            semantic.update_note(
+                paths.note_path,
+                paths.transcript_path,
+                artifact.title,
+                artifact.class_date,
+                artifact.transcription.segments,
+                embed,
+            )
+        count += 1
+    logger.info("Índice de búsqueda revisado para %d notas", count)
+    return count
@@ -0,0 +1,226 @@
+"""Índice de búsqueda de texto completo (SQLite FTS5) sobre el vault de notas.
+
+Cada nota aporta un pasaje por segmento de la transcripción, con sus tiempos en
+milisegundos, y uno por cada elemento de las listas del resumen. El índice vive
+en ``notes_root/.indice-busqueda.sqlite3`` (Obsidian ignora los archivos que
+empiezan con punto) y se actualiza de forma incremental desde ``write_note``:
+si el contenido de una nota no cambió, no se toca.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Collection, Iterable, List, Optional
+
+from .summarizer import Summary
+from .transcriber import Segment
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".indice-busqueda.sqlite3"
+
+SUMMARY_KINDS = ("avance_clase", "tareas", "pendientes", "preguntas_examen")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    note TEXT NOT NULL UNIQUE,
+    transcript TEXT NOT NULL,
+    title TEXT NOT NULL,
+    class_date TEXT NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS passages (
+    id INTEGER PRIMARY KEY,
+    note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    start_ms INTEGER,
+    end_ms INTEGER,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS passages_note ON passages(note_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+    text,
+    content='passages',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS passages_ai AFTER INSERT ON passages BEGIN
+    INSERT INTO passages_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS passages_ad AFTER DELETE ON passages BEGIN
+    INSERT INTO passages_fts(passages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+class SearchIndexError(RuntimeError):
+    """Se lanza cuando el índice no se puede abrir o consultar."""
+
+
+@dataclass
+class SearchHit:
+    """Pasaje que coincide con una búsqueda."""
+
+    note_path: Path
+    transcript_path: Path
+    title: str
+    class_date: date
+    kind: str
+    start_ms: Optional[int]
+    end_ms: Optional[int]
+    text: str
+    snippet: str
+
+    @property
+    def link(self) -> str:
+        """Enlace de Obsidian al archivo donde aparece el pasaje."""
+
+        target = self.transcript_path if self.kind == "segmento" else self.note_path
+        return f"[[{target.stem}]]"
+
+
+def index_path_for(notes_root: Path) -> Path:
+    return notes_root / INDEX_FILENAME
+
+
+def update_note_index(
+    index_path: Path,
+    note_path: Path,
+    transcript_path: Path,
+    title: str,
+    class_date: date,
+    summary: Summary,
+    segments: Iterable[Segment],
+) -> bool:
+    """Agrega o reemplaza los pasajes de una nota. Devuelve si hubo cambios."""
+
+    root = index_path.parent
+    note_key = note_path.relative_to(root).as_posix()
+    transcript_key = transcript_path.relative_to(root).as_posix()
+
+    rows = [
+        ("segmento", round(s.start * 1000), round(s.end * 1000), s.text)
+        for s in segments
+        if s.text
+    ]
+    for kind in SUMMARY_KINDS:
+        for item in getattr(summary, kind):
+            if item and item.strip():
+                rows.append((kind, None, None, item.strip()))
+
+    digest = hashlib.sha256()
+    digest.update(f"{title}\0{class_date.isoformat()}\0".encode("utf-8"))
+    for row in rows:
+        digest.update(repr(row).encode("utf-8"))
+    content_hash = digest.hexdigest()
+
+    with closing(_connect(index_path)) as connection, connection:
+        current = connection.execute(
+            "SELECT id, content_hash FROM notes WHERE note = ?", (note_key,)
+        ).fetchone()
+        if current is not None and current[1] == content_hash:
+            return False
+        if current is not None:
+            connection.execute("DELETE FROM passages WHERE note_id = ?", (current[0],))
+            connection.execute("DELETE FROM notes WHERE id = ?", (current[0],))
+
+        cursor = connection.execute(
+            "INSERT INTO notes (note, transcript, title, class_date, content_hash) VALUES (?, ?, ?, ?, ?)",
+            (note_key, transcript_key, title, class_date.isoformat(), content_hash),
+        )
+        note_id = cursor.lastrowid
+        connection.executemany(
+            "INSERT INTO passages (note_id, kind, start_ms, end_ms, text) VALUES (?, ?, ?, ?, ?)",
+            ((note_id, *row) for row in rows),
+        )
+
+    logger.debug("Índice de búsqueda actualizado para %s (%d pasajes)", note_key, len(rows))
+    return True
+
+
+def search(
+    index_path: Path,
+    query: str,
+    limit: int = 20,
+    notes: Optional[Collection[Path]] = None,
+    match_any: bool = False,
+) -> List[SearchHit]:
+    """Busca ``query`` en el índice y devuelve los pasajes ordenados por relevancia.
+
+    Por defecto exige todas las palabras; con ``match_any`` basta con una. Con
+    ``notes`` la búsqueda se limita a esas notas.
+    """
+
+    if not index_path.exists():
+        raise SearchIndexError(
+            f"No existe el índice {index_path}. Procesa un audio o ejecuta 'search --reindex'."
+        )
+
+    match = _to_match_expression(query, " OR " if match_any else " ")
+    if not match:
+        return []
+
+    root = index_path.parent
+    sql = """
+        SELECT n.note, n.transcript, n.title, n.class_date, p.kind, p.start_ms, p.end_ms, p.text,
+               snippet(passages_fts, 0, '**', '**', '…', 16)
+        FROM passages_fts
+        JOIN passages AS p ON p.id = passages_fts.rowid
+        JOIN notes AS n ON n.id = p.note_id
+        WHERE passages_fts MATCH ?
+    """
+    params: list = [match]
+    if notes is not None:
+        keys = [path.relative_to(root).as_posix() for path in notes]
+        if not keys:
+            return []
+        sql += f" AND n.note IN ({', '.join('?' for _ in keys)})"
+        params.extend(keys)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+
+    with closing(_connect(index_path)) as connection:
+        rows = connection.execute(sql, params).fetchall()
+
+    return [
+        SearchHit(
+            note_path=root / note,
+            transcript_path=root / transcript,
+            title=title,
+            class_date=date.fromisoformat(class_date),
+            kind=kind,
+            start_ms=start_ms,
+            end_ms=end_ms,
+            text=text,
+            snippet=snippet,
+        )
+        for note, transcript, title, class_date, kind, start_ms, end_ms, text, snippet in rows
+    ]
+
+
+def _to_match_expression(query: str, separator: str = " ") -> str:
+    """Convierte texto libre en una expresión FTS5 con cada palabra entre comillas.
+
+    Con el separador por defecto se exigen todas las palabras; ``" OR "``
+    acepta pasajes que contengan cualquiera de ellas.
+    """
+
+    terms = [term.replace('"', '""') for term in query.split()]
+    return separator.join(f'"{term}"' for term in terms if term)
+
+
+def _connect(index_path: Path) -> sqlite3.Connection:
+    try:
+        connection = sqlite3.connect(index_path, timeout=30)
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.executescript(_SCHEMA)
+    except sqlite3.OperationalError as exc:
+        raise SearchIndexError(f"No se pudo abrir el índice de búsqueda: {exc}") from exc
+    return connection
@@ -0,0 +1,371 @@
+"""Índice vectorial para búsquedas semánticas entre todas las transcripciones.
+
+Las transcripciones se dividen en fragmentos de unos cientos de caracteres y se
+convierten en vectores con el endpoint ``/embeddings`` de LM Studio, enviando
+los textos por lotes. Los vectores normalizados se guardan como una matriz
+``float32`` sin encabezado en ``notes_root/.indice-semantico/vectores.f32``,
+que se abre con ``numpy.memmap``; la búsqueda es un producto punto exacto sobre
+toda la matriz seguido de una selección top-k.
+
+Las actualizaciones solo agregan filas al final. Cuando una nota se vuelve a
+indexar, sus filas anteriores quedan fuera del rango vigente registrado en el
+manifiesto y se ignoran; el archivo se compacta cuando las filas obsoletas
+superan la mitad del total.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import requests
+
+from .transcriber import Segment
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIRNAME = ".indice-semantico"
+CHUNK_CHARS = 600
+EMBEDDING_BATCH_SIZE = 32
+
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+
+class SemanticIndexError(RuntimeError):
+    """Se lanza cuando no se pueden calcular o consultar los vectores."""
+
+
+@dataclass
+class Chunk:
+    """Fragmento de transcripción que se representa con un vector."""
+
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class SemanticHit:
+    """Fragmento cercano a la consulta."""
+
+    note_path: Path
+    transcript_path: Path
+    title: str
+    class_date: date
+    start: float
+    end: float
+    text: str
+    score: float
+
+    @property
+    def link(self) -> str:
+        return f"[[{self.transcript_path.stem}]]"
+
+
+def lm_studio_embedder(
+    base_url: str, model: str, batch_size: int = EMBEDDING_BATCH_SIZE, timeout: float = 120
+) -> Embedder:
+    """Crea una función que obtiene vectores de LM Studio en lotes."""
+
+    url = f"{base_url}/embeddings"
+
+    def embed(texts: Sequence[str]) -> np.ndarray:
+        vectors: List[List[float]] = []
+        for offset in range(0, len(texts), batch_size):
+            batch = list(texts[offset : offset + batch_size])
+            try:
+                response = requests.post(url, json={"model": model, "input": batch}, timeout=timeout)
+            except requests.RequestException as exc:
+                raise SemanticIndexError(f"No se pudo contactar a LM Studio: {exc}") from exc
+            if response.status_code != 200:
+                raise SemanticIndexError(f"Error {response.status_code}: {response.text}")
+            data = sorted(response.json()["data"], key=lambda item: item["index"])
+            vectors.extend(item["embedding"] for item in data)
+        return np.asarray(vectors, dtype=np.float32)
+
+    return embed
+
+
+def chunk_segments(segments: Iterable[Segment], max_chars: int = CHUNK_CHARS) -> List[Chunk]:
+    """Agrupa segmentos consecutivos en fragmentos de tamaño similar."""
+
+    chunks: List[Chunk] = []
+    texts: List[str] = []
+    length = 0
+    start = end = 0.0
+    for segment in segments:
+        if not segment.text:
+            continue
+        if not texts:
+            start = segment.start
+        texts.append(segment.text)
+        length += len(segment.text) + 1
+        end = segment.end
+        if length >= max_chars:
+            chunks.append(Chunk(start=start, end=end, text=" ".join(texts)))
+            texts, length = [], 0
+    if texts:
+        chunks.append(Chunk(start=start, end=end, text=" ".join(texts)))
+    return chunks
+
+
+class SemanticIndex:
+    """Matriz de vectores en disco con metadatos por fila."""
+
+    def __init__(self, notes_root: Path) -> None:
+        self.notes_root = notes_root
+        self.folder = notes_root / INDEX_DIRNAME
+        self.vectors_path = self.folder / "vectores.f32"
+        self.rows_path = self.folder / "fragmentos.jsonl"
+        self.manifest_path = self.folder / "manifiesto.json"
+        self.manifest = self._load_manifest()
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def update_note(
+        self,
+        note_path: Path,
+        transcript_path: Path,
+        title: str,
+        class_date: date,
+        segments: Iterable[Segment],
+        embed: Embedder,
+    ) -> bool:
+        """Agrega los fragmentos de una nota si cambiaron desde la última vez."""
+
+        note_key = note_path.relative_to(self.notes_root).as_posix()
+        chunks = chunk_segments(segments)
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(f"{chunk.start:.3f}\0{chunk.text}\0".encode("utf-8"))
+        content_hash = digest.hexdigest()
+
+        notes = self.manifest["notes"]
+        current = notes.get(note_key)
+        if current is not None and current["hash"] == content_hash:
+            return False
+        if not chunks:
+            notes.pop(note_key, None)
+            self._save_manifest()
+            return current is not None
+
+        vectors = _normalize(embed([chunk.text for chunk in chunks]))
+        if vectors.shape[0] != len(chunks):
+            raise SemanticIndexError("LM Studio devolvió una cantidad inesperada de vectores")
+        if self.manifest["dim"] is None:
+            self.manifest["dim"] = int(vectors.shape[1])
+        elif vectors.shape[1] != self.manifest["dim"]:
+            raise SemanticIndexError(
+                f"El modelo devolvió vectores de dimensión {vectors.shape[1]}, "
+                f"pero el índice usa {self.manifest['dim']}. Borra {self.folder} para reconstruirlo."
+            )
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._discard_unregistered_rows()
+        first_row = self.manifest["rows"]
+        transcript_key = transcript_path.relative_to(self.notes_root).as_posix()
+        with self.vectors_path.open("ab") as handle:
+            handle.write(vectors.tobytes())
+        with self.rows_path.open("a", encoding="utf-8") as handle:
+            for chunk in chunks:
+                row = [
+                    note_key,
+                    transcript_key,
+                    title,
+                    class_date.isoformat(),
+                    round(chunk.start, 3),
+                    round(chunk.end, 3),
+                    chunk.text,
+                ]
+                handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+        self.manifest["rows"] = first_row + len(chunks)
+        notes[note_key] = {"hash": content_hash, "first": first_row, "count": len(chunks)}
+        self._save_manifest()
+
+        if self._stale_rows() > self.manifest["rows"] / 2:
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Reescribe la matriz y los metadatos conservando solo las filas vigentes."""
+
+        alive = self._alive_mask()
+        if alive.all():
+            return
+
+        matrix = self._matrix()
+        rows = self._read_rows()
+        keep = np.flatnonzero(alive)
+        tmp_vectors = self.vectors_path.with_suffix(".tmp")
+        tmp_rows = self.rows_path.with_suffix(".tmp")
+        with tmp_vectors.open("wb") as handle:
+            handle.write(np.ascontiguousarray(matrix[keep]).tobytes())
+        with tmp_rows.open("w", encoding="utf-8") as handle:
+            for index in keep:
+                handle.write(json.dumps(rows[index], ensure_ascii=False) + "\n")
+        del matrix
+
+        new_notes: Dict[str, dict] = {}
+        position = 0
+        for index in keep:
+            note_key = rows[index][0]
+            entry = new_notes.get(note_key)
+            if entry is None:
+                new_notes[note_key] = {
+                    "hash": self.manifest["notes"][note_key]["hash"],
+                    "first": position,
+                    "count": 1,
+                }
+            else:
+                entry["count"] += 1
+            position += 1
+
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_rows, self.rows_path)
+        self.manifest["notes"] = new_notes
+        self.manifest["rows"] = position
+        self._save_manifest()
+        logger.info("Índice semántico compactado a %d fragmentos", position)
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def search(
+        self,
+        query_vector: np.ndarray,
+        k: int = 10,
+        notes: Optional[Collection[Path]] = None,
+    ) -> List[SemanticHit]:
+        """Devuelve los ``k`` fragmentos con mayor similitud coseno.
+
+        Con ``notes`` la búsqueda se limita a los fragmentos de esas notas.
+        """
+
+        if self.manifest["rows"] == 0:
+            return []
+
+        query = _normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+        if query.shape[0] != self.manifest["dim"]:
+            raise SemanticIndexError("La consulta y el índice usan modelos con dimensiones distintas")
+
+        note_keys = None
+        if notes is not None:
+            note_keys = [path.relative_to(self.notes_root).as_posix() for path in notes]
+
+        scores = self._matrix() @ query
+        scores[~self._alive_mask(note_keys)] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        wanted = set(int(index) for index in top)
+        rows: Dict[int, list] = {}
+        with self.rows_path.open("r", encoding="utf-8") as handle:
+            for index, line in enumerate(handle):
+                if index in wanted:
+                    rows[index] = json.loads(line)
+
+        hits = []
+        for index in top:
+            note_key, transcript_key, title, class_date, start, end, text = rows[int(index)]
+            hits.append(
+                SemanticHit(
+                    note_path=self.notes_root / note_key,
+                    transcript_path=self.notes_root / transcript_key,
+                    title=title,
+                    class_date=date.fromisoformat(class_date),
+                    start=start,
+                    end=end,
+                    text=text,
+                    score=float(scores[index]),
+                )
+            )
+        return hits
+
+    # ------------------------------------------------------------------
+    # Helpers internos
+    # ------------------------------------------------------------------
+    def _matrix(self) -> np.ndarray:
+        return np.memmap(
+            self.vectors_path,
+            dtype=np.float32,
+            mode="r",
+            shape=(self.manifest["rows"], self.manifest["dim"]),
+        )
+
+    def _discard_unregistered_rows(self) -> None:
+        """Recorta filas escritas por una actualización que no llegó al manifiesto."""
+
+        rows = self.manifest["rows"]
+        expected_bytes = rows * (self.manifest["dim"] or 0) * 4
+        if not self.vectors_path.exists() or self.vectors_path.stat().st_size == expected_bytes:
+            return
+        # Los vectores se escriben antes que los metadatos, así que una
+        # escritura interrumpida siempre deja bytes de más en la matriz.
+        with self.vectors_path.open("r+b") as handle:
+            handle.truncate(expected_bytes)
+        if self.rows_path.exists():
+            with self.rows_path.open("r", encoding="utf-8") as handle:
+                lines = handle.readlines()
+            if len(lines) != rows:
+                with self.rows_path.open("w", encoding="utf-8") as handle:
+                    handle.writelines(lines[:rows])
+
+    def _alive_mask(self, note_keys: Optional[Iterable[str]] = None) -> np.ndarray:
+        alive = np.zeros(self.manifest["rows"], dtype=bool)
+        notes = self.manifest["notes"]
+        keys = notes.keys() if note_keys is None else note_keys
+        for key in keys:
+            entry = notes.get(key)
+            if entry is not None:
+                alive[entry["first"] : entry["first"] + entry["count"]] = True
+        return alive
+
+    def _stale_rows(self) -> int:
+        live = sum(entry["count"] for entry in self.manifest["notes"].values())
+        return self.manifest["rows"] - live
+
+    def _read_rows(self) -> List[list]:
+        with self.rows_path.open("r", encoding="utf-8") as handle:
+            return [json.loads(line) for line in handle]
+
+    def _load_manifest(self) -> dict:
+        if self.manifest_path.exists():
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        return {"dim": None, "rows": 0, "notes": {}}
+
+    def _save_manifest(self) -> None:
+        self.folder.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.manifest), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+
+def semantic_search(
+    notes_root: Path, query: str, embed: Embedder, k: int = 10
+) -> List[SemanticHit]:
+    """Busca los fragmentos más parecidos a ``query`` en todo el vault."""
+
+    index = SemanticIndex(notes_root)
+    if index.manifest["rows"] == 0:
+        raise SemanticIndexError(
+            f"El índice semántico de {notes_root} está vacío. Ejecuta 'search --semantic --reindex'."
+        )
+    return index.search(embed([query])[0], k=k)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
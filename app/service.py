@@ -0,0 +1,269 @@
+"""Modo servicio: vigila la carpeta de audios y procesa cada archivo nuevo.
+
+Pensado para dejar el contenedor encendido (``docker compose --profile service
+up -d``) en lugar de lanzar uno por audio. El modelo de Whisper se carga una
+vez al arrancar y queda en memoria (salvo que pasen
+``WHISPER_IDLE_UNLOAD_SECONDS`` sin audios nuevos); cada archivo que aparece en la carpeta se
+procesa cuando deja de crecer (para no leer una copia a medias). Lo ya
+procesado se anota en ``notes_root/.cache/servicio.json``, así que reiniciar el
+servicio no repite clases.
+
+Un servidor HTTP mínimo expone ``/health`` (JSON) y ``/metrics`` (formato de
+texto de Prometheus).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import get_settings
+from .memory import MemoryBudgetError, watch_idle_models
+from .models import warm_up_model
+from .note_writer import write_atomic
+from .workflow import class_date_for, run_workflow, title_for
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".aac", ".ogg", ".flac", ".opus", ".webm", ".mp4"}
+STATE_PATH = ".cache/servicio.json"
+
+
+@dataclass
+class ServiceStats:
+    """Contadores que publican ``/health`` y ``/metrics``."""
+
+    started: float = field(default_factory=time.time)
+    model_load_seconds: float = 0.0
+    processed: int = 0
+    failed: int = 0
+    pending: int = 0
+    current: Optional[str] = None
+    last_metrics: Dict[str, float] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def health(self) -> dict:
+        with self.lock:
+            return {
+                "status": "processing" if self.current else "idle",
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "model_load_seconds": round(self.model_load_seconds, 2),
+                "processed": self.processed,
+                "failed": self.failed,
+                "pending": self.pending,
+                "current": self.current,
+            }
+
+    def prometheus(self) -> str:
+        with self.lock:
+            lines = [
+                "# TYPE class_notes_processed_total counter",
+                f"class_notes_processed_total {self.processed}",
+                "# TYPE class_notes_failed_total counter",
+                f"class_notes_failed_total {self.failed}",
+                "# TYPE class_notes_pending_files gauge",
+                f"class_notes_pending_files {self.pending}",
+                "# TYPE class_notes_busy gauge",
+                f"class_notes_busy {int(self.current is not None)}",
+                "# TYPE class_notes_model_load_seconds gauge",
+                f"class_notes_model_load_seconds {self.model_load_seconds:.3f}",
+                "# TYPE class_notes_uptime_seconds gauge",
+                f"class_notes_uptime_seconds {time.time() - self.started:.1f}",
+                "# TYPE class_notes_last_stage_seconds gauge",
+            ]
+            lines.extend(
+                f'class_notes_last_stage_seconds{{stage="{name}"}} {value:.3f}'
+                for name, value in sorted(self.last_metrics.items())
+                if not name.endswith("_rss_mb")
+            )
+            lines.append("# TYPE class_notes_last_rss_megabytes gauge")
+            lines.extend(
+                f'class_notes_last_rss_megabytes{{stage="{name[: -len("_rss_mb")]}"}} {value:.1f}'
+                for name, value in sorted(self.last_metrics.items())
+                if name.endswith("_rss_mb")
+            )
+        return "\n".join(lines) + "\n"
+
+
+class AudioWatcher:
+    """Detecta audios nuevos o modificados que ya terminaron de copiarse."""
+
+    def __init__(self, audio_dir: Path, state_path: Path, settle_seconds: float) -> None:
+        self.audio_dir = audio_dir
+        self.state_path = state_path
+        self.settle_seconds = settle_seconds
+        self._state: Dict[str, dict] = self._load_state()
+        self._last_seen: Dict[str, Tuple[int, int]] = {}
+
+    def ready_files(self) -> Tuple[List[Path], int]:
+        """Audios listos para procesar y cantidad de audios que aún se están copiando."""
+
+        ready: List[Path] = []
+        copying = 0
+        now = time.time()
+        seen: Dict[str, Tuple[int, int]] = {}
+        for path in sorted(self.audio_dir.rglob("*")):
+            if path.suffix.lower() not in AUDIO_EXTENSIONS or not path.is_file():
+                continue
+            key = path.relative_to(self.audio_dir).as_posix()
+            try:
+                stat = path.stat()
+            except OSError:
+                # Se borró o se movió entre el listado y ahora.
+                continue
+            fingerprint = (stat.st_size, stat.st_mtime_ns)
+            seen[key] = fingerprint
+            recorded = self._state.get(key)
+            if recorded and (recorded["bytes"], recorded["mtime_ns"]) == fingerprint:
+                continue
+            if self._last_seen.get(key) == fingerprint and now - stat.st_mtime >= self.settle_seconds:
+                ready.append(path)
+            else:
+                copying += 1
+        self._last_seen = seen
+        return ready, copying
+
+    def mark(self, path: Path, note: Optional[Path] = None, error: Optional[str] = None) -> None:
+        """Anota el audio como procesado (o fallido) con su tamaño y fecha actuales."""
+
+        key = path.relative_to(self.audio_dir).as_posix()
+        try:
+            stat = path.stat()
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            # El audio ya no está (por ejemplo, lo movieron durante el proceso):
+            # se anota con lo último que se vio para no detener el servicio.
+            size, mtime_ns = self._last_seen.get(key, (-1, -1))
+        entry = {"bytes": size, "mtime_ns": mtime_ns}
+        if note is not None:
+            entry["note"] = str(note)
+        if error is not None:
+            entry["error"] = error
+        self._state[key] = entry
+        write_atomic(self.state_path, [json.dumps(self._state, ensure_ascii=False, indent=2, sort_keys=True)])
+
+    def _load_state(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+
+def serve(
+    audio_dir: Path,
+    notes_root: Optional[Path] = None,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    interval: float = 5.0,
+    stop: Optional[threading.Event] = None,
+) -> ServiceStats:
+    """Procesa los audios de ``audio_dir`` hasta recibir SIGTERM/SIGINT o ``stop``.
+
+    Los archivos se procesan de a uno para que todos compartan el mismo modelo
+    cargado; para vaciar una carpeta con muchos audios conviene ``batch``.
+    """
+
+    settings = get_settings()
+    output_root = (notes_root or settings.notes_root).expanduser()
+    audio_dir = audio_dir.expanduser()
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+    stats = ServiceStats()
+    server = _start_http(host, port, stats)
+    try:
+        stats.model_load_seconds = warm_up_model(settings)
+        watch_idle_models(settings.whisper_idle_unload_seconds)
+        logger.info(
+            "Servicio listo: modelo cargado en %.1f s, vigilando %s cada %.0f s",
+            stats.model_load_seconds,
+            audio_dir,
+            interval,
+        )
+        watcher = AudioWatcher(audio_dir, output_root / STATE_PATH, settle_seconds=interval)
+        while not stop.is_set():
+            ready, copying = watcher.ready_files()
+            with stats.lock:
+                stats.pending = len(ready) + copying
+            for path in ready:
+                if stop.is_set():
+                    break
+                _process(path, output_root, watcher, stats)
+            stop.wait(interval)
+    finally:
+        server.shutdown()
+        server.server_close()
+        logger.info("Servicio detenido")
+    return stats
+
+
+def _process(path: Path, notes_root: Path, watcher: AudioWatcher, stats: ServiceStats) -> None:
+    with stats.lock:
+        stats.current = path.name
+    try:
+        result = run_workflow(
+            audio_path=path,
+            title=title_for(path),
+            class_date=class_date_for(path),
+            notes_root=notes_root,
+        )
+        if result.refinement is not None:
+            result = result.refinement.result()
+    except MemoryBudgetError as exc:
+        # No se anota: se vuelve a intentar en la próxima vuelta.
+        logger.warning("Se pospone %s: %s", path.name, exc)
+        with stats.lock:
+            stats.current = None
+        return
+    except Exception as exc:  # noqa: BLE001 - un audio defectuoso no detiene el servicio
+        logger.exception("No se pudo procesar %s", path)
+        watcher.mark(path, error=str(exc))
+        with stats.lock:
+            stats.failed += 1
+            stats.pending = max(0, stats.pending - 1)
+            stats.current = None
+        return
+
+    watcher.mark(path, note=result.note_path)
+    with stats.lock:
+        stats.processed += 1
+        stats.pending = max(0, stats.pending - 1)
+        stats.current = None
+        stats.last_metrics = dict(result.metrics)
+
+
+def _start_http(host: str, port: int, stats: ServiceStats) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - nombre impuesto por http.server
+            if self.path == "/health":
+                body = json.dumps(stats.health()).encode("utf-8")
+                content_type = "application/json"
+            elif self.path == "/metrics":
+                body = stats.prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002
+            logger.debug("HTTP %s", format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="salud", daemon=True).start()
+    logger.info("Salud y métricas en http://%s:%d/health y /metrics", host, port)
+    return server
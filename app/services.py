@@ -11,9 +11,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Callable, List, Optional
 
-import requests
-
 from .config import Settings
+from .llm_backends import get_backend
 
 logger = logging.getLogger(__name__)
 
@@ -241,14 +240,7 @@ class ServiceManager:
     # Helpers internos
     # ------------------------------------------------------------------
     def _lm_studio_ready(self) -> bool:
-        try:
-            response = requests.get(
-                f"{self.settings.lm_studio_base_url}/models",
-                timeout=5,
-            )
-        except requests.RequestException:
-            return False
-        return response.status_code == 200
+        return get_backend(self.settings).is_ready()
 
     def _spawn_command(self, command: str, cwd: Optional[Path]) -> Optional[subprocess.Popen[bytes]]:
         try:
@@ -1,16 +1,31 @@
-"""Generación de resúmenes estructurados mediante LM Studio."""
+"""Generación de resúmenes estructurados con el servidor de lenguaje configurado.
+
+Los mensajes se arman para que el servidor pueda reutilizar su caché de
+atención (KV) entre peticiones: primero va ``SYSTEM_PROMPT`` y luego las
+instrucciones fijas (``USER_PREFIX``), idénticos byte a byte en todas las
+peticiones, y al final los datos de la clase. Con ``cache_prompt`` (opción de
+llama.cpp que LM Studio ignora si no la reconoce) el servidor solo procesa lo
+que cambió desde la petición anterior. El servidor se elige con
+``LLM_BACKEND`` (ver ``app.llm_backends``).
+"""
 
 from __future__ import annotations
 
 import json
 import logging
+import time
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-import requests
+from .llm_backends import LLMBackend, LLMBackendError
+from .prompt_budget import TokenCounter, compress_transcript
+from .transcriber import SegmentStore
 
 logger = logging.getLogger(__name__)
 
+# Tokens reservados para la respuesta del resumen.
+RESPONSE_TOKENS = 800
+
 
 @dataclass
 class Summary:
@@ -35,58 +50,119 @@ SYSTEM_PROMPT = (
 )
 
 
-USER_TEMPLATE = """
-Transcripción de la clase:
-"""
-{transcript}
-"""
+# Parte fija del mensaje del usuario; va antes de cualquier dato variable.
+USER_PREFIX = (
+    "Devuelve un JSON con los aprendizajes, las tareas, los pendientes y posibles "
+    "preguntas de examen de esta clase.\n\n"
+)
 
+USER_TEMPLATE = (
+    USER_PREFIX
+    + """Título o asignatura: {class_title}
 Fecha de la clase: {class_date}
-Título o asignatura: {class_title}
 
-Devuelve un JSON con los aprendizajes, las tareas, los pendientes y posibles preguntas de examen.
+Transcripción de la clase:
+\"\"\"
+{transcript}
+\"\"\"
 """
+)
 
 
 def build_prompt(transcript: str, class_date: str, class_title: str) -> str:
     return USER_TEMPLATE.format(transcript=transcript.strip(), class_date=class_date, class_title=class_title)
 
 
-def call_lm_studio(
-    base_url: str,
-    model: str,
+def build_budgeted_prompt(
     transcript: str,
     class_date: str,
     class_title: str,
-    temperature: float = 0.2,
-) -> Summary:
-    """Invoca el endpoint OpenAI-compatible de LM Studio."""
-
+    budget_tokens: int,
+    counter: TokenCounter,
+    segments: Optional[SegmentStore] = None,
+) -> str:
+    """Prompt del resumen que, si se puede, no supera ``budget_tokens``.
+
+    El presupuesto incluye ``SYSTEM_PROMPT``. Si el prompt completo no cabe y
+    se dan los ``segments`` de la transcripción, se comprime con
+    ``compress_transcript``; si aun así no cabe, se envía igualmente.
+    """
+
+    system_tokens = counter.count(SYSTEM_PROMPT)
     prompt = build_prompt(transcript, class_date, class_title)
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": temperature,
-        "max_tokens": 800,
-    }
+    tokens = system_tokens + counter.count(prompt)
+    kind = "medidos" if counter.exact else "estimados"
+    if tokens <= budget_tokens or segments is None:
+        logger.info("Prompt del resumen: %d tokens %s (presupuesto %d)", tokens, kind, budget_tokens)
+        return prompt
+
+    def fits(text: str) -> bool:
+        return system_tokens + counter.count(build_prompt(text, class_date, class_title)) <= budget_tokens
+
+    compressed = build_prompt(compress_transcript(segments, fits), class_date, class_title)
+    compressed_tokens = system_tokens + counter.count(compressed)
+    logger.info(
+        "Prompt del resumen comprimido de %d a %d tokens %s (%.0f %%, presupuesto %d)",
+        tokens,
+        compressed_tokens,
+        kind,
+        100 * compressed_tokens / tokens,
+        budget_tokens,
+    )
+    if compressed_tokens > budget_tokens:
+        logger.warning(
+            "La transcripción sigue superando el presupuesto de %d tokens; el servidor podría recortarla",
+            budget_tokens,
+        )
+    return compressed
+
+
+def warm_up_llm(backend: LLMBackend, timeout: float = 120) -> float:
+    """Fuerza la carga del modelo con una petición mínima y devuelve su latencia.
+
+    LM Studio carga el modelo en memoria con la primera petición que lo usa, por
+    lo que disparar una completación de un solo token mientras Whisper trabaja
+    evita que ``request_summary`` pague ese costo dentro de su propio timeout.
+    La petición lleva el prefijo común de los resúmenes, así que si el
+    servidor reutiliza la caché del prompt ese prefijo queda procesado de
+    antemano.
+    """
+
+    logger.info("Precargando el modelo %s en %s", backend.model, backend.title)
+    started = time.perf_counter()
+    try:
+        backend.chat(SYSTEM_PROMPT, USER_PREFIX, temperature=0, max_tokens=1, timeout=timeout)
+    except LLMBackendError as exc:
+        raise SummarizationError(f"No se pudo precargar el modelo: {exc}") from exc
 
-    url = f"{base_url}/chat/completions"
-    logger.info("Solicitando resumen a LM Studio en %s", url)
-    response = requests.post(url, json=payload, timeout=120)
+    elapsed = time.perf_counter() - started
+    logger.info("Modelo %s listo en %s (%.2f s)", backend.model, backend.title, elapsed)
+    return elapsed
 
-    if response.status_code != 200:
-        raise SummarizationError(f"Error {response.status_code}: {response.text}")
 
-    content = response.json()["choices"][0]["message"]["content"].strip()
+def request_summary(
+    backend: LLMBackend,
+    transcript: str,
+    class_date: str,
+    class_title: str,
+    temperature: float = 0.2,
+    segments: Optional[SegmentStore] = None,
+    budget_tokens: Optional[int] = None,
+) -> Summary:
+    """Pide el resumen de la clase al servidor de lenguaje.
 
-    try:
-        data: Dict[str, List[str]] = json.loads(content)
-    except json.JSONDecodeError as exc:
-        logger.error("No se pudo interpretar la respuesta JSON: %s", content)
-        raise SummarizationError("La respuesta del modelo no es JSON válido") from exc
+    Con ``budget_tokens`` se mide el prompt y, si lo supera, se comprime la
+    transcripción a partir de sus ``segments`` (ver ``build_budgeted_prompt``).
+    """
+
+    if budget_tokens:
+        prompt = build_budgeted_prompt(
+            transcript, class_date, class_title, budget_tokens, TokenCounter(backend), segments
+        )
+    else:
+        prompt = build_prompt(transcript, class_date, class_title)
+    logger.info("Solicitando resumen a %s en %s", backend.title, backend.base_url)
+    data = request_json(backend, SYSTEM_PROMPT, prompt, temperature=temperature)
 
     return Summary(
         avance_clase=data.get("avance_clase", []),
@@ -94,3 +170,35 @@ def call_lm_studio(
         pendientes=data.get("pendientes", []),
         preguntas_examen=data.get("preguntas_examen", []),
     )
+
+
+def request_json(
+    backend: LLMBackend,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float = 0.2,
+    max_tokens: int = RESPONSE_TOKENS,
+    timeout: float = 120,
+) -> Dict[str, List[str]]:
+    """Envía una conversación al servidor y devuelve la respuesta interpretada como JSON.
+
+    Para aprovechar la caché del servidor, ``user_prompt`` debería empezar
+    con las instrucciones fijas y dejar los datos variables al final.
+    """
+
+    try:
+        content = backend.chat(
+            system_prompt, user_prompt, temperature=temperature, max_tokens=max_tokens, timeout=timeout
+        )
+    except LLMBackendError as exc:
+        raise SummarizationError(str(exc)) from exc
+
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as exc:
+        logger.error("No se pudo interpretar la respuesta JSON: %s", content)
+        raise SummarizationError("La respuesta del modelo no es JSON válido") from exc
+
+    if not isinstance(data, dict):
+        raise SummarizationError("La respuesta del modelo no es un objeto JSON")
+    return data
@@ -3,56 +3,405 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
 
+import numpy as np
 from faster_whisper import WhisperModel
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Segment:
     """Representa un segmento de texto transcrito."""
 
     start: float
     end: float
     text: str
+    speaker: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Word:
+    """Palabra con su tiempo y la confianza que le asignó Whisper."""
+
+    start: float
+    end: float
+    text: str
+    probability: float
+
+
+class SegmentStore:
+    """Colección compacta de segmentos para transcripciones largas.
+
+    Los tiempos se guardan en columnas ``array('d')`` y todos los textos en un
+    único buffer unido por espacios, con un arreglo de offsets para recuperar
+    cada segmento. El buffer coincide con el texto completo de la transcripción,
+    así que no hace falta mantener una segunda copia. Iterar la colección
+    produce objetos ``Segment`` construidos al vuelo.
+
+    Las marcas de tiempo por palabra son opcionales y también van en columnas:
+    de cada palabra se guarda su inicio, fin, confianza y la posición donde
+    termina dentro del texto del segmento, sin duplicar el texto. Los
+    hablantes, si se conocen, se guardan como índices a una lista de nombres.
+    """
+
+    __slots__ = (
+        "_starts",
+        "_ends",
+        "_offsets",
+        "_pending",
+        "_buffer",
+        "_word_index",
+        "_word_starts",
+        "_word_ends",
+        "_word_probs",
+        "_word_chars",
+        "_speakers",
+        "_speaker_names",
+        "_text_lock",
+    )
+
+    def __init__(self, segments: Iterable[Segment] = ()) -> None:
+        self._starts = array("d")
+        self._ends = array("d")
+        # offsets[i] es la posición de inicio del segmento i dentro del buffer;
+        # el último valor apunta una posición más allá del final del texto.
+        self._offsets = array("Q", [0])
+        self._pending: List[str] = []
+        self._buffer = ""
+        # Protege la unión perezosa de ``_pending`` en ``_buffer``: el texto se
+        # puede leer desde otro hilo mientras se siguen agregando segmentos.
+        self._text_lock = threading.Lock()
+        # Columnas de palabras; se crean con la primera palabra agregada.
+        # word_index[i] es la posición de la primera palabra del segmento i.
+        self._word_index: Optional[array] = None
+        self._word_starts: Optional[array] = None
+        self._word_ends: Optional[array] = None
+        self._word_probs: Optional[array] = None
+        self._word_chars: Optional[array] = None
+        self._speakers: Optional[array] = None
+        self._speaker_names: List[str] = []
+        speakers = []
+        for segment in segments:
+            self.append(segment.start, segment.end, segment.text)
+            speakers.append(segment.speaker)
+        if any(speakers):
+            self.set_speakers(speakers)
+
+    def append(self, start: float, end: float, text: str, words: Sequence[Word] = ()) -> None:
+        """Agrega un segmento al final de la colección.
+
+        ``words`` son las palabras del segmento en orden; su texto solo se usa
+        para ubicarlas dentro de ``text``.
+        """
+
+        with self._text_lock:
+            self._starts.append(start)
+            self._ends.append(end)
+            self._offsets.append(self._offsets[-1] + len(text) + 1)
+            self._pending.append(text)
+
+        if words and self._word_index is None:
+            self._word_index = array("Q", [0] * len(self._starts))
+            self._word_starts = array("d")
+            self._word_ends = array("d")
+            self._word_probs = array("f")
+            self._word_chars = array("I")
+        if self._word_index is None:
+            return
+
+        cursor = 0
+        for word in words:
+            token = word.text.strip()
+            position = text.find(token, cursor) if token else -1
+            cursor = position + len(token) if position >= 0 else cursor
+            self._word_starts.append(word.start)
+            self._word_ends.append(word.end)
+            self._word_probs.append(word.probability)
+            self._word_chars.append(cursor)
+        self._word_index.append(len(self._word_starts))
+
+    def set_speakers(self, speakers: Sequence[Optional[str]]) -> None:
+        """Asigna un hablante (o ``None``) a cada segmento, en orden."""
+
+        if len(speakers) != len(self):
+            raise ValueError("Se esperaba un hablante por segmento")
+        names: Dict[str, int] = {}
+        column = array("h")
+        for speaker in speakers:
+            if speaker is None:
+                column.append(-1)
+            else:
+                column.append(names.setdefault(speaker, len(names)))
+        self._speakers = column
+        self._speaker_names = list(names)
+
+    @property
+    def has_speakers(self) -> bool:
+        return self._speakers is not None
+
+    @property
+    def speaker_names(self) -> List[str]:
+        return list(self._speaker_names)
+
+    def speaker(self, index: int) -> Optional[str]:
+        if self._speakers is None:
+            return None
+        position = self._speakers[index]
+        return self._speaker_names[position] if position >= 0 else None
+
+    @property
+    def has_words(self) -> bool:
+        return self._word_index is not None
+
+    def words(self, index: int) -> List[Word]:
+        """Palabras del segmento ``index`` (lista vacía si no se guardaron)."""
+
+        if self._word_index is None:
+            return []
+        text = self[index].text
+        first, last = self._word_index[index], self._word_index[index + 1]
+        words = []
+        previous = 0
+        for position in range(first, last):
+            end_char = self._word_chars[position]
+            words.append(
+                Word(
+                    start=self._word_starts[position],
+                    end=self._word_ends[position],
+                    text=text[previous:end_char].strip(),
+                    probability=self._word_probs[position],
+                )
+            )
+            previous = end_char
+        return words
+
+    @property
+    def text(self) -> str:
+        """Texto completo de la transcripción, con los segmentos unidos por espacios."""
+
+        with self._text_lock:
+            if self._pending:
+                # El buffer puede estar vacío y aun así contener segmentos (de
+                # texto vacío): lo que decide si hay que unirlo es cuántos hay.
+                joined = len(self._starts) - len(self._pending)
+                parts = [self._buffer, *self._pending] if joined else self._pending
+                self._buffer = " ".join(parts)
+                self._pending = []
+            return self._buffer
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Los resultados viajan entre procesos (``WorkflowPool``); el candado no
+        # se puede serializar y se crea uno nuevo al reconstruir.
+        self.text
+        return {name: getattr(self, name) for name in self.__slots__ if name != "_text_lock"}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._text_lock = threading.Lock()
+
+    @property
+    def starts(self) -> array:
+        return self._starts
+
+    @property
+    def ends(self) -> array:
+        return self._ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self) -> Iterator[Segment]:
+        buffer = self.text
+        offsets = self._offsets
+        for index, (start, end) in enumerate(zip(self._starts, self._ends)):
+            yield Segment(
+                start=start,
+                end=end,
+                text=buffer[offsets[index] : offsets[index + 1] - 1],
+                speaker=self.speaker(index),
+            )
+
+    def __getitem__(self, index: int) -> Segment:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Índice de segmento fuera de rango")
+        buffer = self.text
+        return Segment(
+            start=self._starts[index],
+            end=self._ends[index],
+            text=buffer[self._offsets[index] : self._offsets[index + 1] - 1],
+            speaker=self.speaker(index),
+        )
+
+    def __repr__(self) -> str:
+        return f"SegmentStore({len(self)} segmentos)"
+
+
+@dataclass(frozen=True)
+class DecodingProfile:
+    """Parámetros de decodificación de Whisper agrupados bajo un nombre.
+
+    ``compute_type`` se usa salvo que se indique otro explícitamente,
+    ``cpu_threads=0`` deja que CTranslate2 elija y ``batch_size > 1`` activa la
+    inferencia por lotes de faster-whisper.
+    """
+
+    name: str
+    beam_size: int
+    best_of: int
+    temperature: Tuple[float, ...]
+    condition_on_previous_text: bool
+    compute_type: str
+    cpu_threads: int = 0
+    batch_size: int = 1
+
+
+_TEMPERATURE_FALLBACK = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+DECODING_PROFILES: Dict[str, DecodingProfile] = {
+    "fast": DecodingProfile(
+        name="fast",
+        beam_size=1,
+        best_of=1,
+        temperature=(0.0,),
+        condition_on_previous_text=False,
+        compute_type="int8",
+        batch_size=8,
+    ),
+    "balanced": DecodingProfile(
+        name="balanced",
+        beam_size=5,
+        best_of=5,
+        temperature=_TEMPERATURE_FALLBACK,
+        condition_on_previous_text=True,
+        compute_type="auto",
+    ),
+    "accurate": DecodingProfile(
+        name="accurate",
+        beam_size=8,
+        best_of=8,
+        temperature=_TEMPERATURE_FALLBACK,
+        condition_on_previous_text=True,
+        compute_type="default",
+    ),
+}
+
+DEFAULT_PROFILE = "balanced"
+
+PROBE_MODEL_SIZE = "tiny"
+PROBE_SECONDS = 30
+SAMPLE_RATE = 16000
+
+
+def get_decoding_profile(name: str) -> DecodingProfile:
+    """Devuelve el perfil ``name`` o lanza ``ValueError`` si no existe."""
+
+    try:
+        return DECODING_PROFILES[name.strip().lower()]
+    except KeyError:
+        choices = ", ".join(DECODING_PROFILES)
+        raise ValueError(f"Perfil de decodificación desconocido: {name!r} (opciones: {choices})") from None
 
 
 @dataclass
 class TranscriptionResult:
     """Resultado completo de la transcripción."""
 
-    text: str
-    segments: Iterable[Segment]
+    segments: SegmentStore
     language: str
     duration: float
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return self.segments.text
 
 
 def transcribe(
     audio_path: Path,
-    model_size: str,
-    compute_type: str = "auto",
+    model_path: Path,
+    compute_type: Optional[str] = None,
     language: Optional[str] = None,
     device: str = "cpu",
+    profile: str = DEFAULT_PROFILE,
+    word_timestamps: bool = False,
+    cpu_threads: Optional[int] = None,
+    start_offset: float = 0.0,
 ) -> TranscriptionResult:
-    """Transcribe un archivo de audio utilizando Faster Whisper."""
+    """Transcribe un archivo de audio utilizando Faster Whisper.
 
-    logger.info("Cargando modelo de Whisper (%s)...", model_size)
-    model = WhisperModel(model_size, device=device, compute_type=compute_type)
+    ``model_path`` es la carpeta local del modelo (ver ``app.models``).
+    ``profile`` elige los parámetros de decodificación (ver
+    ``DECODING_PROFILES``); ``compute_type`` y ``cpu_threads`` sobrescriben
+    los del perfil. Con ``word_timestamps`` se guardan además el tiempo y la
+    confianza de cada palabra. Con ``start_offset`` solo se transcribe desde
+    ese segundo; los tiempos de los segmentos siguen siendo los del archivo
+    completo.
+    """
 
-    logger.info("Iniciando transcripción de %s", audio_path)
-    segments_iter, info = model.transcribe(
-        str(audio_path),
-        language=language,
-        beam_size=5,
-        vad_filter=True,
-    )
+    decoding = get_decoding_profile(profile)
+    compute_type = compute_type or decoding.compute_type
+    if cpu_threads is None:
+        cpu_threads = decoding.cpu_threads
 
-    segments = [Segment(start=s.start, end=s.end, text=s.text.strip()) for s in segments_iter]
-    text = " ".join(segment.text for segment in segments).strip()
+    logger.info("Perfil de decodificación: %s", decoding.name)
+
+    options: Dict[str, Any] = {
+        "language": language,
+        "beam_size": decoding.beam_size,
+        "best_of": decoding.best_of,
+        "temperature": list(decoding.temperature),
+        "vad_filter": True,
+        "word_timestamps": word_timestamps,
+    }
+
+    if start_offset > 0:
+        # Se entrega a Whisper solo el final ya decodificado; ``clip_timestamps``
+        # desactivaría el filtro de voz.
+        logger.info("Iniciando transcripción de %s desde %.1f s", audio_path, start_offset)
+        audio: Any = _decode_tail(audio_path, start_offset)
+    else:
+        logger.info("Iniciando transcripción de %s", audio_path)
+        audio = str(audio_path)
+
+    # Mientras el modelo está en uso no se descarga por inactividad.
+    with using_model(model_path, device, compute_type, cpu_threads) as model:
+        pipeline = _batched_pipeline(model) if decoding.batch_size > 1 else None
+        if pipeline is not None:
+            # Los lotes se decodifican de forma independiente, así que no hay
+            # texto previo con el que condicionar.
+            options["batch_size"] = decoding.batch_size
+            segments_iter, info = pipeline.transcribe(audio, **options)
+        else:
+            options["condition_on_previous_text"] = decoding.condition_on_previous_text
+            segments_iter, info = model.transcribe(audio, **options)
+
+        segments = SegmentStore()
+        for segment in segments_iter:
+            words = [
+                Word(
+                    start=word.start + start_offset,
+                    end=word.end + start_offset,
+                    text=word.word,
+                    probability=word.probability,
+                )
+                for word in segment.words or ()
+            ]
+            segments.append(
+                segment.start + start_offset, segment.end + start_offset, segment.text.strip(), words
+            )
 
     logger.info(
         "Transcripción finalizada. Idioma detectado: %s. Duración: %.2f minutos.",
@@ -60,24 +409,296 @@ def transcribe(
         info.duration / 60,
     )
 
+    params: Dict[str, Any] = {}
+    if start_offset > 0:
+        params["start_offset"] = start_offset
     return TranscriptionResult(
-        text=text,
         segments=segments,
         language=info.language,
-        duration=info.duration,
+        duration=info.duration + start_offset,
+        params={
+            **params,
+            "model_size": model_path.name,
+            "profile": decoding.name,
+            "compute_type": compute_type,
+            "device": device,
+            "cpu_threads": cpu_threads,
+            **options,
+        },
     )
 
 
-def segments_to_markdown(segments: Iterable[Segment]) -> str:
+# Modelos que se conservan cargados (por ejemplo el del borrador y el definitivo).
+MODEL_CACHE_SIZE = 2
+
+_ModelKey = Tuple[Path, str, str, int]
+
+
+class _ModelCache:
+    """Modelos cargados en el proceso, con cuándo se usaron por última vez."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._models: OrderedDict[_ModelKey, WhisperModel] = OrderedDict()
+        self._last_used: Dict[_ModelKey, float] = {}
+        self._in_use: Dict[_ModelKey, int] = {}
+        # Cargar un modelo tarda segundos; con el lock dos hilos no cargan el
+        # mismo modelo dos veces.
+        self._lock = threading.RLock()
+
+    def get(self, key: _ModelKey) -> WhisperModel:
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = _create_model(*key)
+                self._models[key] = model
+                self._evict()
+            self._models.move_to_end(key)
+            self._last_used[key] = time.monotonic()
+            return model
+
+    @contextmanager
+    def use(self, key: _ModelKey) -> Iterator[WhisperModel]:
+        with self._lock:
+            model = self.get(key)
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                self._last_used[key] = time.monotonic()
+
+    def loaded(self) -> List[Path]:
+        with self._lock:
+            return [key[0] for key in self._models]
+
+    def unload(self, keep: Iterable[Path] = (), idle_seconds: float = 0.0) -> List[Path]:
+        """Descarga los modelos sin uso desde hace ``idle_seconds`` que no estén en ``keep``."""
+
+        keep = set(keep)
+        now = time.monotonic()
+        unloaded = []
+        with self._lock:
+            for key in list(self._models):
+                if key[0] in keep or self._in_use.get(key, 0):
+                    continue
+                if now - self._last_used.get(key, 0.0) < idle_seconds:
+                    continue
+                del self._models[key]
+                self._last_used.pop(key, None)
+                unloaded.append(key[0])
+        return unloaded
+
+    def _evict(self) -> None:
+        # El último es el que se acaba de cargar.
+        for key in list(self._models)[:-1]:
+            if len(self._models) <= self.maxsize:
+                return
+            if not self._in_use.get(key, 0):
+                del self._models[key]
+                self._last_used.pop(key, None)
+
+
+_models = _ModelCache(MODEL_CACHE_SIZE)
+
+
+def load_model(model_path: Path, device: str, compute_type: str, cpu_threads: int) -> WhisperModel:
+    """Carga un modelo de Whisper y lo conserva para las siguientes transcripciones.
+
+    Solo acepta carpetas locales, así que nunca se conecta a internet. Se
+    guardan los dos últimos (por ejemplo el del borrador y el definitivo); en
+    un proceso del pool de trabajo el modelo se carga una sola vez.
+    """
+
+    return _models.get((model_path, device, compute_type, cpu_threads))
+
+
+def using_model(
+    model_path: Path, device: str, compute_type: str, cpu_threads: int
+) -> ContextManager[WhisperModel]:
+    """Como ``load_model``, pero marca el modelo en uso hasta salir del bloque ``with``."""
+
+    return _models.use((model_path, device, compute_type, cpu_threads))
+
+
+def loaded_models() -> List[Path]:
+    """Carpetas de los modelos cargados, del menos al más recientemente usado."""
+
+    return _models.loaded()
+
+
+def unload_models(keep: Iterable[Path] = (), idle_seconds: float = 0.0) -> List[Path]:
+    """Libera los modelos que no están en uso (ver ``app.memory``) y devuelve cuáles."""
+
+    return _models.unload(keep, idle_seconds)
+
+
+def _create_model(model_path: Path, device: str, compute_type: str, cpu_threads: int) -> WhisperModel:
+    if not model_path.is_dir():
+        raise FileNotFoundError(f"No existe la carpeta del modelo {model_path}")
+    logger.info("Cargando modelo de Whisper (%s, %s)...", model_path.name, compute_type)
+    return WhisperModel(
+        str(model_path),
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        local_files_only=True,
+    )
+
+
+def _batched_pipeline(model: WhisperModel) -> Optional[Any]:
+    try:
+        from faster_whisper import BatchedInferencePipeline
+    except ImportError:
+        logger.warning(
+            "Esta versión de faster-whisper no admite inferencia por lotes; se transcribe de forma secuencial"
+        )
+        return None
+    return BatchedInferencePipeline(model=model)
+
+
+def detect_language(
+    audio_path: Path,
+    model_path: Path,
+    device: str = "cpu",
+    seconds: int = PROBE_SECONDS,
+    cpu_threads: int = 0,
+) -> Optional[str]:
+    """Detecta el idioma con un modelo pequeño sobre los primeros ``seconds``.
+
+    Solo se decodifica ese fragmento del audio y no se genera texto: la
+    detección ocurre al llamar a ``transcribe`` y los segmentos nunca se piden.
+    El modelo pasa por la misma caché que los demás, así que se reutiliza y lo
+    ven el control de memoria y la descarga por inactividad. Devuelve ``None``
+    si no se pudo leer el audio.
+    """
+
+    try:
+        probe = _decode_probe(audio_path, seconds)
+    except Exception as exc:  # noqa: BLE001 - PyAV lanza errores muy variados
+        logger.warning("No se pudo leer el inicio de %s para detectar el idioma: %s", audio_path, exc)
+        return None
+    if probe.size == 0:
+        return None
+
+    with using_model(model_path, device, "int8", cpu_threads) as model:
+        _, info = model.transcribe(probe, beam_size=1, vad_filter=True)
+    logger.info(
+        "Idioma detectado en los primeros %d s: %s (probabilidad %.2f)",
+        seconds,
+        info.language,
+        info.language_probability,
+    )
+    return info.language
+
+
+def _decode_probe(audio_path: Path, seconds: int) -> np.ndarray:
+    """Decodifica a 16 kHz mono solo el comienzo del audio."""
+
+    for chunk in iter_audio_chunks(audio_path, chunk_seconds=seconds):
+        return chunk
+    return np.zeros(0, dtype=np.float32)
+
+
+def _decode_tail(audio_path: Path, seconds: float) -> np.ndarray:
+    """Decodifica a 16 kHz mono el audio a partir de ``seconds``.
+
+    Se decodifica desde el comienzo y se descarta lo anterior: buscar la
+    posición en el contenedor no es exacto en todos los formatos.
+    """
+
+    skip = int(seconds * SAMPLE_RATE)
+    tail: List[np.ndarray] = []
+    for chunk in iter_audio_chunks(audio_path):
+        if skip >= chunk.size:
+            skip -= chunk.size
+            continue
+        tail.append(chunk[skip:])
+        skip = 0
+    return np.concatenate(tail) if tail else np.zeros(0, dtype=np.float32)
+
+
+def audio_duration(audio_path: Path) -> Optional[float]:
+    """Duración en segundos según el contenedor, sin decodificar; ``None`` si no se sabe."""
+
+    try:
+        import av  # dependencia de faster-whisper
+
+        with av.open(str(audio_path), metadata_errors="ignore") as container:
+            if container.duration:
+                return container.duration / av.time_base
+    except Exception as exc:  # noqa: BLE001 - PyAV lanza errores muy variados
+        logger.debug("No se pudo leer la duración de %s: %s", audio_path, exc)
+    return None
+
+
+def iter_audio_chunks(audio_path: Path, chunk_seconds: int = 30) -> Iterator[np.ndarray]:
+    """Decodifica el audio a 16 kHz mono en bloques ``float32`` de ``chunk_seconds``.
+
+    A diferencia de ``faster_whisper.decode_audio`` nunca tiene el archivo
+    completo en memoria (dos horas de clase son casi 500 MB en ``float32``).
+    """
+
+    import av  # dependencia de faster-whisper
+
+    size = chunk_seconds * SAMPLE_RATE
+    pending: List[np.ndarray] = []
+    collected = 0
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+    with av.open(str(audio_path), metadata_errors="ignore") as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                samples = resampled.to_ndarray().reshape(-1)
+                pending.append(samples)
+                collected += samples.size
+            if collected >= size:
+                joined = np.concatenate(pending)
+                for offset in range(0, joined.size - size + 1, size):
+                    yield (joined[offset : offset + size] / 32768.0).astype(np.float32)
+                rest = joined[joined.size - joined.size % size :]
+                pending = [rest] if rest.size else []
+                collected = rest.size
+    if collected:
+        yield (np.concatenate(pending) / 32768.0).astype(np.float32)
+
+
+def segments_to_markdown(segments: Iterable[Segment], audio_name: Optional[str] = None) -> str:
     """Convierte los segmentos en una tabla legible en Markdown."""
 
-    lines = ["| Inicio | Fin | Texto |", "|-------|-----|-------|"]
+    return "\n".join(iter_markdown_rows(segments, audio_name))
+
+
+def iter_markdown_rows(
+    segments: Iterable[Segment], audio_name: Optional[str] = None
+) -> Iterator[str]:
+    """Genera una a una las filas de la tabla Markdown, sin salto de línea final.
+
+    Con ``audio_name`` el inicio de cada fila enlaza al audio en ese instante
+    (``audio.mp3#t=83.42``) y Obsidian lo reproduce desde ahí. El enlace es
+    relativo a la transcripción, así que solo debe pasarse si el audio está
+    junto a ella (ver ``note_writer.audio_link``). Si los segmentos traen
+    hablantes se agrega una columna para ellos.
+    """
+
+    target = quote(audio_name) if audio_name else None
+    with_speakers = getattr(segments, "has_speakers", False)
+    if with_speakers:
+        yield "| Inicio | Fin | Hablante | Texto |"
+        yield "|-------|-----|----------|-------|"
+    else:
+        yield "| Inicio | Fin | Texto |"
+        yield "|-------|-----|-------|"
     for segment in segments:
         clean_text = segment.text.replace("|", "\\|")
-        lines.append(
-            f"| {format_timestamp(segment.start)} | {format_timestamp(segment.end)} | {clean_text} |"
-        )
-    return "\n".join(lines)
+        start = format_timestamp(segment.start)
+        if target:
+            start = f"[{start}]({target}#t={segment.start:.2f})"
+        if with_speakers:
+            speaker = segment.speaker or ""
+            yield f"| {start} | {format_timestamp(segment.end)} | {speaker} | {clean_text} |"
+        else:
+            yield f"| {start} | {format_timestamp(segment.end)} | {clean_text} |"
 
 
 def format_timestamp(seconds: float) -> str:
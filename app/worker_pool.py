@@ -0,0 +1,229 @@
+"""Pool de procesos para transcribir varias clases a la vez.
+
+Cada proceso carga su modelo de Whisper una sola vez y lo reutiliza para todas
+las clases que recibe. La cantidad de procesos se calcula a partir de los
+núcleos y la memoria disponibles y del tamaño del modelo, y los núcleos se
+reparten entre ellos (``WHISPER_CPU_THREADS``) para que CTranslate2 no lance
+más hilos que núcleos hay. Los trabajos devuelven el mismo ``WorkflowResult``
+que ``run_workflow``.
+
+Cada proceso solo ve su propia memoria, así que la admisión de ``app.memory``
+también se hace aquí para el pool entero: ``submit`` espera mientras los
+modelos de todos los procesos más las clases más grandes que podrían correr a
+la vez superen ``MEMORY_BUDGET_MB`` (por defecto, parte de la memoria libre al
+crear el pool) y lanza ``MemoryBudgetError`` si la clase no cabe ni sola.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from .config import get_settings
+from .memory import (
+    DEFAULT_MODEL_MEMORY_MB,
+    MEMORY_BUDGET,
+    MemoryBudgetError,
+    audio_memory_mb,
+    available_memory_mb,
+    model_memory_mb,
+)
+from .models import resolve_model, warm_up_model
+from .transcriber import audio_duration
+from .workflow import WorkflowResult, run_workflow, share_index_lock
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de dos hilos por proceso, Whisper pierde más de lo que gana.
+MIN_THREADS_PER_WORKER = 2
+
+
+@dataclass(frozen=True)
+class WorkerPlan:
+    """Cantidad de procesos y de hilos de Whisper por proceso."""
+
+    workers: int
+    cpu_threads: int
+
+
+@dataclass
+class WorkflowJob:
+    """Parámetros de ``run_workflow`` para una clase."""
+
+    audio_path: Path
+    title: str
+    class_date: date
+    notes_root: Optional[Path] = None
+    skip_summary: bool = False
+    profile: Optional[str] = None
+    two_pass: Optional[bool] = None
+    force: bool = False
+
+
+def plan_workers(
+    jobs: int,
+    model_sizes: Sequence[str],
+    cores: Optional[int] = None,
+    memory_mb: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> WorkerPlan:
+    """Decide cuántos procesos lanzar y cuántos hilos usa cada uno.
+
+    ``model_sizes`` son los modelos que cargará cada proceso (el del borrador
+    y el definitivo en modo de dos pasadas). Si ``memory_mb`` es ``None`` se
+    consulta al sistema; si tampoco se puede, solo limitan los núcleos.
+    """
+
+    cores = cores or os.cpu_count() or 1
+    if memory_mb is None:
+        memory_mb = available_memory_mb()
+
+    workers = max(1, cores // MIN_THREADS_PER_WORKER)
+    if memory_mb is not None:
+        per_worker = sum(model_memory_mb(size) for size in model_sizes) or DEFAULT_MODEL_MEMORY_MB
+        workers = min(workers, max(1, int(memory_mb * MEMORY_BUDGET) // per_worker))
+    if max_workers:
+        workers = min(workers, max_workers)
+    workers = max(1, min(workers, jobs))
+    return WorkerPlan(workers=workers, cpu_threads=max(1, cores // workers))
+
+
+class WorkflowPool:
+    """Ejecuta ``run_workflow`` en varios procesos con un modelo persistente cada uno.
+
+    Uso::
+
+        with WorkflowPool(len(jobs)) as pool:
+            futures = [pool.submit(job) for job in jobs]
+    """
+
+    def __init__(self, jobs: int, profile: Optional[str] = None, two_pass: Optional[bool] = None) -> None:
+        settings = get_settings()
+        model_sizes = [settings.whisper_model_size]
+        draft_model: Optional[str] = None
+        if settings.whisper_two_pass if two_pass is None else two_pass:
+            if settings.whisper_draft_model_size != settings.whisper_model_size:
+                draft_model = settings.whisper_draft_model_size
+                model_sizes.append(draft_model)
+
+        # Se descargan aquí, una sola vez, los modelos que falten.
+        for model_size in model_sizes:
+            resolve_model(settings, model_size)
+
+        self.plan = plan_workers(jobs, model_sizes, max_workers=settings.worker_processes or None)
+        cpu_threads = settings.whisper_cpu_threads or self.plan.cpu_threads
+        logger.info(
+            "Pool de transcripción: %d procesos con %d hilos cada uno",
+            self.plan.workers,
+            cpu_threads,
+        )
+        # Se calcula antes de lanzar los procesos, que ocuparán esa memoria.
+        if settings.memory_budget_mb:
+            self.budget_mb: Optional[float] = float(settings.memory_budget_mb)
+        else:
+            available = available_memory_mb()
+            self.budget_mb = available * MEMORY_BUDGET if available is not None else None
+        self._models_mb = self.plan.workers * sum(model_memory_mb(size) for size in model_sizes)
+        self._reserved: List[float] = []
+        self._admission = threading.Condition()
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.plan.workers,
+            initializer=_initialize_worker,
+            initargs=(cpu_threads, profile, draft_model, multiprocessing.Lock()),
+        )
+
+    def submit(self, job: WorkflowJob) -> Future[WorkflowResult]:
+        """Encola una clase; espera si con ella el pool podría pasarse de memoria."""
+
+        needed = audio_memory_mb(audio_duration(job.audio_path))
+        if self.budget_mb is not None and self._models_mb + needed > self.budget_mb:
+            raise MemoryBudgetError(
+                f"La clase {job.audio_path.name} necesitaría unos {self._models_mb + needed:.0f} MB "
+                f"en el pool y el límite es {self.budget_mb:.0f} MB. Usa menos procesos "
+                "(WORKER_PROCESSES), un modelo de Whisper más pequeño o ajusta MEMORY_BUDGET_MB."
+            )
+        with self._admission:
+            while not self._fits(needed):
+                self._admission.wait()
+            self._reserved.append(needed)
+        try:
+            future = self._executor.submit(_run_job, job)
+        except BaseException:
+            self._release(needed)
+            raise
+        future.add_done_callback(lambda _future: self._release(needed))
+        return future
+
+    def map(self, jobs: Iterable[WorkflowJob]) -> Iterator[WorkflowResult]:
+        """Resultados en el orden de ``jobs``; propaga la primera excepción."""
+
+        futures = [self.submit(job) for job in jobs]
+        return (future.result() for future in futures)
+
+    def _fits(self, needed: float) -> bool:
+        if self.budget_mb is None:
+            return True
+        # Como mucho corren ``workers`` clases a la vez: cuentan las más grandes.
+        running = sorted([*self._reserved, needed], reverse=True)[: self.plan.workers]
+        return self._models_mb + sum(running) <= self.budget_mb
+
+    def _release(self, needed: float) -> None:
+        with self._admission:
+            self._reserved.remove(needed)
+            self._admission.notify_all()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> WorkflowPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+
+def _initialize_worker(
+    cpu_threads: int, profile: Optional[str], draft_model: Optional[str], index_lock
+) -> None:
+    """Fija los hilos del proceso y carga los modelos antes del primer trabajo."""
+
+    os.environ["WHISPER_CPU_THREADS"] = str(cpu_threads)
+    share_index_lock(index_lock)
+
+    try:
+        settings = get_settings()
+        warm_up_model(settings, profile)
+        if draft_model:
+            # El borrador siempre se transcribe con el perfil rápido.
+            warm_up_model(settings, "fast", model_size=draft_model)
+    except Exception as exc:  # noqa: BLE001 - el error real se verá en el trabajo
+        logger.warning("No se pudo precargar el modelo de Whisper: %s", exc)
+
+
+def _run_job(job: WorkflowJob) -> WorkflowResult:
+    """Procesa una clase completa, incluida la segunda pasada si la hay."""
+
+    result = run_workflow(
+        audio_path=job.audio_path,
+        title=job.title,
+        class_date=job.class_date,
+        notes_root=job.notes_root,
+        skip_summary=job.skip_summary,
+        profile=job.profile,
+        two_pass=job.two_pass,
+        force=job.force,
+    )
+    if result.refinement is not None:
+        # Un Future no cruza procesos: se devuelve directamente el definitivo.
+        refined = result.refinement.result()
+        refined.metrics = {**result.metrics, **{f"refine_{k}": v for k, v in refined.metrics.items()}}
+        return refined
+    return result
@@ -3,18 +3,76 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
-from datetime import date
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from .config import get_settings
-from .note_writer import prepare_paths, write_note
-from .summarizer import SummarizationError, Summary, call_lm_studio
-from .transcriber import TranscriptionResult, transcribe
+from .artifacts import (
+    ArtifactError,
+    TranscriptArtifact,
+    load_summary_artifact,
+    load_transcript_artifact,
+    save_summary_artifact,
+    save_transcript_artifact,
+)
+from .config import Settings, get_settings
+from .diarization import CACHE_DIRNAME as DIARIZATION_CACHE_DIRNAME
+from .diarization import SpeakerTurn, diarize_cached, speakers_for
+from .fingerprint import (
+    AudioPrint,
+    FingerprintError,
+    FingerprintIndex,
+    FingerprintMatch,
+    ResumeMatch,
+    file_hash,
+    fingerprint,
+)
+from .language_memo import remember_language, remembered_language
+from .memory import StageMemory, admit_job, watch_idle_models
+from .models import resolve_model
+from .note_writer import NotePaths, paths_from_artifact, place_audio, prepare_paths, slugify, write_note
+from .semantic_index import SemanticIndex, SemanticIndexError, lm_studio_embedder
+from .llm_backends import get_backend
+from .summarizer import (
+    RESPONSE_TOKENS,
+    SummarizationError,
+    Summary,
+    request_summary,
+    warm_up_llm,
+)
+from .transcriber import (
+    PROBE_MODEL_SIZE,
+    SegmentStore,
+    TranscriptionResult,
+    audio_duration,
+    detect_language,
+    transcribe,
+)
 
 logger = logging.getLogger(__name__)
 
+# Por debajo de esta similitud entre borrador y texto refinado se vuelve a
+# pedir el resumen a LM Studio (0.8 en pares de palabras equivale a cerca de un
+# 10 % de palabras cambiadas).
+REFINE_SUMMARY_THRESHOLD = 0.8
+
+# Serializa las escrituras de los índices (semántico y de huellas) y de la
+# memoria de idiomas entre ejecuciones simultáneas (refinamientos en segundo
+# plano o procesos del pool de trabajo).
+_index_lock = threading.Lock()
+
+
+def share_index_lock(lock) -> None:
+    """Reemplaza el candado del índice por uno compartido entre procesos."""
+
+    global _index_lock
+    _index_lock = lock
+
 
 @dataclass
 class WorkflowResult:
@@ -24,6 +82,10 @@ class WorkflowResult:
     transcript_path: Path
     summary: Summary
     transcription: TranscriptionResult
+    metrics: Dict[str, float] = field(default_factory=dict)
+    refinement: Optional[Future[WorkflowResult]] = None
+    # Verdadero si el audio ya estaba transcrito y se devolvió la nota existente.
+    duplicate: bool = False
 
 
 def run_workflow(
@@ -32,8 +94,29 @@ def run_workflow(
     class_date: date,
     notes_root: Optional[Path] = None,
     skip_summary: bool = False,
+    profile: Optional[str] = None,
+    two_pass: Optional[bool] = None,
+    force: bool = False,
 ) -> WorkflowResult:
-    """Ejecuta la transcripción y generación de notas."""
+    """Ejecuta la transcripción y generación de notas.
+
+    ``profile`` elige el perfil de decodificación de Whisper; si se omite se
+    usa ``WHISPER_PROFILE``. Con ``two_pass`` (por defecto ``WHISPER_TWO_PASS``)
+    primero se escribe un borrador con ``WHISPER_DRAFT_MODEL_SIZE`` y la
+    transcripción definitiva queda pendiente en ``WorkflowResult.refinement``.
+
+    Con ``AUDIO_DEDUP`` activo, si el audio ya se transcribió (aunque esté en
+    otro formato o recortado) se devuelve la nota existente sin transcribir;
+    ``force`` lo transcribe igualmente. Si el audio es uno ya transcrito al que
+    la grabadora le agregó una continuación, solo se transcribe lo agregado y
+    se suma a la nota existente, que conserva su título y fecha.
+
+    Antes de transcribir se estima la memoria que hará falta; si supera
+    ``MEMORY_BUDGET_MB`` se lanza ``MemoryBudgetError`` (ver ``app.memory``).
+    """
+
+    started = time.perf_counter()
+    metrics: Dict[str, float] = {}
 
     audio_path = audio_path.expanduser().resolve()
     if not audio_path.exists():
@@ -44,68 +127,601 @@ def run_workflow(
     output_root.mkdir(parents=True, exist_ok=True)
 
     final_title = title.strip() or audio_path.stem
-    slug = _slugify(final_title)
+    slug = slugify(final_title)
 
     logger.info("Guardando notas en %s", output_root)
+    watch_idle_models(settings.whisper_idle_unload_seconds)
+    memory = StageMemory()
 
-    transcription = transcribe(
-        audio_path=audio_path,
-        model_size=settings.whisper_model_size,
-        compute_type=settings.whisper_compute_type,
-        language=settings.whisper_language,
+    # La admisión va antes de la huella: si la clase no cabe, el servicio la
+    # reintenta más tarde y no conviene volver a leer el audio completo cada
+    # vez. Se cuenta el borrador aunque al final se retome una clase sin él.
+    draft_model = _draft_model(settings, two_pass)
+    model_sizes = dict.fromkeys(size for size in (draft_model, settings.whisper_model_size) if size)
+    models = {size: resolve_model(settings, size) for size in model_sizes}
+    projected = admit_job(settings, models, audio_duration(audio_path))
+    if projected is not None:
+        metrics["projected_rss_mb"] = projected
+
+    audio_hash: Optional[str] = None
+    audio_print: Optional[AudioPrint] = None
+    resume: Optional[ResumeMatch] = None
+    previous: Optional[TranscriptArtifact] = None
+    resume_from = 0.0
+    if settings.audio_dedup:
+        stage_started = time.perf_counter()
+        audio_hash, audio_print, duplicate, resume = _find_duplicate(output_root, audio_path, force)
+        metrics["fingerprint_seconds"] = time.perf_counter() - stage_started
+        memory.mark("fingerprint")
+        if duplicate is not None:
+            memory.finish(metrics)
+            return _duplicate_result(duplicate, metrics)
+        if resume is not None:
+            previous, resume_from = _resume_point(resume)
+    if previous is not None:
+        final_title, class_date = previous.title, previous.class_date
+        slug = slugify(final_title)
+        metrics["resumed_from_seconds"] = resume_from
+
+    # Lo agregado a una clase suele ser corto: no hace falta un borrador.
+    if previous is not None:
+        draft_model = None
+
+    warmup_executor: Optional[ThreadPoolExecutor] = None
+    warmup: Optional[Future[float]] = None
+    if not skip_summary and settings.lm_studio_warmup:
+        warmup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lm-warmup")
+        warmup = warmup_executor.submit(warm_up_llm, get_backend(settings))
+
+    diarization_executor: Optional[ProcessPoolExecutor] = None
+    diarization: Optional[Future[List[SpeakerTurn]]] = None
+    if settings.diarization:
+        # En otro proceso para no competir con Whisper por el GIL.
+        diarization_executor = ProcessPoolExecutor(max_workers=1)
+        diarization = diarization_executor.submit(
+            diarize_cached, audio_path, output_root / DIARIZATION_CACHE_DIRNAME
+        )
+
+    try:
+        if previous is not None:
+            language: Optional[str] = previous.transcription.language
+        else:
+            language = _resolve_language(settings, output_root, slug, audio_path)
+        stage_started = time.perf_counter()
+        transcription = transcribe(
+            audio_path=audio_path,
+            model_path=models[draft_model or settings.whisper_model_size],
+            compute_type=settings.whisper_compute_type,
+            language=language,
+            profile="fast" if draft_model else (profile or settings.whisper_profile),
+            word_timestamps=settings.whisper_word_timestamps,
+            cpu_threads=settings.whisper_cpu_threads or None,
+            start_offset=resume_from,
+        )
+        metrics["transcription_seconds"] = time.perf_counter() - stage_started
+        memory.mark("transcription")
+    finally:
+        if warmup_executor is not None:
+            warmup_executor.shutdown(wait=False)
+        if diarization_executor is not None:
+            diarization_executor.shutdown(wait=False)
+
+    if warmup is not None:
+        _collect_warmup(warmup, metrics)
+
+    if previous is not None:
+        transcription = _append_tail(previous.transcription, transcription, resume_from)
+
+    turns: List[SpeakerTurn] = []
+    if diarization is not None:
+        turns = _collect_diarization(diarization, metrics)
+        _apply_speakers(transcription, turns)
+
+    # Lo que detecta el borrador es la apuesta del modelo más chico: se recuerda
+    # el idioma de la transcripción definitiva (ver ``_refine``).
+    if language is None and not draft_model:
+        with _index_lock:
+            remember_language(output_root, slug, transcription.language)
+
+    if resume is not None and previous is not None:
+        paths = paths_from_artifact(resume.artifact_path)
+    else:
+        paths = prepare_paths(output_root, class_date, slug)
+    save_transcript_artifact(
+        paths.artifact_path,
+        transcription,
+        title=final_title,
+        class_date=class_date,
+        audio_name=audio_path.name,
     )
 
-    summary: Optional[Summary] = None
+    generated: Optional[Summary] = None
     if skip_summary:
         logger.warning("Se omitirá la generación de resumen por petición del usuario")
     else:
+        stage_started = time.perf_counter()
+        generated = _summarize(settings, transcription, class_date, final_title)
+        metrics["summary_seconds"] = time.perf_counter() - stage_started
+        memory.mark("summary")
+    summary = generated or _placeholder_summary()
+
+    _publish(
+        settings,
+        output_root,
+        paths,
+        summary,
+        transcription,
+        final_title,
+        class_date,
+        audio_path,
+        metrics,
+    )
+    memory.mark("write")
+    if audio_hash is not None and audio_print is not None:
+        with _index_lock:
+            FingerprintIndex(output_root).add(audio_hash, audio_print, paths.artifact_path, audio_path.name)
+
+    refinement: Optional[Future[WorkflowResult]] = None
+    if draft_model:
         logger.info(
-            "Generando resumen con LM Studio usando el modelo %s", settings.lm_studio_model
+            "Borrador listo con el modelo %s; refinando con %s en segundo plano",
+            draft_model,
+            settings.whisper_model_size,
         )
-        try:
-            summary = call_lm_studio(
-                base_url=settings.lm_studio_base_url,
-                model=settings.lm_studio_model,
-                transcript=transcription.text,
-                class_date=class_date.isoformat(),
-                class_title=final_title,
-            )
-        except SummarizationError as exc:
-            logger.error("No se pudo generar el resumen: %s", exc)
-            logger.warning("La nota se creará únicamente con la transcripción.")
-
-    if summary is None:
-        summary = Summary(
-            avance_clase=["Revisar transcripción adjunta."],
-            tareas=[],
-            pendientes=[],
-            preguntas_examen=[],
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refinamiento")
+        refinement = executor.submit(
+            _refine,
+            settings,
+            output_root,
+            paths,
+            audio_path,
+            final_title,
+            class_date,
+            profile or settings.whisper_profile,
+            language,
+            skip_summary,
+            generated,
+            transcription,
+            turns,
         )
+        executor.shutdown(wait=False)
 
-    paths = prepare_paths(output_root, class_date, slug)
-    write_note(
-        paths=paths,
+    memory.finish(metrics)
+    metrics["total_seconds"] = time.perf_counter() - started
+
+    logger.info("Nota creada en %s", paths.note_path)
+    logger.info("Transcripción detallada guardada en %s", paths.transcript_path)
+    _log_metrics(metrics)
+
+    return WorkflowResult(
+        note_path=paths.note_path,
+        transcript_path=paths.transcript_path,
         summary=summary,
-        segments=transcription.segments,
+        transcription=transcription,
+        metrics=metrics,
+        refinement=refinement,
+    )
+
+
+def class_date_for(audio_path: Path) -> date:
+    """Fecha de la clase: prefijo ``YYYY-MM-DD`` del nombre o fecha de modificación."""
+
+    try:
+        return datetime.strptime(audio_path.name[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return date.fromtimestamp(audio_path.stat().st_mtime)
+
+
+def title_for(audio_path: Path) -> str:
+    """Título por defecto: el nombre del archivo sin el prefijo de fecha."""
+
+    stem = audio_path.stem
+    try:
+        datetime.strptime(stem[:10], "%Y-%m-%d")
+    except ValueError:
+        return stem
+    return stem[10:].strip(" -_") or stem
+
+
+def _find_duplicate(
+    notes_root: Path, audio_path: Path, force: bool
+) -> Tuple[str, Optional[AudioPrint], Optional[FingerprintMatch], Optional[ResumeMatch]]:
+    """Hash y huella del audio, y la clase ya transcrita con la que coincide.
+
+    Devuelve la clase idéntica o, si no la hay, aquella cuyo audio es el
+    comienzo de este. El audio recortado o recodificado se busca al final
+    porque una continuación corta también se le parece.
+    """
+
+    audio_hash = file_hash(audio_path)
+    index = FingerprintIndex(notes_root)
+    if not force:
+        match = index.find(audio_hash, None)
+        if match is not None:
+            return audio_hash, None, match, None
+
+    try:
+        audio_print = fingerprint(audio_path)
+    except FingerprintError as exc:
+        logger.warning("No se pudo calcular la huella del audio; no se buscarán duplicados: %s", exc)
+        return audio_hash, None, None, None
+    if force:
+        return audio_hash, audio_print, None, None
+    resume = index.find_prefix(audio_print.blocks)
+    if resume is not None:
+        return audio_hash, audio_print, None, resume
+    return audio_hash, audio_print, index.find(audio_hash, audio_print.prints), None
+
+
+def _resume_point(resume: ResumeMatch) -> Tuple[Optional[TranscriptArtifact], float]:
+    """Transcripción anterior y segundo desde el que transcribir lo agregado.
+
+    Se corta al final del último segmento que termina antes de
+    ``resume_seconds``: el segmento que cruza ese punto se vuelve a
+    transcribir completo. Devuelve ``(None, 0.0)`` si no hay nada que
+    conservar.
+    """
+
+    try:
+        previous = load_transcript_artifact(resume.artifact_path)
+    except (OSError, ArtifactError) as exc:
+        logger.warning("No se pudo leer la transcripción anterior; se transcribe todo: %s", exc)
+        return None, 0.0
+
+    ends = [end for end in previous.transcription.segments.ends if end <= resume.resume_seconds]
+    if not ends:
+        return None, 0.0
+    logger.info(
+        "El audio continúa a %s (%.0f s en común); solo se transcribe desde %.1f s",
+        resume.audio_name,
+        resume.resume_seconds,
+        max(ends),
+    )
+    return previous, max(ends)
+
+
+def _append_tail(
+    previous: TranscriptionResult, tail: TranscriptionResult, resume_from: float
+) -> TranscriptionResult:
+    """Segmentos anteriores hasta ``resume_from`` seguidos de los recién transcritos."""
+
+    segments = SegmentStore()
+    speakers: List[Optional[str]] = []
+    for index, segment in enumerate(previous.segments):
+        if segment.end > resume_from:
+            continue
+        segments.append(segment.start, segment.end, segment.text, previous.segments.words(index))
+        speakers.append(segment.speaker)
+    for index, segment in enumerate(tail.segments):
+        segments.append(segment.start, segment.end, segment.text, tail.segments.words(index))
+        speakers.append(None)
+    if previous.segments.has_speakers:
+        segments.set_speakers(speakers)
+
+    return TranscriptionResult(
+        segments=segments,
+        language=previous.language,
+        duration=tail.duration,
+        params={**tail.params, "resumed_from": resume_from},
+    )
+
+
+def _duplicate_result(match: FingerprintMatch, metrics: Dict[str, float]) -> WorkflowResult:
+    """Resultado que apunta a la nota existente de un audio repetido."""
+
+    paths = paths_from_artifact(match.artifact_path)
+    artifact = load_transcript_artifact(match.artifact_path)
+    try:
+        summary = load_summary_artifact(paths.summary_path)
+    except (OSError, ArtifactError):
+        summary = _placeholder_summary()
+
+    metrics["duplicate_bit_error_rate"] = match.bit_error_rate
+    logger.warning(
+        "Este audio ya se transcribió como %s (%.0f %% de bits distintos, desfase %.1f s); "
+        "se usa la nota existente %s. Usa --force para transcribirlo de nuevo.",
+        match.audio_name,
+        100 * match.bit_error_rate,
+        match.offset_seconds,
+        paths.note_path,
+    )
+    _log_metrics(metrics)
+    return WorkflowResult(
+        note_path=paths.note_path,
+        transcript_path=paths.transcript_path,
+        summary=summary,
+        transcription=artifact.transcription,
+        metrics=metrics,
+        duplicate=True,
+    )
+
+
+def _draft_model(settings: Settings, two_pass: Optional[bool]) -> Optional[str]:
+    """Modelo del borrador si corresponde hacer dos pasadas."""
+
+    if not (settings.whisper_two_pass if two_pass is None else two_pass):
+        return None
+    if settings.whisper_draft_model_size == settings.whisper_model_size:
+        logger.info("El modelo del borrador coincide con el final; se transcribe una sola vez")
+        return None
+    return settings.whisper_draft_model_size
+
+
+def _resolve_language(
+    settings: Settings, notes_root: Path, slug: str, audio_path: Path
+) -> Optional[str]:
+    """Idioma a forzar en Whisper, o ``None`` para que lo detecte el modelo.
+
+    Orden: ``WHISPER_LANGUAGE``, el idioma recordado para la asignatura y, si
+    ``WHISPER_LANGUAGE_PROBE`` está activo, una detección rápida con el modelo
+    más pequeño sobre los primeros segundos del audio.
+    """
+
+    if settings.whisper_language:
+        return settings.whisper_language
+
+    language = remembered_language(notes_root, slug)
+    if language:
+        logger.info("Se usa el idioma recordado para '%s': %s", slug, language)
+        return language
+
+    if settings.whisper_language_probe:
+        language = detect_language(
+            audio_path, resolve_model(settings, PROBE_MODEL_SIZE), cpu_threads=settings.whisper_cpu_threads
+        )
+        if language:
+            with _index_lock:
+                remember_language(notes_root, slug, language)
+        return language
+    return None
+
+
+def _refine(
+    settings: Settings,
+    notes_root: Path,
+    paths: NotePaths,
+    audio_path: Path,
+    title: str,
+    class_date: date,
+    profile: str,
+    language: Optional[str],
+    skip_summary: bool,
+    draft_summary: Optional[Summary],
+    draft: TranscriptionResult,
+    turns: List[SpeakerTurn],
+) -> WorkflowResult:
+    """Segunda pasada: vuelve a transcribir con el modelo configurado.
+
+    La transcripción y la nota se reemplazan de forma atómica. El resumen solo
+    se pide de nuevo si el texto refinado difiere lo suficiente del borrador
+    (o si el borrador se quedó sin resumen); si no, se conserva el anterior.
+
+    ``language`` es el idioma configurado o recordado; si es ``None``, el
+    modelo definitivo lo detecta por su cuenta (sin heredar lo que creyó el
+    borrador) y ese es el que se recuerda para la asignatura.
+    """
+
+    started = time.perf_counter()
+    metrics: Dict[str, float] = {}
+    memory = StageMemory()
+
+    transcription = transcribe(
+        audio_path=audio_path,
+        model_path=resolve_model(settings, settings.whisper_model_size),
+        compute_type=settings.whisper_compute_type,
+        language=language,
+        profile=profile,
+        word_timestamps=settings.whisper_word_timestamps,
+        cpu_threads=settings.whisper_cpu_threads or None,
+    )
+    metrics["transcription_seconds"] = time.perf_counter() - started
+    memory.mark("transcription")
+    _apply_speakers(transcription, turns)
+    if language is None:
+        with _index_lock:
+            remember_language(notes_root, slugify(title), transcription.language)
+
+    save_transcript_artifact(
+        paths.artifact_path,
+        transcription,
+        title=title,
         class_date=class_date,
-        title=final_title,
         audio_name=audio_path.name,
-        language=transcription.language,
-        duration_minutes=transcription.duration / 60,
     )
 
-    logger.info("Nota creada en %s", paths.note_path)
-    logger.info("Transcripción detallada guardada en %s", paths.transcript_path)
+    similarity = text_similarity(draft.text, transcription.text)
+    metrics["draft_similarity"] = similarity
+    summary = draft_summary
+    if not skip_summary and (draft_summary is None or similarity < REFINE_SUMMARY_THRESHOLD):
+        logger.info(
+            "Se regenera el resumen con el texto refinado (similitud con el borrador: %.2f)",
+            similarity,
+        )
+        stage_started = time.perf_counter()
+        summary = _summarize(settings, transcription, class_date, title) or draft_summary
+        metrics["summary_seconds"] = time.perf_counter() - stage_started
+        memory.mark("summary")
+
+    _publish(
+        settings,
+        notes_root,
+        paths,
+        summary or _placeholder_summary(),
+        transcription,
+        title,
+        class_date,
+        audio_path,
+        metrics,
+    )
+    memory.mark("write")
+    memory.finish(metrics)
+    metrics["total_seconds"] = time.perf_counter() - started
+
+    logger.info("Transcripción refinada guardada en %s", paths.transcript_path)
+    _log_metrics(metrics)
 
     return WorkflowResult(
         note_path=paths.note_path,
         transcript_path=paths.transcript_path,
-        summary=summary,
+        summary=summary or _placeholder_summary(),
         transcription=transcription,
+        metrics=metrics,
+    )
+
+
+def text_similarity(first: str, second: str) -> float:
+    """Proporción de pares de palabras seguidas en común entre dos textos (1.0 = idénticos).
+
+    Compara los multiconjuntos de bigramas de palabras en tiempo lineal: una
+    alineación completa (``difflib``) tarda segundos en una clase de dos horas.
+    Los pares conservan el orden local, así que una palabra cambiada resta dos
+    pares y el valor baja más o menos el doble de rápido que la proporción de
+    palabras distintas.
+    """
+
+    first_pairs = _word_pairs(first)
+    second_pairs = _word_pairs(second)
+    total = sum(first_pairs.values()) + sum(second_pairs.values())
+    if not total:
+        return 1.0
+    return 2 * sum((first_pairs & second_pairs).values()) / total
+
+
+def _word_pairs(text: str) -> Counter:
+    words = text.lower().split()
+    if len(words) < 2:
+        return Counter((word,) for word in words)
+    return Counter(zip(words, words[1:]))
+
+
+def _summarize(
+    settings: Settings, transcription: TranscriptionResult, class_date: date, title: str
+) -> Optional[Summary]:
+    backend = get_backend(settings)
+    logger.info("Generando resumen con %s usando el modelo %s", backend.title, backend.model)
+    try:
+        return request_summary(
+            backend,
+            transcript=transcription.text,
+            class_date=class_date.isoformat(),
+            class_title=title,
+            segments=transcription.segments,
+            budget_tokens=settings.lm_studio_prompt_tokens
+            or settings.lm_studio_context_tokens - RESPONSE_TOKENS,
+        )
+    except SummarizationError as exc:
+        logger.error("No se pudo generar el resumen: %s", exc)
+        logger.warning("La nota se creará únicamente con la transcripción.")
+        return None
+
+
+def _placeholder_summary() -> Summary:
+    return Summary(
+        avance_clase=["Revisar transcripción adjunta."],
+        tareas=[],
+        pendientes=[],
+        preguntas_examen=[],
     )
 
 
-def _slugify(value: str) -> str:
-    normalized = value.strip().lower().replace(" ", "-")
-    allowed = [c for c in normalized if c.isalnum() or c in {"-", "_"}]
-    return "".join(allowed) or "clase"
+def _publish(
+    settings: Settings,
+    notes_root: Path,
+    paths: NotePaths,
+    summary: Summary,
+    transcription: TranscriptionResult,
+    title: str,
+    class_date: date,
+    audio_path: Path,
+    metrics: Dict[str, float],
+) -> None:
+    """Escribe resumen, nota, transcripción e índices.
+
+    Con ``AUDIO_LINK`` el audio se copia o enlaza antes junto a la
+    transcripción, para que sus tiempos sean enlaces reproducibles.
+    """
+
+    stage_started = time.perf_counter()
+    save_summary_artifact(paths.summary_path, summary)
+    place_audio(paths, audio_path, settings.audio_link)
+    write_note(
+        paths=paths,
+        summary=summary,
+        segments=transcription.segments,
+        class_date=class_date,
+        title=title,
+        audio_name=audio_path.name,
+        language=transcription.language,
+        duration_minutes=transcription.duration / 60,
+    )
+    metrics["write_seconds"] = time.perf_counter() - stage_started
+
+    if settings.lm_studio_embedding_model:
+        stage_started = time.perf_counter()
+        _update_semantic_index(settings, notes_root, paths, title, class_date, transcription)
+        metrics["embedding_seconds"] = time.perf_counter() - stage_started
+
+
+def _update_semantic_index(
+    settings: Settings,
+    notes_root: Path,
+    paths: NotePaths,
+    title: str,
+    class_date: date,
+    transcription: TranscriptionResult,
+) -> None:
+    """Agrega la clase al índice semántico; un fallo aquí no invalida la nota."""
+
+    try:
+        with _index_lock:
+            SemanticIndex(notes_root).update_note(
+                paths.note_path,
+                paths.transcript_path,
+                title,
+                class_date,
+                transcription.segments,
+                lm_studio_embedder(settings.lm_studio_base_url, settings.lm_studio_embedding_model),
+            )
+    except SemanticIndexError as exc:
+        logger.warning("No se pudo actualizar el índice semántico: %s", exc)
+
+
+def _collect_diarization(
+    diarization: Future[List[SpeakerTurn]], metrics: Dict[str, float]
+) -> List[SpeakerTurn]:
+    """Espera los turnos de hablante; si fallan, la nota sale sin esa columna."""
+
+    waited = time.perf_counter()
+    try:
+        turns = diarization.result()
+    except Exception as exc:  # noqa: BLE001 - los hablantes son opcionales, la nota sale igual
+        logger.warning("No se pudo separar a los hablantes: %s", exc)
+        return []
+    metrics["diarization_wait_seconds"] = time.perf_counter() - waited
+    return turns
+
+
+def _apply_speakers(transcription: TranscriptionResult, turns: List[SpeakerTurn]) -> None:
+    if not turns:
+        return
+    segments = transcription.segments
+    segments.set_speakers(speakers_for(segments.starts, segments.ends, turns))
+
+
+def _collect_warmup(warmup: Future[float], metrics: Dict[str, float]) -> None:
+    """Espera a que termine la precarga y registra su latencia.
+
+    Normalmente la precarga ya terminó cuando Whisper acaba; si no, esperar
+    aquí es equivalente a lo que habría esperado la primera petición de
+    resumen.
+    """
+
+    try:
+        metrics["warmup_seconds"] = warmup.result()
+    except SummarizationError as exc:
+        logger.warning("No se pudo precargar el modelo de lenguaje: %s", exc)
+
+
+def _log_metrics(metrics: Dict[str, float]) -> None:
+    details = ", ".join(f"{key}={value:.2f}" for key, value in metrics.items())
+    logger.info("Métricas del proceso: %s", details)
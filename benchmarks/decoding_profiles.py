@@ -0,0 +1,100 @@
+"""Compara velocidad y precisión de los perfiles de decodificación de Whisper.
+
+Uso::
+
+    python benchmarks/decoding_profiles.py clase.mp3 --reference clase.txt
+
+Para cada perfil transcribe el audio y muestra el RTF (tiempo de
+transcripción dividido por la duración del audio; menor es más rápido) y, si se
+indica una transcripción de referencia, el WER (proporción de palabras
+sustituidas, borradas o insertadas). El tiempo incluye la carga del modelo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import get_settings  # noqa: E402
+from app.models import resolve_model  # noqa: E402
+from app.transcriber import DECODING_PROFILES, transcribe, unload_models  # noqa: E402
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_words(text: str) -> List[str]:
+    """Minúsculas, sin tildes ni puntuación, para que el WER mida palabras."""
+
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _WORD.findall(stripped)
+
+
+def word_error_rate(reference: Sequence[str], hypothesis: Sequence[str]) -> float:
+    """Distancia de edición por palabras dividida por el largo de la referencia."""
+
+    if not reference:
+        return float(bool(hypothesis))
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, start=1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(reference)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("audio", type=Path, help="Audio de prueba.")
+    parser.add_argument("--reference", type=Path, default=None, help="Texto de referencia para el WER.")
+    parser.add_argument("--model-size", default="small")
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=list(DECODING_PROFILES),
+        choices=list(DECODING_PROFILES),
+    )
+    args = parser.parse_args(argv)
+
+    reference = None
+    if args.reference is not None:
+        reference = normalize_words(args.reference.read_text(encoding="utf-8"))
+
+    model_path = resolve_model(get_settings(), args.model_size)
+    print(f"{'perfil':<10} {'cómputo':<9} {'segundos':>9} {'RTF':>7} {'WER':>7}")
+    for name in args.profiles:
+        unload_models()
+        started = time.perf_counter()
+        result = transcribe(
+            args.audio,
+            model_path,
+            language=args.language,
+            device=args.device,
+            profile=name,
+        )
+        elapsed = time.perf_counter() - started
+        rtf = elapsed / result.duration if result.duration else float("nan")
+        wer = "-"
+        if reference is not None:
+            wer = f"{word_error_rate(reference, normalize_words(result.text)):.3f}"
+        print(
+            f"{name:<10} {result.params['compute_type']:<9} {elapsed:>9.1f} {rtf:>7.3f} {wer:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Prueba de carga: cuántas clases por hora procesa esta máquina.
+
+Uso::
+
+    python benchmarks/load_generator.py --jobs 12 --minutes 5 20 60 --llm-latency-ms 8000
+
+Genera ``--jobs`` audios sintéticos con las duraciones de ``--minutes`` (se
+recorren en ciclo) y los envía al ``WorkflowPool``, todos de una vez o, con
+``--rate``, a ese ritmo medio (llegadas de Poisson). Los resúmenes los responde
+un único servidor simulado de ``app.llm_stub`` que corre en este proceso, con
+la demora y la cantidad de peticiones simultáneas indicadas; todos los
+procesos del pool le hablan por HTTP como a LM Studio, así que compiten por
+él igual que por un servidor real y solo se necesita el modelo de Whisper.
+
+Al terminar muestra el rendimiento (clases y horas de audio por hora), los
+percentiles 50/95/99 de la latencia de punta a punta, la espera en cola (la
+latencia menos el tiempo de ``run_workflow``; incluye la carga del modelo en
+cada proceso) y qué parte de la capacidad de los procesos se fue en cada
+etapa según las métricas de ``run_workflow`` (algunas, como el
+precalentamiento del modelo de lenguaje, corren en paralelo con otras y se
+solapan).
+
+El audio sintético imita la voz (sílabas con armónicos y pausas), pero el
+filtro de voz de Whisper puede tratarlo distinto que una clase real: con
+``--source clase.mp3`` los audios se arman repitiendo esa grabación. La
+detección de duplicados se desactiva porque esos audios se repiten.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.llm_stub import StubLLMServer  # noqa: E402
+from app.memory import MemoryBudgetError  # noqa: E402
+from app.transcriber import SAMPLE_RATE, iter_audio_chunks  # noqa: E402
+from app.worker_pool import WorkflowJob, WorkflowPool  # noqa: E402
+
+BLOCK_SECONDS = 30
+
+
+@dataclass
+class JobTiming:
+    """Tiempos de una clase enviada al pool."""
+
+    audio_seconds: float
+    submitted: float
+    finished: float = 0.0
+    metrics: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def latency(self) -> float:
+        return self.finished - self.submitted
+
+    @property
+    def queue_wait(self) -> float:
+        return max(0.0, self.latency - self.metrics.get("total_seconds", 0.0))
+
+
+def synthetic_speech(seconds: float, seed: int) -> Iterator[np.ndarray]:
+    """Bloques ``float32`` de una señal parecida a la voz: sílabas sonoras y pausas."""
+
+    rng = np.random.default_rng(seed)
+    harmonics = np.arange(1, 25)
+    remaining = int(seconds * SAMPLE_RATE)
+    carry = np.zeros(0, dtype=np.float32)
+    while remaining > 0:
+        block = np.zeros(BLOCK_SECONDS * SAMPLE_RATE + carry.size, dtype=np.float32)
+        block[: carry.size] = carry
+        position = carry.size
+        while position < BLOCK_SECONDS * SAMPLE_RATE:
+            length = int(rng.uniform(0.08, 0.35) * SAMPLE_RATE)
+            if rng.random() < 0.2:
+                position += length * (4 if rng.random() < 0.1 else 1)
+                continue
+            t = np.arange(length) / SAMPLE_RATE
+            pitch = rng.uniform(100, 220)
+            formant = rng.uniform(300, 900)
+            amplitude = np.exp(-((harmonics * pitch - formant) ** 2) / 2e5)
+            phases = rng.uniform(0, 2 * np.pi, harmonics.size)
+            syllable = (amplitude[:, None] * np.sin(2 * np.pi * pitch * harmonics[:, None] * t + phases[:, None])).sum(0)
+            syllable *= np.hanning(length) * rng.uniform(0.2, 1.0)
+            end = min(position + length, block.size)
+            block[position:end] += syllable[: end - position].astype(np.float32)
+            position += length
+        size = min(remaining, BLOCK_SECONDS * SAMPLE_RATE)
+        carry = block[size:]
+        chunk = block[:size]
+        peak = np.abs(chunk).max() or 1.0
+        yield 0.3 * chunk / peak
+        remaining -= size
+
+
+def looped_source(source: Path, seconds: float, offset: int) -> Iterator[np.ndarray]:
+    """Bloques de ``source`` repetida hasta completar ``seconds``, empezando en otro bloque por clase."""
+
+    blocks = list(iter_audio_chunks(source, chunk_seconds=BLOCK_SECONDS))
+    if not blocks:
+        raise SystemExit(f"No se pudo leer audio de {source}")
+    remaining = int(seconds * SAMPLE_RATE)
+    index = offset
+    while remaining > 0:
+        block = blocks[index % len(blocks)][:remaining]
+        yield block
+        remaining -= block.size
+        index += 1
+
+
+def write_wav(path: Path, blocks: Iterator[np.ndarray]) -> float:
+    """Escribe bloques ``float32`` como WAV de 16 bits y devuelve la duración."""
+
+    samples = 0
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(SAMPLE_RATE)
+        for block in blocks:
+            handle.writeframes((np.clip(block, -1, 1) * 32767).astype("<i2").tobytes())
+            samples += block.size
+    return samples / SAMPLE_RATE
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def run(
+    audio_paths: List[Path],
+    durations: List[float],
+    notes_root: Path,
+    rate: Optional[float],
+    profile: Optional[str],
+    seed: int,
+) -> tuple:
+    rng = random.Random(seed)
+    timings: List[JobTiming] = []
+    lock = threading.Lock()
+
+    def finished(timing: JobTiming, future: Future) -> None:
+        with lock:
+            timing.finished = time.perf_counter()
+            try:
+                timing.metrics = future.result().metrics
+            except Exception as exc:  # noqa: BLE001 - se informa en el reporte
+                timing.error = f"{type(exc).__name__}: {exc}"
+
+    pool = WorkflowPool(len(audio_paths), profile=profile, two_pass=False)
+    started = time.perf_counter()
+    futures = []
+    with pool:
+        next_arrival = started
+        for index, (path, seconds) in enumerate(zip(audio_paths, durations)):
+            if rate:
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+                next_arrival += rng.expovariate(rate / 3600)
+            job = WorkflowJob(
+                audio_path=path,
+                title=f"Carga {index:03d}",
+                class_date=date(2024, 1, 1),
+                notes_root=notes_root,
+                profile=profile,
+                two_pass=False,
+            )
+            timing = JobTiming(audio_seconds=seconds, submitted=time.perf_counter())
+            timings.append(timing)
+            try:
+                future = pool.submit(job)
+            except MemoryBudgetError as exc:
+                timing.finished = time.perf_counter()
+                timing.error = f"{type(exc).__name__}: {exc}"
+                continue
+            future.add_done_callback(lambda done, timing=timing: finished(timing, done))
+            futures.append(future)
+        for future in futures:
+            future.exception()
+    wall = time.perf_counter() - started
+    return timings, wall, pool.plan.workers
+
+
+def report(timings: List[JobTiming], wall: float, workers: int) -> dict:
+    done = [timing for timing in timings if timing.error is None]
+    latencies = [timing.latency for timing in done]
+    waits = [timing.queue_wait for timing in done]
+    audio_hours = sum(timing.audio_seconds for timing in done) / 3600
+
+    stages: Dict[str, float] = {}
+    for timing in done:
+        for name, value in timing.metrics.items():
+            if name.endswith("_seconds") and name != "total_seconds":
+                stages[name[: -len("_seconds")]] = stages.get(name[: -len("_seconds")], 0.0) + value
+    capacity = wall * workers
+    busy = sum(timing.metrics.get("total_seconds", 0.0) for timing in done)
+
+    return {
+        "jobs": len(timings),
+        "failed": len(timings) - len(done),
+        "workers": workers,
+        "wall_seconds": wall,
+        "lectures_per_hour": len(done) / wall * 3600 if wall else 0.0,
+        "audio_hours_per_hour": audio_hours / wall * 3600 if wall else 0.0,
+        "latency_seconds": {q: percentile(latencies, q) for q in (50, 95, 99)},
+        "queue_wait_seconds": {q: percentile(waits, q) for q in (50, 95, 99)},
+        "peak_rss_mb": max((timing.metrics.get("peak_rss_mb", 0.0) for timing in done), default=0.0),
+        "utilization": {
+            "total": busy / capacity if capacity else 0.0,
+            **{name: total / capacity if capacity else 0.0 for name, total in sorted(stages.items())},
+        },
+        "errors": sorted({timing.error for timing in timings if timing.error}),
+    }
+
+
+def print_report(data: dict) -> None:
+    print(f"Clases: {data['jobs']} ({data['failed']} fallidas) en {data['workers']} procesos")
+    print(f"Tiempo total: {data['wall_seconds']:.1f} s")
+    print(f"Rendimiento: {data['lectures_per_hour']:.1f} clases/h, {data['audio_hours_per_hour']:.2f} h de audio/h")
+    print(f"{'':<22} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, key in (("Latencia total (s)", "latency_seconds"), ("Espera en cola (s)", "queue_wait_seconds")):
+        values = data[key]
+        print(f"{label:<22} {values[50]:>9.1f} {values[95]:>9.1f} {values[99]:>9.1f}")
+    print(f"Memoria máxima de un proceso: {data['peak_rss_mb']:.0f} MB")
+    print("Uso de la capacidad de los procesos:")
+    for name, share in data["utilization"].items():
+        print(f"  {name:<24} {100 * share:6.1f} %")
+    for error in data["errors"]:
+        print(f"Error: {error}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=8, help="Cantidad de clases a procesar.")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[5.0], help="Duraciones de los audios.")
+    parser.add_argument("--source", type=Path, default=None, help="Grabación real para armar los audios.")
+    parser.add_argument("--rate", type=float, default=None, help="Clases por hora (por defecto, todas juntas).")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (WORKER_PROCESSES).")
+    parser.add_argument("--llm-latency-ms", type=int, default=5000, help="Demora del servidor simulado.")
+    parser.add_argument("--llm-slots", type=int, default=1, help="Peticiones simultáneas del servidor simulado.")
+    parser.add_argument("--profile", default=None, help="Perfil de decodificación de Whisper.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--workdir", type=Path, default=None, help="Carpeta para audios y notas (se conserva).")
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte como JSON.")
+    args = parser.parse_args(argv)
+
+    # Un solo servidor para todo el pool: con ``LLM_BACKEND=stub`` cada proceso
+    # tendría el suyo y nunca habría que esperar un lugar libre.
+    server = StubLLMServer(latency_ms=args.llm_latency_ms, slots=args.llm_slots)
+    # Los procesos del pool heredan estas variables.
+    os.environ.update(
+        {
+            "LLM_BACKEND": "lmstudio",
+            "LM_STUDIO_BASE_URL": server.base_url,
+            "LM_STUDIO_EMBEDDING_MODEL": "",
+            "AUDIO_DEDUP": "false",
+        }
+    )
+    if args.workers:
+        os.environ["WORKER_PROCESSES"] = str(args.workers)
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="carga-"))
+    audio_dir = workdir / "audio"
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        paths, durations = [], []
+        for index in range(args.jobs):
+            seconds = args.minutes[index % len(args.minutes)] * 60
+            path = audio_dir / f"clase-{index:03d}.wav"
+            if args.source is not None:
+                blocks = looped_source(args.source, seconds, offset=index)
+            else:
+                blocks = synthetic_speech(seconds, seed=args.seed + index)
+            durations.append(write_wav(path, blocks))
+            paths.append(path)
+
+        timings, wall, workers = run(paths, durations, workdir / "notas", args.rate, args.profile, args.seed)
+        data = report(timings, wall, workers)
+    finally:
+        server.close()
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(data, indent=2))
+    else:
+        print_report(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Mide cuánto *prefill* ahorra el prefijo común de los prompts.
+
+Uso::
+
+    python benchmarks/prompt_cache.py --requests 12 --chunk-tokens 800
+
+Usa el servidor simulado de ``app.llm_stub``, que imita la caché de llama.cpp:
+recuerda el último prompt y solo "procesa" (esperando ``--ms-per-token`` por
+token) la parte que no coincide con él, siempre que la petición lleve
+``cache_prompt``. Envía con ``request_json`` una serie de
+peticiones del repaso de curso con el formato anterior (datos antes de las
+instrucciones) y con el actual (instrucciones fijas primero), con y sin
+``cache_prompt``, y compara los tokens procesados y el tiempo de *prefill*.
+Los tokens se estiman por caracteres, igual para todas las variantes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.course_review import MAP_SYSTEM_PROMPT, _map_prompt  # noqa: E402
+from app.llm_backends import StubBackend  # noqa: E402
+from app.llm_stub import StubLLMServer  # noqa: E402
+from app.prompt_budget import CHARS_PER_TOKEN  # noqa: E402
+from app.summarizer import request_json  # noqa: E402
+from app.transcriber import format_timestamp  # noqa: E402
+
+WORDS = (
+    "la matriz tiene valores propios que dependen del polinomio característico "
+    "para el próximo lunes deben entregar el informe de laboratorio con los resultados"
+).split()
+
+
+def _legacy_map_prompt(lecture: SimpleNamespace, passages: List[Tuple[float, str]]) -> str:
+    """Formato anterior: los datos de la clase van antes de las instrucciones."""
+
+    fragments = "\n".join(f"[{format_timestamp(start)}] {text}" for start, text in passages)
+    return (
+        f"Clase: {lecture.title}\n"
+        f"Fecha: {lecture.class_date.isoformat()}\n\n"
+        f"Fragmentos de la transcripción:\n{fragments}\n\n"
+        "Devuelve un JSON con los temas clave y preguntas de examen de esta clase."
+    )
+
+
+def _lectures(count: int, chunk_tokens: int, seed: int) -> List[Tuple[SimpleNamespace, list]]:
+    rng = random.Random(seed)
+    lectures = []
+    for index in range(count):
+        class_date = date(2024, 3, 4) + timedelta(days=7 * index)
+        lecture = SimpleNamespace(title="Álgebra lineal", class_date=class_date)
+        passages = []
+        size = 0
+        while size < chunk_tokens * CHARS_PER_TOKEN:
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))
+            passages.append((float(60 * len(passages)), text))
+            size += len(text)
+        lectures.append((lecture, passages))
+    return lectures
+
+
+def _run(
+    server: StubLLMServer,
+    lectures: List[Tuple[SimpleNamespace, list]],
+    build: Callable[[SimpleNamespace, list], str],
+    cache_prompt: bool,
+) -> Tuple[int, int, float, float]:
+    server.reset()
+    backend = StubBackend(server, cache_prompt=cache_prompt)
+    started = time.perf_counter()
+    for lecture, passages in lectures:
+        request_json(backend, MAP_SYSTEM_PROMPT, build(lecture, passages))
+    elapsed = time.perf_counter() - started
+    stats = server.stats
+    return stats.processed_tokens, stats.cached_tokens, stats.prefill_seconds, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=12, help="Peticiones (clases) seguidas.")
+    parser.add_argument("--chunk-tokens", type=int, default=800, help="Tokens de datos por petición.")
+    parser.add_argument("--ms-per-token", type=float, default=2.0, help="Costo simulado del prefill.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    lectures = _lectures(args.requests, args.chunk_tokens, args.seed)
+    server = StubLLMServer(prefill_ms_per_token=args.ms_per_token)
+    variants = [
+        ("anterior, sin caché", _legacy_map_prompt, False),
+        ("anterior, cache_prompt", _legacy_map_prompt, True),
+        ("prefijo fijo, cache_prompt", _map_prompt, True),
+    ]
+    try:
+        results = [(name, *_run(server, lectures, build, cache)) for name, build, cache in variants]
+    finally:
+        server.close()
+
+    baseline = results[0][3]
+    print(f"{args.requests} peticiones de ~{args.chunk_tokens} tokens de datos, {args.ms_per_token} ms/token")
+    print(
+        f"{'variante':<28} {'procesados':>10} {'en caché':>9} {'prefill s':>10} {'total s':>8} {'ahorro':>7}"
+    )
+    for name, processed, cached, prefill, elapsed in results:
+        saving = 100 * (1 - prefill / baseline) if baseline else 0.0
+        print(f"{name:<28} {processed:>10} {cached:>9} {prefill:>10.2f} {elapsed:>8.2f} {saving:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compara la memoria usada por los segmentos de una transcripción larga.
+
+Uso::
+
+    python benchmarks/segment_memory.py --segments 40000
+
+Mide con ``tracemalloc`` la representación anterior (lista de dataclasses con
+``__dict__`` más una copia del texto unido) frente a ``SegmentStore``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.transcriber import SegmentStore  # noqa: E402
+
+WORDS = (
+    "la matriz tiene valores propios que dependen del polinomio característico "
+    "para el próximo lunes deben entregar el informe de laboratorio con los resultados"
+).split()
+
+
+@dataclass
+class LegacySegment:
+    start: float
+    end: float
+    text: str
+
+
+def _random_texts(count: int, seed: int) -> List[Tuple[float, float, str]]:
+    rng = random.Random(seed)
+    rows = []
+    cursor = 0.0
+    for _ in range(count):
+        length = rng.uniform(1.5, 7.0)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 18)))
+        rows.append((cursor, cursor + length, text))
+        cursor += length
+    return rows
+
+
+def _build_legacy(rows: List[Tuple[float, float, str]]) -> object:
+    segments = [LegacySegment(start, end, text) for start, end, text in rows]
+    text = " ".join(segment.text for segment in segments).strip()
+    return segments, text
+
+
+def _build_store(rows: List[Tuple[float, float, str]]) -> object:
+    store = SegmentStore()
+    for start, end, text in rows:
+        store.append(start, end, text)
+    store.text  # fuerza la construcción del buffer
+    return store
+
+
+def _measure(builder: Callable[[List[Tuple[float, float, str]]], object], rows) -> Tuple[int, float]:
+    tracemalloc.start()
+    # Los textos se copian dentro de la medición, como si llegaran de Whisper:
+    # lo que siga vivo al final es lo que la representación retiene.
+    rows = [(start, end, "".join(list(text))) for start, end, text in rows]
+    started = time.perf_counter()
+    result = builder(rows)
+    elapsed = time.perf_counter() - started
+    del rows
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=40_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = _random_texts(args.segments, args.seed)
+    legacy_bytes, legacy_time = _measure(_build_legacy, rows)
+    store_bytes, store_time = _measure(_build_store, rows)
+
+    print(f"Segmentos: {args.segments}")
+    print(f"Lista de dataclasses + texto: {legacy_bytes / 1e6:8.2f} MB  ({legacy_time:.3f} s)")
+    print(f"SegmentStore:                 {store_bytes / 1e6:8.2f} MB  ({store_time:.3f} s)")
+    print(f"Ahorro: {100 * (1 - store_bytes / legacy_bytes):.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Mide cuánto ocupan las marcas de tiempo por palabra.
+
+Uso::
+
+    python benchmarks/word_timestamps_storage.py --segments 1500
+
+Genera una transcripción sintética (por defecto, unas dos horas de clase) y
+compara el tamaño del archivo ``-transcripcion.jsonl`` sin palabras, con la
+codificación plana que usa la aplicación y con un objeto JSON por palabra,
+además de la memoria que agrega ``SegmentStore`` al guardar las palabras.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import tracemalloc
+from datetime import date
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.artifacts import save_transcript_artifact  # noqa: E402
+from app.transcriber import SegmentStore, TranscriptionResult, Word  # noqa: E402
+
+WORDS = (
+    "la matriz tiene valores propios que dependen del polinomio característico "
+    "para el próximo lunes deben entregar el informe de laboratorio con los resultados"
+).split()
+
+Row = Tuple[float, float, str, List[Word]]
+
+
+def _random_rows(count: int, seed: int) -> List[Row]:
+    rng = random.Random(seed)
+    rows = []
+    cursor = 0.0
+    for _ in range(count):
+        tokens = [rng.choice(WORDS) for _ in range(rng.randint(4, 18))]
+        words = []
+        word_cursor = cursor
+        for token in tokens:
+            length = rng.uniform(0.15, 0.6)
+            words.append(Word(word_cursor, word_cursor + length, " " + token, rng.uniform(0.4, 1.0)))
+            word_cursor += length
+        rows.append((cursor, word_cursor, " ".join(tokens), words))
+        cursor = word_cursor + rng.uniform(0.0, 0.8)
+    return rows
+
+
+def _build_store(rows: List[Row], with_words: bool) -> SegmentStore:
+    store = SegmentStore()
+    for start, end, text, words in rows:
+        store.append(start, end, text, words if with_words else ())
+    store.text
+    return store
+
+
+def _artifact_size(store: SegmentStore, folder: Path, name: str) -> int:
+    path = folder / name
+    transcription = TranscriptionResult(store, "es", store.ends[-1])
+    save_transcript_artifact(path, transcription, "Benchmark", date(2024, 5, 20), "clase.mp3")
+    return path.stat().st_size
+
+
+def _naive_size(rows: List[Row]) -> int:
+    """Tamaño si cada palabra se guardara como objeto JSON con su texto."""
+
+    total = 0
+    for start, end, text, words in rows:
+        row = [
+            round(start, 3),
+            round(end, 3),
+            text,
+            [
+                {
+                    "start": round(word.start, 3),
+                    "end": round(word.end, 3),
+                    "word": word.text,
+                    "probability": round(word.probability, 2),
+                }
+                for word in words
+            ],
+        ]
+        total += len(json.dumps(row, ensure_ascii=False).encode("utf-8")) + 1
+    return total
+
+
+def _memory(rows: List[Row], with_words: bool) -> int:
+    tracemalloc.start()
+    store = _build_store(rows, with_words)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = _random_rows(args.segments, args.seed)
+    word_count = sum(len(words) for *_, words in rows)
+
+    with tempfile.TemporaryDirectory() as folder:
+        plain = _artifact_size(_build_store(rows, False), Path(folder), "plano.jsonl")
+        compact = _artifact_size(_build_store(rows, True), Path(folder), "palabras.jsonl")
+    naive = _naive_size(rows)
+    plain_memory = _memory(rows, False)
+    words_memory = _memory(rows, True)
+
+    print(f"Segmentos: {args.segments}, palabras: {word_count}")
+    print(f"Archivo sin palabras:        {plain / 1e3:9.1f} kB")
+    print(f"Con palabras (lista plana):  {compact / 1e3:9.1f} kB  (+{100 * (compact / plain - 1):.0f} %)")
+    print(f"Con un objeto por palabra:   {naive / 1e3:9.1f} kB  (+{100 * (naive / plain - 1):.0f} %)")
+    print(f"Bytes por palabra (plana):   {(compact - plain) / word_count:9.1f}")
+    print(f"Memoria SegmentStore sin/con palabras: {plain_memory / 1e6:.2f} / {words_memory / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
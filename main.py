@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import multiprocessing
 import sys
 
 
@@ -16,6 +17,8 @@ def _launch_cli() -> None:
 
 
 if __name__ == "__main__":
+    # Necesario para los procesos auxiliares (diarización) en el ejecutable de Windows.
+    multiprocessing.freeze_support()
     args = sys.argv[1:]
     if not args or "--gui" in args:
         if "--gui" in args:
@@ -24,7 +27,3 @@ if __name__ == "__main__":
         _launch_gui()
     else:
         _launch_cli()
-from app.cli import main
-
-if __name__ == "__main__":
-    main()
@@ -67,6 +67,14 @@ copy /Y .env.windows.example dist\%APP_NAME%\plantilla.env >nul
 copy /Y packaging\windows\portable-readme.txt dist\%APP_NAME%\LEEME.txt >nul
 copy /Y docker-compose.yml dist\%APP_NAME%\docker-compose.yml >nul
 
+echo === Descargando el modelo de Whisper para usarlo sin conexion...
+set "WHISPER_MODELS_DIR=%CD%\dist\%APP_NAME%\models"
+python main.py models download small
+if errorlevel 1 (
+    echo [AVISO] No se pudo descargar el modelo; se descargara en el primer uso.
+)
+set "WHISPER_MODELS_DIR="
+
 if exist packaging\windows\bundled (
     echo === Integrando recursos portables (LM Studio, Obsidian, etc.)...
     xcopy /E /I /Y "packaging\windows\bundled" "dist\%APP_NAME%\bundled" >nul
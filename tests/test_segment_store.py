@@ -0,0 +1,102 @@
+import pickle
+import threading
+
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+from app.transcriber import Segment, SegmentStore, Word  # noqa: E402
+
+
+def texts(store: SegmentStore) -> list:
+    return [segment.text for segment in store]
+
+
+def test_text_joins_segments_with_spaces():
+    store = SegmentStore([Segment(0, 1, "hola"), Segment(1, 2, "mundo")])
+
+    assert store.text == "hola mundo"
+    assert texts(store) == ["hola", "mundo"]
+    assert store[-1] == Segment(1, 2, "mundo")
+
+
+def test_empty_first_segment_read_between_appends():
+    store = SegmentStore()
+    store.append(0, 1, "")
+    assert store.text == ""
+    store.append(1, 2, "abc")
+
+    assert store.text == " abc"
+    assert texts(store) == ["", "abc"]
+
+
+@pytest.mark.parametrize(
+    "pieces",
+    [
+        ["", "", "abc"],
+        ["abc", "", "", "de"],
+        ["", "x", "", ""],
+        ["uno", "dos", "tres"],
+    ],
+)
+def test_reading_after_every_append_keeps_offsets(pieces):
+    store = SegmentStore()
+    for index, piece in enumerate(pieces):
+        store.append(index, index + 1, piece)
+        assert store.text == " ".join(pieces[: index + 1])
+        assert texts(store) == pieces[: index + 1]
+        assert store[index].text == piece
+
+
+def test_words_are_recovered_from_the_segment_text():
+    store = SegmentStore()
+    store.append(0, 1, "")
+    store.text
+    store.append(1, 2, " hola mundo", [Word(1.0, 1.4, " hola", 0.9), Word(1.5, 2.0, " mundo", 0.8)])
+
+    assert [word.text for word in store.words(1)] == ["hola", "mundo"]
+    assert store.words(0) == []
+
+
+def test_concurrent_reads_do_not_lose_segments():
+    store = SegmentStore()
+    done = threading.Event()
+
+    def read() -> None:
+        while not done.is_set():
+            store.text
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for index in range(2000):
+            store.append(index, index + 1, "" if index % 3 == 0 else str(index))
+    finally:
+        done.set()
+        reader.join()
+
+    expected = ["" if index % 3 == 0 else str(index) for index in range(2000)]
+    assert texts(store) == expected
+
+
+def test_pickle_round_trip_keeps_segments_and_words():
+    store = SegmentStore()
+    store.append(0, 1, "")
+    store.append(1, 2, " hola", [Word(1.0, 2.0, " hola", 0.5)])
+    store.set_speakers([None, "A"])
+
+    copy = pickle.loads(pickle.dumps(store))
+
+    assert list(copy) == list(store)
+    assert copy.words(1) == store.words(1)
+    assert copy.speaker(1) == "A"
+
+
+def test_pickled_store_accepts_more_segments():
+    store = SegmentStore()
+    store.append(0, 1, "")
+
+    copy = pickle.loads(pickle.dumps(store))
+    copy.append(1, 2, "más")
+
+    assert texts(copy) == ["", "más"]